@@ -0,0 +1,159 @@
+"""
+bench_hdf5_storage.py
+What it does:
+Compares the HDF5 chunk/filter presets of Npy2XdmfConverter (src/conversor/Hdf5_Storage.py) on a synthetic result set.
+For each preset it writes the same model folder (coordinates + time_series frames with displacement, stress_tensor and
+von_mises) and reports write time, file size, the time to read every field of one full frame and the time to read the
+stress history of a single node across all frames. The synthetic fields are generated once and are not timed.
+
+Example of use:
+    python scripts/bench_hdf5_storage.py --nodes 500000 --frames 20
+    python scripts/bench_hdf5_storage.py --presets default frame-major --filter gzip1 --json bench_h5.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+import h5py
+
+# Impede criação de cache
+sys.dont_write_bytecode = True
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(script_dir)
+sys.path[:0] = [os.path.join(project_root, 'src', 'conversor'), os.path.join(project_root, 'src')]
+
+from Npy_2_Xdmf import Npy2XdmfConverter
+from Hdf5_Storage import PRESETS
+
+MODEL = "bench_model"
+
+
+def write_model(root, n_nodes, n_frames, stress_columns, seed=0):
+    """Pasta de modelo no formato do OdbToNPYConverter (layout 'frames'), malha de hexaedros."""
+    rng = np.random.default_rng(seed)
+    model_dir = os.path.join(root, MODEL)
+    side = max(2, int(round(n_nodes ** (1.0 / 3.0))))
+    n_nodes = side ** 3
+
+    g = np.arange(side, dtype=np.float64)
+    x, y, z = np.meshgrid(g, g, g, indexing="ij")
+    coords = np.column_stack([x.ravel(), y.ravel(), z.ravel()])
+
+    idx = np.arange(n_nodes).reshape(side, side, side)
+    c = idx[:-1, :-1, :-1].ravel()
+    dx, dy, dz = side * side, side, 1
+    conn = np.column_stack([c, c + dx, c + dx + dy, c + dy,
+                            c + dz, c + dx + dz, c + dx + dy + dz, c + dy + dz]).astype(np.int64)
+
+    os.makedirs(model_dir, exist_ok=True)
+    np.save(os.path.join(model_dir, "coordinates.npy"), coords)
+    np.save(os.path.join(model_dir, "connectivity.npy"), conn.ravel())
+    np.save(os.path.join(model_dir, "element_types.npy"), np.full(len(conn), 12, dtype=np.uint8))
+    np.save(os.path.join(model_dir, "offsets.npy"), np.arange(0, conn.size + 1, 8, dtype=np.int64))
+
+    step_dir = os.path.join(model_dir, "time_series", "step_1_Step-1")
+    for k in range(n_frames):
+        frame_dir = os.path.join(step_dir, f"frame_{k + 1:03d}")
+        os.makedirs(frame_dir, exist_ok=True)
+        # campos suaves + ruído: comprimem como resultados reais, não como zeros
+        t = (k + 1) / n_frames
+        base = np.sin(coords / side * np.pi) * t
+        np.save(os.path.join(frame_dir, "displacement.npy"),
+                (base + 1e-3 * rng.standard_normal(base.shape)).astype(np.float32))
+        stress = np.repeat(base, stress_columns // 3, axis=1) * 100.0
+        stress += rng.standard_normal(stress.shape)
+        np.save(os.path.join(frame_dir, "stress_tensor.npy"), stress.astype(np.float32))
+        np.save(os.path.join(frame_dir, "von_mises.npy"), np.abs(stress).sum(axis=1).astype(np.float32))
+    return n_nodes
+
+
+def read_full_frame(h5_path, frame):
+    start = time.perf_counter()
+    with h5py.File(h5_path, "r") as h5:
+        grp = h5[f"{MODEL}/time_series/step_1_Step-1/{frame}"]
+        n_bytes = sum(grp[name][()].nbytes for name in grp)
+    return time.perf_counter() - start, n_bytes
+
+
+def read_node_history(h5_path, node):
+    start = time.perf_counter()
+    with h5py.File(h5_path, "r") as h5:
+        step = h5[f"{MODEL}/time_series/step_1_Step-1"]
+        history = np.stack([step[frame]["stress_tensor"][node] for frame in step])
+    return time.perf_counter() - start, history.nbytes
+
+
+def run_preset(preset, args, npy_root, work_dir):
+    storage = dict(PRESETS[preset])
+    if args.filter:
+        storage["filter"] = args.filter
+    out_dir = os.path.join(work_dir, f"h5_{preset}")
+    conv = Npy2XdmfConverter(npy_root, out_dir, storage=storage,
+                             max_pending_writes=args.max_pending_writes)
+    conv.logger.disabled = True
+
+    start = time.perf_counter()
+    conv._write_hdf5()
+    t_write = time.perf_counter() - start
+    size = os.path.getsize(conv.h5_path)
+
+    frames = [f"frame_{k + 1:03d}" for k in range(args.frames)]
+    t_frame = np.median([read_full_frame(conv.h5_path, f)[0] for f in frames[:args.repeats]])
+    rng = np.random.default_rng(1)
+    nodes = rng.integers(0, args.nodes_actual, size=args.repeats)
+    t_node = np.median([read_node_history(conv.h5_path, int(n))[0] for n in nodes])
+    shutil.rmtree(out_dir, ignore_errors=True)
+
+    return {"preset": preset, "filter": storage["filter"], "chunks": storage["chunks"],
+            "write_s": t_write, "size_mb": size / 1e6,
+            "full_frame_read_s": float(t_frame), "node_history_read_s": float(t_node)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HDF5 chunk/filter presets of Npy2XdmfConverter")
+    parser.add_argument("--nodes", type=int, default=200000, help="approximate node count")
+    parser.add_argument("--frames", type=int, default=10)
+    parser.add_argument("--stress-columns", type=int, choices=(6, 9), default=9)
+    parser.add_argument("--presets", nargs="+", default=["default", "frame-major", "node-history", "none"],
+                        choices=sorted(PRESETS))
+    parser.add_argument("--filter", default=None, help="override the filter of every preset (e.g. gzip1)")
+    parser.add_argument("--repeats", type=int, default=5, help="reads per measurement (median reported)")
+    parser.add_argument("--max-pending-writes", type=int, default=2)
+    parser.add_argument("--work-dir", default=None, help="kept after the run if given")
+    parser.add_argument("--json", default=None, help="write the results to this file")
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="bench_h5_")
+    npy_root = os.path.join(work_dir, "npy_files")
+    rows = []
+    try:
+        print(">> Generating synthetic result set...")
+        args.nodes_actual = write_model(npy_root, args.nodes, args.frames, args.stress_columns)
+        for preset in args.presets:
+            print(f">> Preset {preset}...")
+            rows.append(run_preset(preset, args, npy_root, work_dir))
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\nNodes: {args.nodes_actual} | frames: {args.frames} | stress columns: {args.stress_columns}")
+    print(f"{'preset':<14}{'filter':<14}{'chunks':>8}{'write s':>10}{'MB':>10}{'frame s':>10}{'node s':>10}")
+    for r in rows:
+        print(f"{r['preset']:<14}{r['filter']:<14}{str(r['chunks']):>8}{r['write_s']:>10.3f}{r['size_mb']:>10.1f}"
+              f"{r['full_frame_read_s']:>10.4f}{r['node_history_read_s']:>10.4f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "presets": rows}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+bench_odb_converter.py
+What it does:
+Measures the throughput of OdbToNPYConverter without an Abaqus install, using the synthetic odbAccess stand-in
+(src/conversor/odb_standin). Reports seconds, nodes/s and MB/s for geometry extraction, per-frame accumulation
+(first frame, which builds the averaging plans, and the remaining frames) and saving, so converter changes can be
+compared locally. Generating the synthetic fields is not part of the timings.
+
+Example of use:
+    python scripts/bench_odb_converter.py --nodes 200000 --frames 6 --duplication 8
+    python scripts/bench_odb_converter.py --nodes 500000 --layout time_major --json bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+# Impede criação de cache
+sys.dont_write_bytecode = True
+
+# Configuração de Paths: o stand-in precisa vir antes no path para o 'from odbAccess import *' do conversor
+script_dir = os.path.dirname(os.path.abspath(__file__))
+project_root = os.path.dirname(script_dir)
+conversor_dir = os.path.join(project_root, 'src', 'conversor')
+sys.path[:0] = [os.path.join(conversor_dir, 'odb_standin'), conversor_dir]
+
+from odbAccess import openOdb, write_synthetic_odb
+from Odb_Npz_Converter import OdbToNPYConverter
+
+
+class CachedFrame:
+    """Frame with its fieldOutputs generated once, so only the converter is timed."""
+    def __init__(self, frame):
+        self.fieldOutputs = frame.fieldOutputs
+        self.frameValue = frame.frameValue
+
+    def input_bytes(self):
+        total = 0
+        for field in self.fieldOutputs.values():
+            for block in field.bulkDataBlocks:
+                for attr in ("nodeLabels", "data", "mises", "maxPrincipal", "minPrincipal"):
+                    values = getattr(block, attr, None)
+                    if values is not None:
+                        total += values.nbytes
+        return total
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return time.perf_counter() - start, result
+
+
+def row(stage, seconds, nodes, n_bytes):
+    return {
+        "stage": stage,
+        "seconds": seconds,
+        "nodes_per_s": nodes / seconds if seconds > 0 else float("inf"),
+        "mb_per_s": n_bytes / 1e6 / seconds if seconds > 0 else float("inf"),
+        "mb": n_bytes / 1e6
+    }
+
+
+def run_benchmark(args, work_dir):
+    odb_path = write_synthetic_odb(os.path.join(work_dir, "bench.odb"),
+                                   n_nodes=args.nodes, n_frames=args.frames,
+                                   n_instances=args.instances, duplication=args.duplication,
+                                   invariants=not args.no_invariants)
+    out_dir = os.path.join(work_dir, "out")
+    converter = OdbToNPYConverter(work_dir, "bench", out_dir, "12", begin_frame="0",
+                                  accumulation=args.accumulation, layout=args.layout, resume=False)
+    os.makedirs(out_dir, exist_ok=True)
+
+    odb = openOdb(odb_path, readOnly=True)
+    frames = odb.steps["Step-1"].frames
+    print(f">> Generating {len(frames)} synthetic frames...")
+    cached = [CachedFrame(frame) for frame in frames]
+
+    rows = []
+
+    # 1) Geometria
+    t_geom, geom = timed(converter._extract_geometry, odb)
+    n_nodes = geom["global_node_count"]
+    geom_bytes = sum(geom[k].nbytes for k in ("coordinates", "connectivity", "element_types", "offsets"))
+    rows.append(row("geometry", t_geom, n_nodes, geom_bytes))
+
+    # 2) Acumulação: o primeiro frame constrói os planos de médias
+    mapping = geom["instance_mapping"]
+    results = []
+    t_first, res = timed(converter._average_frame, cached[0], n_nodes, mapping)
+    results.append(res)
+    rows.append(row("accumulate (first frame)", t_first, n_nodes, cached[0].input_bytes()))
+    if len(cached) > 1:
+        t_rest = 0.0
+        for frame in cached[1:]:
+            t, res = timed(converter._average_frame, frame, n_nodes, mapping)
+            t_rest += t
+            results.append(res)
+        rows.append(row(f"accumulate ({len(cached) - 1} frames)", t_rest, n_nodes * (len(cached) - 1),
+                        sum(f.input_bytes() for f in cached[1:])))
+
+    # 3) Gravação no layout escolhido
+    step_dir = os.path.join(out_dir, "time_series", "step_1_Step-1")
+    os.makedirs(step_dir, exist_ok=True)
+    start = time.perf_counter()
+    if args.layout == "time_major":
+        store = converter._open_frame_store(step_dir, len(results))
+        for slot, res in enumerate(results):
+            converter._store_frame(store, slot, res, {"slot": slot, "frame_index": slot,
+                                                      "name": f"frame_{slot + 1:03d}"})
+        converter._close_frame_store(store)
+    else:
+        for slot, res in enumerate(results):
+            frame_dir = os.path.join(step_dir, f"frame_{slot + 1:03d}")
+            os.makedirs(frame_dir, exist_ok=True)
+            for name, arr in res.items():
+                np.save(os.path.join(frame_dir, name + ".npy"), arr)
+    t_save = time.perf_counter() - start
+    saved = sum(arr.nbytes for res in results for arr in res.values())
+    rows.append(row(f"save ({args.layout})", t_save, n_nodes * len(results), saved))
+
+    odb.close()
+    return n_nodes, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OdbToNPYConverter throughput on a synthetic ODB")
+    parser.add_argument("--nodes", type=int, default=100000, help="approximate node count")
+    parser.add_argument("--frames", type=int, default=5)
+    parser.add_argument("--instances", type=int, default=1)
+    parser.add_argument("--duplication", type=float, default=None,
+                        help="ELEMENT_NODAL values per node in S (default: structured hex grid, ~8)")
+    parser.add_argument("--no-invariants", action="store_true",
+                        help="S blocks without mises/maxPrincipal/minPrincipal")
+    parser.add_argument("--accumulation", choices=("vectorized", "loop"), default="vectorized")
+    parser.add_argument("--layout", choices=("frames", "time_major"), default="frames")
+    parser.add_argument("--work-dir", default=None, help="kept after the run if given")
+    parser.add_argument("--json", default=None, help="write the results to this file")
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="bench_odb_")
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        n_nodes, rows = run_benchmark(args, work_dir)
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\nNodes: {n_nodes} | frames: {args.frames} | accumulation: {args.accumulation} | layout: {args.layout}")
+    print(f"{'stage':<28}{'seconds':>10}{'nodes/s':>14}{'MB':>10}{'MB/s':>10}")
+    for r in rows:
+        print(f"{r['stage']:<28}{r['seconds']:>10.3f}{r['nodes_per_s']:>14.0f}{r['mb']:>10.1f}{r['mb_per_s']:>10.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "nodes": n_nodes, "stages": rows}, f, indent=2)
+        print(f"\nResults written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
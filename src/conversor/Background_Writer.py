@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+"""
+Background_Writer: fila limitada de gravações executadas por uma thread em
+segundo plano, para que o frame N seja gravado enquanto o N+1 é lido/calculado.
+
+    writer = BackgroundWriter(max_pending=2)
+    for frame in frames:
+        results = calcula(frame)
+        writer.submit(grava, results)      # bloqueia se já houver 2 pendentes
+    writer.close()                         # espera a fila e levanta WriterError se algo falhou
+
+- Backpressure: submit() bloqueia enquanto houver 'max_pending' tarefas não
+  concluídas (na fila ou em execução), então no máximo 'max_pending' frames
+  ficam em trânsito, além do que o chamador está calculando.
+- As tarefas rodam em ordem (FIFO) numa única thread.
+- Um erro numa tarefa não interrompe as seguintes; todos são guardados e
+  levantados juntos em close() (ou check()).
+- max_pending=0 executa cada tarefa na hora, na thread chamadora.
+- Os dados passados a submit() não devem ser alterados depois.
+
+Usado pelo OdbToNPYConverter, pelo Npy2XdmfConverter e por
+exp_process.utils.io.save_json. Compatível com Python 2.7 (Abaqus) e 3.x.
+"""
+
+from __future__ import print_function
+import threading
+import traceback
+
+try:    import queue
+except  ImportError: import Queue as queue
+
+_STOP = object()
+
+
+class WriterError(RuntimeError):
+    """Falhas de uma ou mais tarefas do BackgroundWriter."""
+    def __init__(self, errors):
+        self.errors = errors
+        lines = ["{} background write(s) failed:".format(len(errors))]
+        for description, exc, _ in errors:
+            lines.append("  {}: {}: {}".format(description, type(exc).__name__, exc))
+        RuntimeError.__init__(self, "\n".join(lines))
+
+
+class BackgroundWriter(object):
+    def __init__(self, max_pending=2, name="background-writer"):
+        self.max_pending = int(max_pending)
+        self.errors = []
+        self._lock = threading.Lock()
+        self._thread = None
+        if self.max_pending > 0:
+            # Vagas = tarefas na fila + a em execução; liberada em _run ao fim de cada tarefa
+            self._slots = threading.BoundedSemaphore(self.max_pending)
+            self._queue = queue.Queue()
+            self._thread = threading.Thread(target=self._run, name=name)
+            self._thread.daemon = True
+            self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        # Com uma exceção em andamento, ela tem prioridade sobre os erros da fila
+        self.close(raise_errors=exc_type is None)
+        return False
+
+    def submit(self, func, *args, **kwargs):
+        """Enfileira func(*args, **kwargs); bloqueia se já houver max_pending tarefas não concluídas."""
+        description = kwargs.pop("description", None) or getattr(func, "__name__", repr(func))
+        if self._thread is None:
+            self._execute(description, func, args, kwargs)
+            return
+        if not self._thread.is_alive():
+            raise RuntimeError("BackgroundWriter is closed")
+        self._slots.acquire()
+        self._queue.put((description, func, args, kwargs))
+
+    def flush(self):
+        """Espera todas as tarefas enfileiradas terminarem."""
+        if self._thread is not None:
+            self._queue.join()
+
+    def check(self):
+        """Levanta WriterError se alguma tarefa já falhou."""
+        with self._lock:
+            errors = list(self.errors)
+        if errors:
+            raise WriterError(errors)
+
+    def close(self, raise_errors=True):
+        """Esvazia a fila, encerra a thread e, se houve falhas, levanta WriterError."""
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join()
+        if raise_errors:
+            self.check()
+
+    # ------------------------------------------------------------------
+    def _execute(self, description, func, args, kwargs):
+        try:
+            func(*args, **kwargs)
+        except Exception as e:
+            with self._lock:
+                self.errors.append((description, e, traceback.format_exc()))
+
+    def _run(self):
+        while True:
+            task = self._queue.get()
+            try:
+                if task is _STOP:
+                    return
+                self._execute(*task)
+            finally:
+                if task is not _STOP:
+                    self._slots.release()
+                self._queue.task_done()
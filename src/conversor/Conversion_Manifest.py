@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+"""
+Conversion_Manifest: manifesto de uma conversão ODB -> NPY (conversion_manifest.json
+na pasta de saída do modelo), usado para retomar conversões interrompidas e para
+pular ODBs que não mudaram.
+
+Conteúdo:
+    {
+      "version":  1,
+      "odb":      {"path": ..., "size": ..., "mtime": ...},
+      "options":  {opções do conversor que afetam a saída},
+      "frames":   {"step_X_nome/frame_Y": {"meta": {...}, "fields": [...], "checksum": "..."}},
+      "complete": true/false,
+      "completed_at": time.time() do fim da conversão
+    }
+
+Compatível com Python 2.7 (Abaqus) e 3.x: o pipeline em Python 3 usa
+odb_batch_is_current() sem precisar do odbAccess.
+"""
+
+from __future__ import print_function
+import os
+import json
+import hashlib
+import numpy as np
+
+MANIFEST_FILE    = "conversion_manifest.json"
+MANIFEST_VERSION = 1
+
+# Saídas fixas de toda conversão (e a da conversão por subconjunto)
+GEOMETRY_FILES   = ("coordinates.npy", "connectivity.npy", "element_types.npy", "offsets.npy")
+SUBSET_FILES     = ("subset_node_index.npy",)
+SUBSET_OPTIONS   = ("fields", "node_set", "bbox", "plane")
+
+
+def odb_signature(odb_path):
+    """Caminho absoluto, tamanho e mtime do ODB."""
+    st = os.stat(odb_path)
+    return {"path": os.path.normcase(os.path.abspath(odb_path)),
+            "size": int(st.st_size),
+            "mtime": float(st.st_mtime)}
+
+
+def normalize_options(options):
+    """Opções em forma JSON (tuplas -> listas), comparáveis com as do arquivo."""
+    return json.loads(json.dumps(options, sort_keys=True))
+
+
+def frame_checksum(results):
+    """
+    SHA-1 dos arrays de um frame (nome, forma e dados em float32), igual para
+    o dict em memória e para os arrays relidos do disco.
+    """
+    digest = hashlib.sha1()
+    for name in sorted(results):
+        arr = np.ascontiguousarray(results[name], dtype=np.float32)
+        digest.update(name.encode("utf-8"))
+        digest.update(str(arr.shape).encode("utf-8"))
+        digest.update(arr.tobytes())
+    return digest.hexdigest()
+
+
+def new_manifest(odb_path, options):
+    return {"version": MANIFEST_VERSION,
+            "odb": odb_signature(odb_path),
+            "options": normalize_options(options),
+            "frames": {},
+            "complete": False}
+
+
+def load_manifest(output_path):
+    """Lê o manifesto da pasta de saída; None se não existir ou estiver ilegível."""
+    path = os.path.join(output_path, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, "r") as f:
+            manifest = json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        return None
+    return manifest
+
+
+def save_manifest(output_path, manifest):
+    """Grava via arquivo temporário: um crash nunca deixa o manifesto pela metade."""
+    path = os.path.join(output_path, MANIFEST_FILE)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    if os.path.exists(path):
+        os.remove(path)
+    os.rename(tmp_path, path)
+
+
+def manifest_matches(manifest, odb_path, options=None):
+    """True se o manifesto é do mesmo ODB (caminho, tamanho, mtime) e das mesmas opções."""
+    if not manifest or not os.path.exists(odb_path):
+        return False
+    if manifest.get("odb") != odb_signature(odb_path):
+        return False
+    return options is None or manifest.get("options") == normalize_options(options)
+
+
+def frame_paths(output_path, key, record, layout=None):
+    """Arquivos .npy de um frame registrado (layout 'time_major': um por campo do step)."""
+    step, frame = key.split("/", 1)
+    base = os.path.join(output_path, "time_series", step)
+    if layout != "time_major":
+        base = os.path.join(base, frame)
+    return [os.path.join(base, name + ".npy") for name in record["fields"]]
+
+
+def outputs_exist(output_path, manifest):
+    """True se a geometria e os arquivos de todos os frames registrados existem em disco."""
+    options = manifest.get("options") or {}
+    names = GEOMETRY_FILES
+    if any(options.get(k) is not None for k in SUBSET_OPTIONS):
+        names += SUBSET_FILES
+    paths = [os.path.join(output_path, name) for name in names]
+    for key, record in manifest.get("frames", {}).items():
+        paths.extend(frame_paths(output_path, key, record, options.get("layout")))
+    return all(os.path.isfile(path) for path in paths)
+
+
+def odb_batch_is_current(simulation_dir, npy_dir, newer_than=None):
+    """
+    True se todo ODB de simulation_dir tem em npy_dir/<nome> um manifesto
+    completo e com a assinatura atual do ODB (e, se dado, concluído depois de
+    'newer_than', ex.: o mtime do config.json com as opções da conversão),
+    com as saídas registradas ainda presentes em disco.
+    """
+    if not os.path.isdir(simulation_dir):
+        return False
+    odb_files = [f for f in os.listdir(simulation_dir) if f.lower().endswith(".odb")]
+    if not odb_files:
+        return False
+    for f in odb_files:
+        manifest = load_manifest(os.path.join(npy_dir, os.path.splitext(f)[0]))
+        if not manifest_matches(manifest, os.path.join(simulation_dir, f)):
+            return False
+        if not manifest.get("complete"):
+            return False
+        if newer_than is not None and manifest.get("completed_at", 0.0) < newer_than:
+            return False
+        if not outputs_exist(os.path.join(npy_dir, os.path.splitext(f)[0]), manifest):
+            return False
+    return True
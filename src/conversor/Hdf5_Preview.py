@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+Hdf5_Preview: pirâmides de pré-visualização e estatísticas dos resultados
+gravados pelo Npy2XdmfConverter, para leituras rápidas sem puxar os arrays
+completos (modelos de milhões de nós).
+
+Níveis: para cada fator f (padrão 8, 64, 512) a malha é subamostrada numa
+grade de voxels com ~n/f voxels ocupados, mantendo um nó por voxel (o de
+menor índice). Os índices e as coordenadas ficam com a malha e cada frame
+guarda os campos nesses nós:
+
+    /meshes/<sha1>/preview/level_8/node_index, coordinates
+    /<modelo>/preview/level_8/node_index, coordinates        (hard links)
+    /<modelo>/preview/level_8/time_series/<step>/<frame>/<campo>
+
+Campos compactos (conversão por subconjunto) não têm pré-visualização.
+Cada dataset de campo em time_series/ tem os atributos 'min', 'max' e 'mean'
+(por coluna; escalar para campos [n]).
+
+Leitura:
+    with h5py.File("S_batch.h5", "r", swmr=True) as h5:
+        coords, values, level = read_preview(h5, "Mesh-0_9--Lenth-50_FI", "step_1_Step-1",
+                                             "frame_001", "stress_tensor", max_points=200000)
+"""
+
+import numpy as np
+
+PREVIEW_GROUP  = "preview"
+DEFAULT_LEVELS = (8, 64, 512)
+STATS          = ("min", "max", "mean")
+
+
+def level_name(factor):
+    return "level_{}".format(int(factor))
+
+
+def voxel_subsample(coords, factor, block_rows=65536, iterations=6):
+    """
+    Índices (crescentes) de ~len(coords)/factor nós, um por voxel ocupado de
+    uma grade regular sobre a caixa envolvente. O tamanho do voxel é ajustado
+    por algumas iterações até a contagem ficar perto do alvo. 'coords' pode
+    ser um memmap: é lido em blocos de block_rows linhas.
+    """
+    n = coords.shape[0]
+    target = max(1, int(np.ceil(n / float(factor))))
+    if n == 0 or target >= n:
+        return np.arange(n, dtype=np.int64)
+
+    lo = np.full(3, np.inf)
+    hi = np.full(3, -np.inf)
+    for start in range(0, n, block_rows):
+        block = np.asarray(coords[start:start + block_rows], dtype=np.float64)
+        lo = np.minimum(lo, block.min(axis=0))
+        hi = np.maximum(hi, block.max(axis=0))
+    extent = hi - lo
+    dims = extent > 0                     # malhas planas: grade só nas direções com extensão
+    n_dims = max(1, int(dims.sum()))
+    size = (np.prod(extent[dims]) / target) ** (1.0 / n_dims) if dims.any() else 1.0
+
+    # número de células por direção (limitado para o índice caber em int64)
+    best = None
+    for _ in range(iterations):
+        shape = np.minimum((extent[dims] / size).astype(np.int64) + 1, 2 ** (62 // n_dims))
+        index = _first_per_voxel(coords, lo[dims], size, dims, shape, block_rows)
+        if best is None or abs(len(index) - target) < abs(len(best) - target):
+            best = index
+        ratio = len(index) / float(target)
+        if 0.8 <= ratio <= 1.25:
+            break
+        size *= ratio ** (1.0 / n_dims)
+    return best
+
+
+def _first_per_voxel(coords, lo, size, dims, shape, block_rows):
+    """Primeiro nó (menor índice) de cada voxel ocupado."""
+    n = coords.shape[0]
+    keys = np.empty(n, dtype=np.int64)
+    for start in range(0, n, block_rows):
+        block = np.asarray(coords[start:start + block_rows], dtype=np.float64)[:, dims]
+        cells = np.minimum(np.floor((block - lo) / size).astype(np.int64), shape - 1)
+        keys[start:start + len(block)] = np.ravel_multi_index(tuple(cells.T), shape)
+    _, first = np.unique(keys, return_index=True)
+    return np.sort(first).astype(np.int64)
+
+
+class FieldStats(object):
+    """Mínimo, máximo e média por coluna acumulados bloco a bloco."""
+    def __init__(self, shape):
+        self.shape = tuple(shape[1:])
+        self.count = 0
+        self.min  = np.full(self.shape, np.inf)
+        self.max  = np.full(self.shape, -np.inf)
+        self.sum  = np.zeros(self.shape)
+
+    def update(self, block):
+        if len(block) == 0:
+            return
+        block = np.asarray(block, dtype=np.float64)
+        self.min = np.minimum(self.min, block.min(axis=0))
+        self.max = np.maximum(self.max, block.max(axis=0))
+        self.sum += block.sum(axis=0)
+        self.count += len(block)
+
+    def values(self):
+        """{'min', 'max', 'mean'}: NaN para um dataset vazio."""
+        if self.count == 0:
+            nan = np.full(self.shape, np.nan)
+            return {"min": nan, "max": nan, "mean": nan}
+        return {"min": self.min, "max": self.max, "mean": self.sum / self.count}
+
+
+def preview_levels(h5, sim_name):
+    """[(fator, n_pontos)] dos níveis gravados para o modelo, do mais fino ao mais grosso."""
+    group = h5[sim_name].get(PREVIEW_GROUP)
+    if group is None:
+        return []
+    levels = [(int(g.attrs["factor"]), int(g.attrs["n_points"])) for g in group.values()]
+    return sorted(levels)
+
+
+def read_preview(h5, sim_name, step, frame, field, max_points=None):
+    """
+    (coordenadas, valores, fator) do nível mais fino com no máximo max_points
+    nós (fator 1 = resolução completa, quando cabe ou não há pré-visualização).
+    """
+    sim = h5[sim_name]
+    coords = sim["geometry/coordinates"]
+    if max_points is None or coords.shape[0] <= max_points:
+        return coords[()], sim["time_series"][step][frame][field][()], 1
+
+    levels = preview_levels(h5, sim_name)
+    fitting = [f for f, n_points in levels if n_points <= max_points]
+    if not fitting:
+        if not levels:
+            return coords[()], sim["time_series"][step][frame][field][()], 1
+        fitting = [levels[-1][0]]           # nenhum cabe: o mais grosso
+    level = sim[PREVIEW_GROUP][level_name(fitting[0])]
+    return level["coordinates"][()], level["time_series"][step][frame][field][()], fitting[0]
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+"""
+Hdf5_Storage: forma dos chunks e filtros (compressão) dos datasets gravados
+pelo Npy2XdmfConverter, escolhidos por preset e ajustáveis por dataset.
+
+Presets (padrão de acesso):
+    'default'       gzip 6 e chunks automáticos do h5py (comportamento antigo)
+    'frame-major'   um chunk cobre o frame inteiro (até FRAME_CHUNK_BYTES) com
+                    shuffle + lzf: leitura rápida de todos os nós de um frame
+                    (ParaView, extração de planos de corte)
+    'node-history'  chunks de poucas linhas (NODE_CHUNK_ROWS) com shuffle + lzf:
+                    o histórico de um nó lê um chunk pequeno por frame
+
+Filtros: 'none', 'lzf', 'shuffle_lzf', 'gzip<N>' e 'shuffle_gzip<N>' (N = 0..9;
+'gzip' sozinho = nível 6).
+
+Chunks: 'auto' (h5py decide), 'frame' (frame inteiro, limitado em bytes) ou
+um inteiro com o número de linhas (nós) por chunk; as colunas nunca são
+divididas.
+
+Ajuste por dataset, pelo nome (ex.: no config.json, NPY2XDMF.hdf5_datasets):
+    {"coordinates": {"filter": "gzip9"}, "stress_tensor": {"chunks": 1024}}
+"""
+
+import re
+
+FRAME_CHUNK_BYTES = 4 * 1024 * 1024     # teto de um chunk 'frame'
+NODE_CHUNK_ROWS   = 512
+
+PRESETS = {
+    "default":      {"filter": "gzip6",       "chunks": "auto"},
+    "frame-major":  {"filter": "shuffle_lzf", "chunks": "frame"},
+    "node-history": {"filter": "shuffle_lzf", "chunks": NODE_CHUNK_ROWS},
+    "none":         {"filter": "none",        "chunks": "auto"},
+}
+
+_GZIP = re.compile(r"^(shuffle_)?gzip(\d?)$")
+
+
+def filter_options(name):
+    """Argumentos de create_dataset para um filtro ('shuffle_lzf', 'gzip4', ...)."""
+    if name in (None, "none"):
+        return {}
+    if name == "lzf":
+        return {"compression": "lzf"}
+    if name == "shuffle_lzf":
+        return {"shuffle": True, "compression": "lzf"}
+    match = _GZIP.match(name)
+    if match:
+        opts = {"compression": "gzip", "compression_opts": int(match.group(2) or 6)}
+        if match.group(1):
+            opts["shuffle"] = True
+        return opts
+    raise ValueError("Unknown HDF5 filter '{}'".format(name))
+
+
+def resolve_storage(storage="default", compression=True):
+    """
+    Preset (nome ou dict com 'filter'/'chunks') -> dict completo. compression=False
+    mantém o significado antigo: nenhum filtro, qualquer que seja o preset.
+    """
+    if isinstance(storage, dict):
+        spec = dict(PRESETS["default"], **storage)
+    elif storage in PRESETS:
+        spec = dict(PRESETS[storage])
+    else:
+        raise ValueError("Unknown HDF5 storage preset '{}' (use one of {})".format(
+            storage, ", ".join(sorted(PRESETS))))
+    if not compression:
+        spec["filter"] = "none"
+    filter_options(spec["filter"])          # valida cedo
+    return spec
+
+
+def chunk_shape(shape, itemsize, chunks):
+    """
+    Forma do chunk (linhas x todas as colunas) ou None para 'auto' e para
+    datasets vazios (ex.: região de subconjunto sem nós), cujo chunk explícito
+    seria maior que os dados.
+    """
+    if chunks == "auto" or (shape and 0 in tuple(shape)):
+        return None
+    n_rows = int(shape[0]) if shape else 1
+    row_bytes = itemsize
+    for dim in shape[1:]:
+        row_bytes *= dim
+    if chunks == "frame":
+        rows = max(1, FRAME_CHUNK_BYTES // max(1, row_bytes))
+    else:
+        rows = max(1, int(chunks))
+    return (min(rows, n_rows),) + tuple(shape[1:])
+
+
+def dataset_options(spec, name, shape, itemsize, overrides=None):
+    """
+    Argumentos de create_dataset (chunks + filtros) para o dataset 'name' de
+    forma 'shape', com os ajustes por nome de 'overrides' aplicados sobre 'spec'.
+    """
+    if overrides and name in overrides:
+        spec = dict(spec, **overrides[name])
+    opts = filter_options(spec["filter"])
+    chunks = chunk_shape(shape, itemsize, spec["chunks"]) if len(shape) else None
+    if chunks is not None:
+        opts["chunks"] = chunks
+    return opts
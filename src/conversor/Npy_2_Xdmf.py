@@ -16,6 +16,18 @@ Estrutura de entrada esperada
           time_series/
               step_1_*(...)/frame_1/  displacement.npy ...
               ...
+          (ou, com layout='time_major' do conversor)
+              step_1_*(...)/  displacement.npy [n_frames, n_nodes, 3] ... frames.json
+
+O tensor de tensões pode ter 9 colunas (3x3) ou 6 (simétrico, Voigt); a
+ordem declarada em stress_components.json vai para o atributo 'components'
+de cada dataset stress_tensor e o XDMF declara Tensor ou Tensor6. Na conversão
+por subconjunto, os campos compactos ('S', 'U', ...) recebem o mesmo atributo
+com a ordem de subset_fields.json.
+
+Chunks e filtros de cada dataset seguem um preset de Hdf5_Storage
+('default' = gzip 6, 'frame-major', 'node-history', ...), com ajustes
+opcionais por nome de dataset.
 
 Estrutura de saída (um único arquivo)
     S_batch.h5
@@ -23,11 +35,48 @@ Estrutura de saída (um único arquivo)
         ├─  Mesh-0_9--Lenth-50_FI/geometry/connectivity
         ├─  Mesh-0_9--Lenth-50_FI/topology/element_types
         ├─  Mesh-0_9--Lenth-50_FI/topology/offsets
-        └─  Mesh-0_9--Lenth-50_FI/time_series/step_1/frame_1/...
+        ├─  Mesh-0_9--Lenth-50_FI/time_series/step_1/frame_1/...
+        └─  meshes/<sha1>/coordinates, connectivity
     S_batch.xdmf          <-- referencia o HDF5
 
+A geometria (coordinates + connectivity) é identificada pelo SHA-1 do seu
+conteúdo e gravada uma única vez em /meshes/<sha1>; o geometry/ de cada modelo
+tem hard links para ela (leitura igual à de um dataset próprio) e o XDMF
+aponta direto para /meshes/<sha1>. Casos que compartilham a malha ocupam o
+espaço de uma só.
+
+Com shards=True cada modelo é gravado em paralelo (um processo por modelo)
+no seu próprio arquivo, com a mesma hierarquia interna, e o S_batch.h5 passa
+a ter só links externos para eles (leitores de S_batch.h5 não mudam); o
+XDMF referencia os shards diretamente:
+    S_batch_shards/Mesh-0_9--Lenth-50_FI.h5  ->  /Mesh-0_9--Lenth-50_FI/...
+    S_batch.h5                               ->  /Mesh-0_9--Lenth-50_FI = ExternalLink
+
+O HDF5 é gravado em modo SWMR (single-writer/multiple-reader, swmr=True):
+primeiro toda a estrutura (grupos, datasets vazios, atributos), depois os
+dados, com flush a cada frame. Cada modelo tem o atributo 'completed' (o
+arquivo também), que vira True quando os seus dados estão no disco, e o XDMF
+é reescrito com os modelos já completos. Leitores abrem com
+h5py.File(path, "r", swmr=True) e ignoram modelos com completed == False.
+
+Com update=True o S_batch.h5 existente é atualizado: cada modelo guarda a
+impressão digital (nomes, tamanhos e mtimes dos arquivos da pasta + opções de
+armazenamento) no atributo 'fingerprint'; só modelos novos ou alterados são
+regravados e os grupos cujas pastas sumiram são apagados. O catálogo do XDMF
+de cada modelo fica em S_batch_catalog.json, então os grids dos modelos
+inalterados não exigem reler o HDF5. Apagar um grupo no HDF5 não devolve o
+espaço: os bytes dos grupos apagados somam-se no atributo 'stale_bytes' do
+arquivo e, quando passam de REPACK_FRACTION do tamanho dele (ou não há
+catálogo), o arquivo é regravado do zero, o que o compacta.
+
+Pré-visualização (Hdf5_Preview): para cada fator de 'previews' (padrão 8, 64
+e 512) a malha é subamostrada numa grade de voxels e cada frame guarda os
+campos nesses ~n/f nós em /<modelo>/preview/level_<f>/time_series/...; cada
+dataset de campo tem os atributos 'min', 'max' e 'mean'. Leitores rápidos usam
+Hdf5_Preview.read_preview(); o XDMF continua apontando para os dados completos.
+
 Dependências
-    numpy, h5py, xml.etree.ElementTree, xml.dom.minidom, logging, json
+    numpy, h5py, xml.sax.saxutils, logging, json
 """
 
 import os
@@ -37,11 +86,12 @@ import json
 import glob
 import h5py
 import errno
+import hashlib
 import logging
 import inspect
+import multiprocessing
 import numpy as np
-from xml.etree.ElementTree import Element, SubElement, tostring
-from xml.dom import minidom                               # Para “pretty print”
+from xml.sax.saxutils import escape, quoteattr
 
 # -----------------------------------------------------------------------------#
 # Utilitário de log – o mesmo usado nos outros módulos
@@ -49,6 +99,23 @@ from xml.dom import minidom                               # Para “pretty print
 
 from utils              import *
 
+from Stress_Layout import read_components, read_field_components, components_for
+from Background_Writer import BackgroundWriter
+from Hdf5_Storage import resolve_storage, dataset_options
+from Hdf5_Preview import (PREVIEW_GROUP, DEFAULT_LEVELS, STATS, level_name,
+                          voxel_subsample, FieldStats)
+
+# Sidecar do layout 'time_major' gravado pelo OdbToNPYConverter
+FRAME_INDEX_FILE = "frames.json"
+
+# Geometrias distintas, gravadas uma vez e ligadas (hard link) de cada modelo
+MESHES_GROUP = "meshes"
+
+# Modo update: espaço morto (grupos apagados) acumulado no arquivo e a fração
+# do tamanho dele a partir da qual o S_batch.h5 é regravado do zero
+STALE_ATTR     = "stale_bytes"
+REPACK_FRACTION = 0.25
+
 # -----------------------------------------------------------------------------#
 # (1) PARAMETRIZAÇÃO – a “cara” da classe ODB2NPYParameters
 # -----------------------------------------------------------------------------#
@@ -70,7 +137,15 @@ class NPY2XDMFParameters(object):
         # defaults
         self.options = {
             "hdf5_compression": True,
-            "xdmf_precision"  : 8     # double
+            "xdmf_precision"  : 8,    # double
+            "hdf5_shards"     : False,  # um HDF5 por modelo, gravados em paralelo
+            "hdf5_workers"    : None,   # processos para os shards (None = nº de CPUs)
+            "hdf5_storage"    : "default",  # preset de chunks/filtros (ver Hdf5_Storage)
+            "hdf5_datasets"   : {},     # ajustes por nome de dataset
+            "hdf5_copy_rows"  : 65536,  # linhas por bloco na cópia .npy -> HDF5
+            "hdf5_update"     : False,  # True: regrava só os modelos novos/alterados do S_batch.h5
+            "hdf5_swmr"       : True,   # modelos prontos legíveis (swmr=True) durante a conversão
+            "hdf5_previews"   : [8, 64, 512]    # níveis de pré-visualização (1/f dos nós); [] desliga
         }
 
     # --------------------------------------------------------------------- #
@@ -81,6 +156,7 @@ class NPY2XDMFParameters(object):
             root_dir = os.path.abspath(os.path.join(current_dir, os.pardir))
             project_dir = os.path.abspath(os.path.join(root_dir, os.pardir))
             config_path = os.path.join(project_dir, "data", "config.json")
+        self.config_path = config_path
         try:
             with open(config_path, "r") as f:
                 return json.load(f)
@@ -118,31 +194,61 @@ class Npy2XdmfConverter(object):
     """
     Npy2XdmfConverter / (class)
     What it does:
-    Converts all subfolders inside `root_dir` (each folder = one model) into a single S_batch.h5 + S_batch.xdmf file pair.
+    Converts all subfolders inside `root_dir` (each folder = one model) into a single S_batch.h5 + S_batch.xdmf file pair. With shards=True each model is written by a worker process into its own HDF5 file and S_batch.h5 only holds external links to them. With update=True only new or changed models are rewritten.
     """
     def __init__(self,
                  root_dir,
                  output_dir,
                  h5_filename="S_batch.h5",
                  compression=True,
-                 logger=None):
+                 logger=None,
+                 max_pending_writes=2,
+                 shards=False,
+                 workers=None,
+                 storage="default",
+                 dataset_storage=None,
+                 copy_rows=65536,
+                 update=False,
+                 swmr=True,
+                 previews=DEFAULT_LEVELS):
         self.root_dir      = os.path.abspath(root_dir)
         self.output_dir    = os.path.abspath(output_dir)
         self.h5_filename   = h5_filename
         self.compression   = compression
+        # Chunks/filtros: preset de Hdf5_Storage (compression=False desliga os filtros)
+        self.storage         = resolve_storage(storage, compression)
+        self.dataset_storage = dataset_storage or {}
+        # Linhas por bloco na cópia .npy -> HDF5 (limita o pico de memória)
+        self.copy_rows       = copy_rows
         self.logger        = logger or setup_logger(self.__class__.__name__)
+        # Datasets gravados por uma thread enquanto o próximo .npy é lido
+        self.max_pending_writes = max_pending_writes
+        self._writer       = None
+        self.shards        = shards
+        self.workers       = workers
+        # Atualiza o S_batch.h5 existente em vez de regravá-lo do zero
+        self.update        = update
+        # Single-writer/multiple-reader: modelos prontos legíveis durante a conversão
+        self.swmr          = swmr
+        # Níveis de pré-visualização: fatores de subamostragem da malha (vazio = nenhum)
+        self.previews      = sorted(set(int(f) for f in (previews or ()) if int(f) > 1))
+        self._done           = set()    # modelos completos (no HDF5 e no XDMF parcial)
+        self._pending_meshes = set()    # malhas criadas nesta gravação, ainda sem dados
 
         if not os.path.exists(self.output_dir):
             os.makedirs(self.output_dir)
 
         self.h5_path   = os.path.join(self.output_dir, self.h5_filename)
         self.xdmf_path = os.path.splitext(self.h5_path)[0] + ".xdmf"
+        self.shard_dir = os.path.splitext(self.h5_path)[0] + "_shards"
+        self.catalog_path = os.path.splitext(self.h5_path)[0] + "_catalog.json"
 
         self.precision_coord = 8    # 8 Bytes = double
         self.precision_data  = 4    # 4 Bytes = float32
 
-        # meta para o XDMF
-        self._meta = {}     # sim_name -> dict( n_nodes, n_elems, nodes_per_elem )
+        # catálogo para o XDMF, montado enquanto o HDF5 é escrito:
+        # sim_name -> dict( n_nodes, n_elems, nodes_per_elem, geometry, frames )
+        self._meta = {}
 
     # --------------------------------------------------------------------- #
     @staticmethod
@@ -157,182 +263,657 @@ class Npy2XdmfConverter(object):
         What it does:
         Iterates through all subfolders in root_dir and writes their data into the HDF5 file, preserving the hierarchy for geometry and time series.
         """
-        flags = {"compression": "gzip", "compression_opts": 6} \
-                if self.compression else {}
-
-        with h5py.File(self.h5_path, "w") as h5:
-            # Cada sub-diretório de primeiro nível que contenha coordinates.npy
-            # é assumido como um “modelo”.
-            sim_dirs = sorted(
-                d for d in glob.glob(os.path.join(self.root_dir, "*"))
-                if os.path.isdir(d) and
-                   os.path.exists(os.path.join(d, "coordinates.npy"))
-            )
-
-            if not sim_dirs:
-                raise RuntimeError("Nenhum diretório válido com *.npy foi encontrado em %s" %
-                                   self.root_dir)
+        # Cada sub-diretório de primeiro nível que contenha coordinates.npy
+        # é assumido como um “modelo”.
+        sim_dirs = sorted(
+            d for d in glob.glob(os.path.join(self.root_dir, "*"))
+            if os.path.isdir(d) and
+               os.path.exists(os.path.join(d, "coordinates.npy"))
+        )
+
+        if not sim_dirs:
+            raise RuntimeError("Nenhum diretório válido com *.npy foi encontrado em %s" %
+                               self.root_dir)
+
+        self._done = set()
+        pending = sim_dirs
+        mode = "a" if self.update else "w"
+        if self.update and os.path.exists(self.h5_path):
+            try:
+                pending = self._prune_hdf5(sim_dirs)
+                if pending is None:
+                    self._meta, self._done, pending, mode = {}, set(), sim_dirs, "w"
+                else:
+                    self.logger.info("Atualização: %d de %d modelos a gravar", len(pending), len(sim_dirs))
+            except OSError as e:
+                # ex.: conversão SWMR interrompida; o arquivo só abre para leitura (swmr=True)
+                self.logger.warning("Não foi possível atualizar %s (%s); regravando do zero",
+                                    self.h5_path, e)
+                self._meta, self._done, pending, mode = {}, set(), sim_dirs, "w"
+        if self.shards:
+            self._write_hdf5_shards(pending, mode)
+        else:
+            self._write_simulations(self.h5_path, mode, pending, on_completed=self._write_partial_xdmf)
+
+        # XDMF na ordem das pastas, com modelos novos e inalterados
+        self._meta = dict((os.path.basename(d), self._meta[os.path.basename(d)]) for d in sim_dirs)
+        self._save_catalog()
+
+    # --------------------------------------------------------------------- #
+    def _open_h5(self, h5_path, mode):
+        """Arquivo HDF5 no formato mais recente quando for gravado em modo SWMR."""
+        if self.swmr:
+            return h5py.File(h5_path, mode, libver="latest")
+        return h5py.File(h5_path, mode)
+
+    # --------------------------------------------------------------------- #
+    def _write_simulations(self, h5_path, mode, sim_dirs, on_completed=None):
+        """
+        _write_simulations / (method)
+        What it does:
+        Writes the given model folders into one HDF5 file in two phases. First every group, dataset and attribute is created, with 'completed' = False. Then, with SWMR enabled, the datasets are filled and flushed frame by frame, and each model gets 'completed' = True once its data is on disk. Readers opening the file with swmr=True see finished models while the next ones are written, and a crash leaves a readable file.
+        """
+        with self._open_h5(h5_path, mode) as h5, \
+             BackgroundWriter(self.max_pending_writes, name="h5-writer") as self._writer:
+            h5.attrs["completed"] = False
+            self._pending_meshes = set()
 
+            # Fase 1: estrutura (objetos e atributos não podem ser criados em SWMR)
+            plans = []
             for sim_dir in sim_dirs:
                 sim_name = os.path.basename(sim_dir)
-                self.logger.info("Processando modelo: %s", sim_name)
-                grp = h5.create_group(sim_name)
-
-                # -----------------  GEOMETRIA  --------------------------- #
-                g_geo = grp.create_group("geometry")
-                coords = self._np_load(os.path.join(sim_dir, "coordinates.npy"))
-                conn   = self._np_load(os.path.join(sim_dir, "connectivity.npy"))
-
-                # reshape conectividade => (n_elem, nodes_per_elem)
-                # nodes_per_elem = deduzido do número de colunas. Ex.: Hexa = 8
-                element_types = self._np_load(os.path.join(sim_dir,
-                                                           "element_types.npy"))
-                nodes_per_elem = int(conn.size // element_types.size)
-                conn_2d = conn.reshape((-1, nodes_per_elem))
-
-                # grava
-                g_geo.create_dataset("coordinates",
-                                     data=coords,
-                                     dtype=np.float64,
-                                     **flags)
-                g_geo.create_dataset("connectivity",
-                                     data=conn_2d.astype(np.int32),
-                                     dtype=np.int32,
-                                     **flags)
-
-                # -----------------  TOPOLOGIA  --------------------------- #
-                g_topo = grp.create_group("topology")
-                offsets = self._np_load(os.path.join(sim_dir, "offsets.npy"))
-                g_topo.create_dataset("element_types", data=element_types.astype(np.uint8),
-                                      dtype=np.uint8)
-                g_topo.create_dataset("offsets", data=offsets.astype(np.int32),
-                                      dtype=np.int32)
-
-                # -----------------  TIME SERIES -------------------------- #
-                ts_src = os.path.join(sim_dir, "time_series")
-                if not os.path.exists(ts_src):
-                    self.logger.warning("time_series não encontrado em %s", sim_dir)
-                else:
-                    g_ts = grp.create_group("time_series")
-                    for step in sorted(os.listdir(ts_src)):
-                        step_src = os.path.join(ts_src, step)
-                        if not os.path.isdir(step_src):
-                            continue
-                        g_step = g_ts.create_group(step)
-                        for frame in sorted(os.listdir(step_src)):
-                            frame_src = os.path.join(step_src, frame)
-                            if not os.path.isdir(frame_src):
-                                continue
-                            g_frame = g_step.create_group(frame)
-                            # Cada *.npy dentro do frame vira um DataSet
-                            for npy_file in glob.glob(os.path.join(frame_src, "*.npy")):
-                                name = os.path.splitext(os.path.basename(npy_file))[0]
-                                arr  = self._np_load(npy_file)
-                                g_frame.create_dataset(name,
-                                                       data=arr.astype(np.float32),
-                                                       dtype=np.float32,
-                                                       **flags)
-
-                # ----------  meta (para escrever o XDMF depois) ---------- #
-                self._meta[sim_name] = dict(
-                    n_nodes         = coords.shape[0],
-                    n_elems         = conn_2d.shape[0],
-                    nodes_per_elem  = nodes_per_elem
-                )
+                self._meta[sim_name], fills = self._create_simulation(h5, sim_dir)
+                plans.append((sim_name, fills))
+            if mode == "a":
+                self._prune_meshes(h5)
+            if self.swmr:
+                h5.swmr_mode = True
+
+            # Fase 2: dados
+            for sim_name, fills in plans:
+                self._fill_simulation(h5, sim_name, fills)
+                self._done.add(sim_name)
+                if on_completed is not None:
+                    on_completed()
+            h5.attrs.modify("completed", True)
+
+    # --------------------------------------------------------------------- #
+    def _prune_hdf5(self, sim_dirs):
+        """
+        _prune_hdf5 / (method)
+        What it does:
+        Update mode. Deletes the groups of models whose folder is gone or whose fingerprint changed, loads the stored catalog of the unchanged ones into self._meta and returns the folders that still have to be written. HDF5 does not reuse the space of deleted groups, so their bytes are added to the file's 'stale_bytes' attribute. Returns None, with nothing deleted, when the file has to be rewritten from scratch instead: there is no catalog, or the stale bytes would pass REPACK_FRACTION of the file size.
+        """
+        wanted  = dict((os.path.basename(d), d) for d in sim_dirs)
+        catalog = self._load_catalog()
+        if not catalog:
+            self.logger.info("Atualização: %s sem catálogo; regravando do zero", self.h5_path)
+            return None
+
+        pending, current, removed = [], {}, []
+        with h5py.File(self.h5_path, "a") as h5:
+            for sim_name in list(h5.keys()):
+                if sim_name not in wanted and sim_name != MESHES_GROUP:
+                    self.logger.info("Removendo modelo sem pasta de origem: %s", sim_name)
+                    removed.append(sim_name)
+
+            for sim_name, sim_dir in wanted.items():
+                meta = catalog.get(sim_name)
+                if meta is not None and self._is_current(h5, sim_name, sim_dir, meta):
+                    current[sim_name] = meta
+                    continue
+                if h5.get(sim_name, getlink=True) is not None:
+                    removed.append(sim_name)
+                pending.append(sim_dir)
+
+            stale = int(h5.attrs.get(STALE_ATTR, 0)) + sum(self._stored_bytes(h5, name) for name in removed)
+            if stale > REPACK_FRACTION * os.path.getsize(self.h5_path):
+                self.logger.info("Atualização: %.1f MB de grupos apagados em %s; regravando do zero",
+                                 stale / 1024.0**2, self.h5_path)
+                return None
+            for sim_name in removed:
+                self._delete_simulation(h5, sim_name)
+            h5.attrs[STALE_ATTR] = stale
+
+        self._meta.update(current)
+        self._done.update(current)
+        return sorted(pending)
+
+    # --------------------------------------------------------------------- #
+    @staticmethod
+    def _stored_bytes(h5, name):
+        """Bytes dos datasets só deste grupo (os ligados também de fora, ex.: malhas, não contam; links externos: 0)."""
+        if isinstance(h5.get(name, getlink=True), h5py.ExternalLink):
+            return 0
+        sizes = []
+        def visit(_, obj):
+            if isinstance(obj, h5py.Dataset) and h5py.h5o.get_info(obj.id).rc == 1:
+                sizes.append(obj.id.get_storage_size())
+        try:
+            h5[name].visititems(visit)
+        except (KeyError, OSError):
+            return 0
+        return sum(sizes)
+
+    # --------------------------------------------------------------------- #
+    def _is_current(self, h5, sim_name, sim_dir, meta):
+        """O grupo existe, está completo e tem a impressão digital atual da pasta."""
+        if meta.get("h5_file") != self._h5_file_for(sim_name):
+            return False                # mudou entre arquivo único e shards
+        try:
+            attrs = h5[sim_name].attrs
+            stored, completed = attrs.get("fingerprint"), attrs.get("completed", True)
+        except (KeyError, OSError):
+            return False                # grupo ausente ou link externo quebrado
+        fingerprint = self._fingerprint(sim_dir)
+        return bool(completed) and stored == fingerprint == meta.get("fingerprint")
+
+    # --------------------------------------------------------------------- #
+    def _delete_simulation(self, h5, sim_name):
+        """Apaga o grupo (ou o link externo) do modelo e o seu shard, se houver."""
+        del h5[sim_name]
+        shard_path = os.path.join(self.shard_dir, sim_name + ".h5")
+        if os.path.exists(shard_path):
+            os.remove(shard_path)
+
+    # --------------------------------------------------------------------- #
+    def _h5_file_for(self, sim_name):
+        """Arquivo (relativo a output_dir) que guarda os dados do modelo."""
+        if self.shards:
+            return os.path.relpath(os.path.join(self.shard_dir, sim_name + ".h5"),
+                                   self.output_dir).replace(os.sep, "/")
+        return self.h5_filename
+
+    # --------------------------------------------------------------------- #
+    def _fingerprint(self, sim_dir):
+        """SHA-1 dos nomes, tamanhos e mtimes dos arquivos da pasta e das opções de armazenamento."""
+        digest = hashlib.sha1()
+        digest.update(json.dumps([self.storage, self.dataset_storage, self.previews],
+                                 sort_keys=True).encode("utf-8"))
+        for root, dirs, files in os.walk(sim_dir):
+            dirs.sort()
+            for name in sorted(files):
+                st = os.stat(os.path.join(root, name))
+                rel = os.path.relpath(os.path.join(root, name), sim_dir).replace(os.sep, "/")
+                digest.update(f"{rel}|{st.st_size}|{st.st_mtime_ns}\n".encode("utf-8"))
+        return digest.hexdigest()
+
+    # --------------------------------------------------------------------- #
+    def _load_catalog(self):
+        try:
+            with open(self.catalog_path, "r") as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _save_catalog(self):
+        """Grava o catálogo via arquivo temporário (um crash nunca o deixa pela metade)."""
+        tmp_path = self.catalog_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._meta, f, indent=1)
+        os.replace(tmp_path, self.catalog_path)
+
+    # --------------------------------------------------------------------- #
+    def _write_hdf5_shards(self, sim_dirs, mode="w"):
+        """
+        _write_hdf5_shards / (method)
+        What it does:
+        Creates (mode 'w') or updates (mode 'a') the master HDF5 with one external link per model, then writes each model into its own HDF5 file under shard_dir using worker processes. Links to shards that are not written yet simply do not resolve.
+        """
+        if not os.path.exists(self.shard_dir):
+            os.makedirs(self.shard_dir)
+
+        jobs = [(sim_dir, os.path.join(self.shard_dir, os.path.basename(sim_dir) + ".h5"))
+                for sim_dir in sim_dirs]
+        workers = min(self.workers or multiprocessing.cpu_count(), max(1, len(jobs)))
+        if multiprocessing.current_process().daemon:
+            workers = 1             # processos daemon não podem criar filhos
+
+        # Arquivo mestre: cada modelo é um link externo para o grupo no seu shard
+        with h5py.File(self.h5_path, mode) as h5:
+            h5.attrs["completed"] = False
+            for sim_dir, _ in jobs:
+                sim_name = os.path.basename(sim_dir)
+                h5[sim_name] = h5py.ExternalLink(self._h5_file_for(sim_name), "/" + sim_name)
+
+        state = dict(self.__dict__, _writer=None, _meta={}, _done=set())
+        if workers <= 1:
+            results = (_write_simulation_shard(state, sim_dir, shard_path)
+                       for sim_dir, shard_path in jobs)
+            self._collect_shards(jobs, results)
+        else:
+            self.logger.info("Gravando %d modelos em %d processos", len(jobs), workers)
+            pool = multiprocessing.Pool(workers)
+            try:
+                pending = [pool.apply_async(_write_simulation_shard, (state, sim_dir, shard_path))
+                           for sim_dir, shard_path in jobs]
+                self._collect_shards(jobs, (result.get() for result in pending))
+            finally:
+                pool.close()
+                pool.join()
+
+        with h5py.File(self.h5_path, "a") as h5:
+            h5.attrs["completed"] = True
+
+    def _collect_shards(self, jobs, results):
+        for (sim_dir, _), meta in zip(jobs, results):
+            sim_name = os.path.basename(sim_dir)
+            self._meta[sim_name] = meta
+            self._done.add(sim_name)
+            self._write_partial_xdmf()
+
+    # --------------------------------------------------------------------- #
+    def _write_simulation_file(self, sim_dir, h5_path):
+        """Um modelo num arquivo HDF5 próprio (shard); retorna a entrada do catálogo."""
+        self._write_simulations(h5_path, "w", [sim_dir])
+        return self._meta[os.path.basename(sim_dir)]
+
+    # --------------------------------------------------------------------- #
+    def _create_simulation(self, h5, sim_dir):
+        """
+        _create_simulation / (method)
+        What it does:
+        Creates the group /<model> of one model folder (geometry, topology and time series) with every dataset pre-created at its final shape and dtype, but empty. Field datasets also get their preview datasets (one per level) and placeholder min/max/mean attributes. Returns its catalog entry for the XDMF and the fill plan: a list of blocks (geometry first, then one per frame) of (dataset, npy path, slot, previews) copies, previews being None for static datasets.
+        """
+        sim_name = os.path.basename(sim_dir)
+        self.logger.info("Processando modelo: %s", sim_name)
+        fingerprint = self._fingerprint(sim_dir)      # antes de ler: mudanças durante a escrita invalidam
+        grp = h5.create_group(sim_name)
+        grp.attrs["fingerprint"] = fingerprint
+        grp.attrs["completed"]   = False
+        fills = []
+
+        # -----------------  GEOMETRIA  --------------------------- #
+        g_geo = grp.create_group("geometry")
+        coords_path = os.path.join(sim_dir, "coordinates.npy")
+        conn_path   = os.path.join(sim_dir, "connectivity.npy")
+        coords = self._np_load(coords_path)
+        conn   = self._np_load(conn_path)
+
+        # reshape conectividade => (n_elem, nodes_per_elem)
+        # nodes_per_elem = deduzido do número de colunas. Ex.: Hexa = 8
+        element_types = self._np_load(os.path.join(sim_dir,
+                                                   "element_types.npy"))
+        nodes_per_elem = int(conn.size // element_types.size)
+        conn_2d = conn.reshape((-1, nodes_per_elem))
+
+        # criada uma vez por malha distinta; geometry/ recebe hard links
+        g_mesh, mesh_fills = self._create_mesh(h5, coords, conn_2d, coords_path, conn_path)
+        g_geo["coordinates"]  = g_mesh["coordinates"]
+        g_geo["connectivity"] = g_mesh["connectivity"]
+        levels = self._create_previews(grp, g_mesh)
+
+        # -----------------  TOPOLOGIA  --------------------------- #
+        g_topo = grp.create_group("topology")
+        offsets_path = os.path.join(sim_dir, "offsets.npy")
+        offsets = self._np_load(offsets_path)
+        static = mesh_fills + [
+            (self._create_dataset(g_topo, "element_types", element_types.shape, np.uint8, flags={}),
+             os.path.join(sim_dir, "element_types.npy"), None, None),
+            (self._create_dataset(g_topo, "offsets", offsets.shape, np.int32, flags={}),
+             offsets_path, None, None)]
+
+        # Conversão por subconjunto: índices dos nós dos campos compactos
+        subset_path = os.path.join(sim_dir, "subset_node_index.npy")
+        if os.path.exists(subset_path):
+            static.append((self._create_dataset(g_geo, "subset_node_index",
+                                                self._np_load(subset_path).shape, np.int64, flags={}),
+                           subset_path, None, None))
+        fills.append(static)
+
+        # -----------------  TIME SERIES -------------------------- #
+        catalog = []            # frames na ordem em que vão para o XDMF
+        ts_src = os.path.join(sim_dir, "time_series")
+        if not os.path.exists(ts_src):
+            self.logger.warning("time_series não encontrado em %s", sim_dir)
+        else:
+            g_ts = grp.create_group("time_series")
+            stress_components = read_components(sim_dir)
+            field_components = read_field_components(sim_dir)
+            for step in sorted(os.listdir(ts_src)):
+                step_src = os.path.join(ts_src, step)
+                if not os.path.isdir(step_src):
+                    continue
+                g_step = g_ts.create_group(step)
+                index_path = os.path.join(step_src, FRAME_INDEX_FILE)
+                if os.path.exists(index_path):
+                    self._create_time_major_step(g_step, step_src, index_path, stress_components,
+                                                 catalog, fills, levels, coords.shape[0],
+                                                 field_components)
+                    continue
+                for frame in sorted(os.listdir(step_src)):
+                    frame_src = os.path.join(step_src, frame)
+                    if not os.path.isdir(frame_src):
+                        continue
+                    g_frame = g_step.create_group(frame)
+                    entry = self._catalog_frame(g_frame)
+                    frame_fills = []
+                    # Cada *.npy dentro do frame vira um DataSet
+                    for npy_file in sorted(glob.glob(os.path.join(frame_src, "*.npy"))):
+                        name  = os.path.splitext(os.path.basename(npy_file))[0]
+                        shape = self._np_load(npy_file).shape
+                        dset, previews = self._create_field(g_frame, name, shape, stress_components,
+                                                            levels, coords.shape[0], field_components)
+                        frame_fills.append((dset, npy_file, None, previews))
+                        entry["datasets"].append((name, shape))
+                    catalog.append(entry)
+                    fills.append(frame_fills)
+
+        # ----------  meta (para escrever o XDMF depois) ---------- #
+        meta = dict(
+            n_nodes         = coords.shape[0],
+            n_elems         = conn_2d.shape[0],
+            nodes_per_elem  = nodes_per_elem,
+            mesh            = os.path.basename(g_mesh.name),
+            geometry        = dict(coordinates  = g_mesh.name + "/coordinates",
+                                   connectivity = g_mesh.name + "/connectivity"),
+            frames          = catalog,
+            h5_file         = os.path.relpath(h5.filename, self.output_dir).replace(os.sep, "/"),
+            fingerprint     = fingerprint
+        )
+        return meta, fills
+
+    # --------------------------------------------------------------------- #
+    def _fill_simulation(self, h5, sim_name, fills):
+        """
+        _fill_simulation / (method)
+        What it does:
+        Second phase for one model. Queues the block copies on the background writer, flushing each block (geometry, then every frame) as soon as it is written. After the queue drains without errors it marks the model and its new meshes as completed and flushes the file.
+        """
+        for block in fills:
+            dsets = []
+            for dset, npy_path, slot, previews in block:
+                self._writer.submit(self._fill_dataset, dset, npy_path, slot, previews,
+                                    description=f"{sim_name}: {dset.name}")
+                dsets.append(dset)
+                dsets.extend(pdset for pdset, _ in previews or ())
+            self._writer.submit(self._flush_datasets, dsets, description=f"{sim_name}: flush")
+
+        # O modelo só conta como gravado depois que a fila de escrita esvaziar sem erros
+        self._writer.flush()
+        self._writer.check()
+        for dset, _, _, _ in fills[0]:
+            if dset.parent.name.startswith("/" + MESHES_GROUP + "/"):
+                dset.parent.attrs.modify("complete", True)
+        h5[sim_name].attrs.modify("completed", True)
+        h5.flush()
+
+    # --------------------------------------------------------------------- #
+    @staticmethod
+    def _flush_datasets(dsets):
+        for dset in dsets:
+            dset.flush()
+
+    # --------------------------------------------------------------------- #
+    def _create_mesh(self, h5, coords, conn_2d, coords_path, conn_path):
+        """
+        _create_mesh / (method)
+        What it does:
+        Returns the /meshes/<sha1> group for this geometry and its fill plan. Coordinates and connectivity are created, and later filled, only when no identical mesh is in the file yet or already pending in this run. A new mesh also gets its preview levels (voxel-subsampled node indices and their coordinates), written right away since they are small.
+        """
+        key = self._mesh_key(coords, conn_2d)
+        meshes = h5.require_group(MESHES_GROUP)
+        if key in meshes and (meshes[key].attrs.get("complete", False) or key in self._pending_meshes):
+            return meshes[key], []
+        if key in meshes:
+            del meshes[key]             # gravação interrompida
+        g_mesh = meshes.create_group(key)
+        g_mesh.attrs["complete"] = False
+        self._pending_meshes.add(key)
+        for factor in self.previews:
+            index = voxel_subsample(coords, factor, block_rows=max(1, int(self.copy_rows)))
+            g_level = g_mesh.create_group(PREVIEW_GROUP + "/" + level_name(factor))
+            g_level.attrs["factor"]   = factor
+            g_level.attrs["n_points"] = len(index)
+            g_level.create_dataset("node_index", data=index)
+            g_level.create_dataset("coordinates", data=np.asarray(coords[index], dtype=np.float64))
+        return g_mesh, [
+            (self._create_dataset(g_mesh, "coordinates", coords.shape, np.float64), coords_path, None, None),
+            (self._create_dataset(g_mesh, "connectivity", conn_2d.shape, np.int32), conn_path, None, None)]
+
+    # --------------------------------------------------------------------- #
+    def _create_previews(self, grp, g_mesh):
+        """
+        _create_previews / (method)
+        What it does:
+        Creates /<model>/preview/level_<f> for every preview level, with hard links to the node indices and coordinates stored with the mesh. Returns [(level group, node indices)] for the field previews.
+        """
+        levels = []
+        for factor in self.previews:
+            g_src = g_mesh[PREVIEW_GROUP][level_name(factor)]
+            g_level = grp.create_group(PREVIEW_GROUP + "/" + level_name(factor))
+            for key in ("factor", "n_points"):
+                g_level.attrs[key] = g_src.attrs[key]
+            g_level["node_index"]  = g_src["node_index"]
+            g_level["coordinates"] = g_src["coordinates"]
+            levels.append((g_level, g_src["node_index"][()]))
+        return levels
+
+    # --------------------------------------------------------------------- #
+    def _mesh_key(self, coords, conn_2d):
+        """SHA-1 da geometria como será gravada (dtype final), dos seus chunks/filtros e dos níveis de pré-visualização."""
+        digest = hashlib.sha1()
+        rows = max(1, int(self.copy_rows))
+        for name, src, dtype in (("coordinates", coords, np.float64),
+                                 ("connectivity", conn_2d, np.int32)):
+            digest.update(json.dumps([name, list(src.shape), self._flags(name, src.shape, dtype),
+                                      self.previews], sort_keys=True, default=str).encode("utf-8"))
+            for start in range(0, src.shape[0], rows):
+                digest.update(np.ascontiguousarray(src[start:start + rows], dtype=dtype).tobytes())
+        return digest.hexdigest()
+
+    # --------------------------------------------------------------------- #
+    def _prune_meshes(self, h5):
+        """Apaga de /meshes as malhas que nenhum modelo do catálogo usa mais."""
+        if MESHES_GROUP not in h5:
+            return
+        used = set(m.get("mesh") for m in self._meta.values())
+        stale = int(h5.attrs.get(STALE_ATTR, 0))
+        for key in list(h5[MESHES_GROUP].keys()):
+            if key not in used:
+                stale += self._stored_bytes(h5[MESHES_GROUP], key)
+                del h5[MESHES_GROUP][key]
+        h5.attrs[STALE_ATTR] = stale
+
+    # --------------------------------------------------------------------- #
+    @staticmethod
+    def _catalog_frame(g_frame):
+        """Entrada do catálogo de um frame: caminho no HDF5 e (nome, forma) dos datasets."""
+        return {"path": g_frame.name, "datasets": []}
+
+    # --------------------------------------------------------------------- #
+    def _flags(self, name, shape, dtype):
+        """Chunks e filtros do dataset 'name' segundo o preset e os ajustes por dataset."""
+        return dataset_options(self.storage, name, shape, np.dtype(dtype).itemsize,
+                               self.dataset_storage)
+
+    # --------------------------------------------------------------------- #
+    def _create_dataset(self, group, name, shape, dtype, flags=None):
+        """Dataset vazio com a forma e o dtype finais (preenchido depois por _fill_dataset)."""
+        if flags is None:
+            flags = self._flags(name, shape, dtype)
+        return group.create_dataset(name, shape=shape, dtype=dtype, **flags)
+
+    # --------------------------------------------------------------------- #
+    def _fill_dataset(self, dset, npy_path, slot=None, previews=None):
+        """
+        _fill_dataset / (method)
+        What it does:
+        Task of the writer thread. Fills a pre-created dataset from the memory-mapped .npy (row 'slot' of a time_major file when given) in blocks of copy_rows rows, aligned to the chunk rows. Only one block is converted in memory at a time. For fields (previews not None) it also stores the min/max/mean attributes, accumulated over the blocks, and fills the preview datasets with the rows of their node indices.
+        """
+        src = self._np_load(npy_path)
+        if slot is not None:
+            src = src[slot]
+        src = src.reshape(dset.shape)
+        if src.ndim == 0:
+            dset[()] = src
+            return
+
+        n_rows = src.shape[0]
+        rows = max(1, int(self.copy_rows))
+        if dset.chunks:
+            # blocos múltiplos do chunk: cada chunk comprimido é escrito uma única vez
+            rows = max(1, rows // dset.chunks[0]) * dset.chunks[0]
+        stats = FieldStats(dset.shape) if previews is not None else None
+        for start in range(0, n_rows, rows):
+            stop = min(start + rows, n_rows)
+            block = np.asarray(src[start:stop], dtype=dset.dtype)
+            dset[start:stop] = block
+            if stats is not None:
+                stats.update(block)
+
+        if stats is not None:
+            # atributos já criados antes do SWMR: só podem ser modificados
+            for name, value in stats.values().items():
+                dset.attrs.modify(name, value)
+            for pdset, index in previews:
+                pdset[...] = np.asarray(src[index], dtype=pdset.dtype)
+
+    # --------------------------------------------------------------------- #
+    def _create_field(self, group, name, shape, stress_components=None, levels=(), n_nodes=None,
+                      field_components=None):
+        """
+        _create_field / (method)
+        What it does:
+        Creates the float32 dataset of one field of a frame (stress_tensor and the compact fields of a subset conversion get the column order) with NaN min/max/mean attributes, filled later by _fill_dataset. Fields over all n_nodes nodes also get one preview dataset per level, at the same path under the level group. Returns (dataset, [(preview dataset, node indices)]).
+        """
+        dset = self._create_dataset(group, name, shape, np.float32)
+        self._tag_components(dset, name, stress_components, field_components)
+        for stat in STATS:
+            dset.attrs.create(stat, np.full(shape[1:], np.nan))
+
+        previews = []
+        if len(shape) and shape[0] == n_nodes:
+            rel_path = group.name.split("/", 2)[2]          # time_series/<step>/<frame>
+            for g_level, index in levels:
+                p_shape = (len(index),) + tuple(shape[1:])
+                pdset = self._create_dataset(g_level.require_group(rel_path), name, p_shape, np.float32)
+                self._tag_components(pdset, name, stress_components, field_components)
+                previews.append((pdset, index))
+        return dset, previews
+
+    # --------------------------------------------------------------------- #
+    @staticmethod
+    def _tag_components(dset, name, stress_components=None, field_components=None):
+        """Declara a ordem das colunas no atributo 'components' (stress_tensor e campos compactos)."""
+        if name == "stress_tensor":
+            components = stress_components or components_for(dset.shape[-1])
+        else:
+            components = (field_components or {}).get(name)
+            if not components or len(dset.shape) < 2 or len(components) != dset.shape[-1]:
+                return
+        dset.attrs["components"] = " ".join(components)
+
+    # --------------------------------------------------------------------- #
+    def _create_time_major_step(self, g_step, step_src, index_path, stress_components,
+                                catalog, fills, levels=(), n_nodes=None, field_components=None):
+        """
+        _create_time_major_step / (method)
+        What it does:
+        Creates the per-frame HDF5 groups of a step stored in the 'time_major' layout (one [n_frames, n_nodes, k] memmap per field plus a frames.json sidecar). Appends their catalog entries and fill blocks, one (dataset, npy path, slot, previews) copy per field.
+        """
+        with open(index_path, "r") as f:
+            index = json.load(f)
+
+        fields = {}
+        for npy_file in sorted(glob.glob(os.path.join(step_src, "*.npy"))):
+            name = os.path.splitext(os.path.basename(npy_file))[0]
+            fields[name] = (npy_file, self._np_load(npy_file).shape[1:])
+
+        for meta in sorted(index.get("frames", []), key=lambda m: m["frame_index"]):
+            g_frame = g_step.create_group(meta["name"])
+            g_frame.attrs["step_time"] = meta.get("step_time", 0.0)
+            entry = self._catalog_frame(g_frame)
+            frame_fills = []
+            for name, (npy_file, shape) in fields.items():
+                dset, previews = self._create_field(g_frame, name, shape, stress_components, levels, n_nodes,
+                                                    field_components)
+                frame_fills.append((dset, npy_file, meta["slot"], previews))
+                entry["datasets"].append((name, shape))
+            catalog.append(entry)
+            fills.append(frame_fills)
 
     # --------------------------------------------------------------------- #
     # ---------------------------  X D M F  --------------------------------#
     # --------------------------------------------------------------------- #
-    def _write_xdmf(self):
+    def _write_partial_xdmf(self):
+        """XDMF só com os modelos já completos, para o ParaView abrir durante a conversão."""
+        self._write_xdmf(sorted(self._done))
+
+    # --------------------------------------------------------------------- #
+    def _write_xdmf(self, sim_names=None):
         """
         _write_xdmf / (method)
         What it does:
-        Uses metadata from self._meta to build a temporal XDMF file for each model, referencing the HDF5 datasets.
+        Streams a temporal XDMF grid per model (all of them, or only sim_names) built only from the catalog recorded by _write_hdf5 (no HDF5 reopening, no DOM). The file is replaced atomically, so a reader never sees it half written.
         """
-        xdmf = Element("Xdmf", Version="3.0")
-        domain = SubElement(xdmf, "Domain")
-
-        # Cada modelo recebe um Grid temporal:
-        for sim_name, m in self._meta.items():
-            g_time = SubElement(domain, "Grid",
-                                Name            = f"{sim_name}_TimeSeries",
-                                GridType        = "Collection",
-                                CollectionType  = "Temporal")
-            # Descobre quantos steps/frames há percorrendo o HDF5
-            with h5py.File(self.h5_path, "r") as h5:
-                ts_grp = h5[sim_name]["time_series"]
-                steps = list(ts_grp.keys())
-
-                time_counter = 0
-                for s_name in steps:
-                    frames = list(ts_grp[s_name].keys())
-                    for f_name in frames:
-                        # Grid uniforme para este frame ------------------ #
-                        g = SubElement(g_time, "Grid",
-                                       Name=f"{sim_name}_{s_name}_{f_name}",
-                                       GridType="Uniform")
-
-                        SubElement(g, "Time",
-                                   Value=str(time_counter))
-                        time_counter += 1
-
-                        # ----------- Topologia ------------------------- #
-                        topo_type = "Hexahedron" if m["nodes_per_elem"] == 8 else \
-                                    "Tetrahedron" if m["nodes_per_elem"] == 4 else "Polyvertex"
-                        topo = SubElement(g, "Topology",
-                                          TopologyType=topo_type,
-                                          NumberOfElements=str(m["n_elems"]))
-                        SubElement(topo, "DataItem",
-                                   Dimensions=f"{m['n_elems']} {m['nodes_per_elem']}",
-                                   NumberType="Int",
-                                   Precision="4",
-                                   Format="HDF").text = \
-                            f"{os.path.basename(self.h5_path)}:/{sim_name}/geometry/connectivity"
-
-                        # ------------- Geometria ----------------------- #
-                        geo = SubElement(g, "Geometry", GeometryType="XYZ")
-                        SubElement(geo, "DataItem",
-                                   Dimensions=f"{m['n_nodes']} 3",
-                                   NumberType="Float",
-                                   Precision=str(self.precision_coord),
-                                   Format="HDF").text = \
-                            f"{os.path.basename(self.h5_path)}:/{sim_name}/geometry/coordinates"
-
-                        # ------------- Atributos (campo) --------------- #
-                        frame_path = f"/{sim_name}/time_series/{s_name}/{f_name}"
-                        with h5py.File(self.h5_path, "r") as h5:
-                            for attr_name, dset in h5[frame_path].items():
-                                if dset.ndim == 2 and dset.shape[1] == 3:
-                                    att_type = "Vector"
-                                    dims     = f"{m['n_nodes']} 3"
-                                    prec     = self.precision_data
-                                elif dset.ndim == 2 and dset.shape[1] == 9:
-                                    att_type = "Tensor6"   # para ParaView o campo é tensor
-                                    dims     = f"{m['n_nodes']} 9"
-                                    prec     = self.precision_data
-                                else:                       # escalares
-                                    att_type = "Scalar"
-                                    dims     = f"{m['n_nodes']}"
-                                    prec     = self.precision_data
-
-                                att = SubElement(g, "Attribute",
-                                                 Name=attr_name,
-                                                 AttributeType=att_type,
-                                                 Center="Node")
-                                SubElement(att, "DataItem",
-                                           Dimensions=dims,
-                                           NumberType="Float",
-                                           Precision=str(prec),
-                                           Format="HDF").text = \
-                                    f"{os.path.basename(self.h5_path)}:{frame_path}/{attr_name}"
-
-        # -------------- pretty print + grava ------------------------------ #
-        xml_str = tostring(xdmf, 'utf-8')
-        reparsed = minidom.parseString(xml_str)
-        pretty   = reparsed.toprettyxml(indent="  ")
-
-        with open(self.xdmf_path, "w", encoding="utf-8") as f:
-            f.write(pretty)
+        if sim_names is None:
+            sim_names = list(self._meta)
+        tmp_path = self.xdmf_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            xml = _XmlStream(f)
+            xml.open("Xdmf", Version="3.0")
+            xml.open("Domain")
+
+            # Cada modelo recebe um Grid temporal:
+            for sim_name in sim_names:
+                m = self._meta[sim_name]
+                xml.open("Grid", Name=f"{sim_name}_TimeSeries",
+                         GridType="Collection", CollectionType="Temporal")
+
+                h5_name   = m["h5_file"]       # S_batch.h5 ou o shard do modelo
+                topo_type = "Hexahedron" if m["nodes_per_elem"] == 8 else \
+                            "Tetrahedron" if m["nodes_per_elem"] == 4 else "Polyvertex"
+
+                for time_counter, frame in enumerate(m["frames"]):
+                    # Grid uniforme para este frame ------------------ #
+                    s_name, f_name = frame["path"].split("/")[-2:]
+                    xml.open("Grid", Name=f"{sim_name}_{s_name}_{f_name}", GridType="Uniform")
+                    xml.leaf("Time", Value=str(time_counter))
+
+                    # ----------- Topologia ------------------------- #
+                    xml.open("Topology", TopologyType=topo_type, NumberOfElements=str(m["n_elems"]))
+                    xml.leaf("DataItem", f"{h5_name}:{m['geometry']['connectivity']}",
+                             Dimensions=f"{m['n_elems']} {m['nodes_per_elem']}",
+                             NumberType="Int", Precision="4", Format="HDF")
+                    xml.close()
+
+                    # ------------- Geometria ----------------------- #
+                    xml.open("Geometry", GeometryType="XYZ")
+                    xml.leaf("DataItem", f"{h5_name}:{m['geometry']['coordinates']}",
+                             Dimensions=f"{m['n_nodes']} 3", NumberType="Float",
+                             Precision=str(self.precision_coord), Format="HDF")
+                    xml.close()
+
+                    # ------------- Atributos (campo) --------------- #
+                    for attr_name, shape in frame["datasets"]:
+                        if shape[0] != m['n_nodes']:
+                            # campos compactos (subconjunto) não mapeiam na malha inteira
+                            continue
+                        att_type, dims = self._attribute_type(m['n_nodes'], shape)
+                        xml.open("Attribute", Name=attr_name, AttributeType=att_type, Center="Node")
+                        xml.leaf("DataItem", f"{h5_name}:{frame['path']}/{attr_name}",
+                                 Dimensions=dims, NumberType="Float",
+                                 Precision=str(self.precision_data), Format="HDF")
+                        xml.close()
+
+                    xml.close()         # Grid do frame
+                xml.close()             # Grid temporal
+            xml.close()                 # Domain
+            xml.close()                 # Xdmf
+        os.replace(tmp_path, self.xdmf_path)
+
+    # --------------------------------------------------------------------- #
+    @staticmethod
+    def _attribute_type(n_nodes, shape):
+        """AttributeType e Dimensions do XDMF para um dataset [n_nodes, k]."""
+        if len(shape) == 2 and shape[1] == 3:
+            return "Vector", f"{n_nodes} 3"
+        if len(shape) == 2 and shape[1] == 9:
+            return "Tensor", f"{n_nodes} 9"       # 3x3 completo
+        if len(shape) == 2 and shape[1] == 6:
+            return "Tensor6", f"{n_nodes} 6"      # simétrico: S11 S12 S13 S22 S23 S33
+        return "Scalar", f"{n_nodes}"             # escalares
 
     # --------------------------------------------------------------------- #
     def convert(self):
@@ -349,6 +930,42 @@ class Npy2XdmfConverter(object):
         self._write_xdmf()
         self.logger.info("Conversão concluída!")
 
+def _write_simulation_shard(state, sim_dir, shard_path):
+    """Ponto de entrada de cada processo de shard (função de módulo para o multiprocessing)."""
+    converter = Npy2XdmfConverter.__new__(Npy2XdmfConverter)
+    converter.__dict__.update(state)
+    return converter._write_simulation_file(sim_dir, shard_path)
+
+# -----------------------------------------------------------------------------#
+# Escrita de XML em fluxo (indentação de 2 espaços, sem montar o documento)
+# -----------------------------------------------------------------------------#
+class _XmlStream(object):
+    def __init__(self, f, indent="  "):
+        self.f      = f
+        self.indent = indent
+        self.stack  = []
+        f.write('<?xml version="1.0" encoding="utf-8"?>\n')
+
+    @staticmethod
+    def _attrs(attrs):
+        return "".join(f" {k}={quoteattr(str(v))}" for k, v in attrs.items())
+
+    def open(self, tag, **attrs):
+        self.f.write(f"{self.indent * len(self.stack)}<{tag}{self._attrs(attrs)}>\n")
+        self.stack.append(tag)
+
+    def leaf(self, tag, text=None, **attrs):
+        pad = self.indent * len(self.stack)
+        if text is None:
+            self.f.write(f"{pad}<{tag}{self._attrs(attrs)}/>\n")
+        else:
+            self.f.write(f"{pad}<{tag}{self._attrs(attrs)}>{escape(text)}</{tag}>\n")
+
+    def close(self):
+        tag = self.stack.pop()
+        self.f.write(f"{self.indent * len(self.stack)}</{tag}>\n")
+
+
 # -----------------------------------------------------------------------------#
 # (3) BATCH CONVERTER – estilo dos outros scripts
 # -----------------------------------------------------------------------------#
@@ -375,7 +992,16 @@ class NpyBatchToXdmfConverter(object):
         conv = Npy2XdmfConverter(self.input_dir,
                                  self.output_dir,
                                  h5_filename="S_batch.h5",
-                                 compression=self.options.get("hdf5_compression", True))
+                                 compression=self.options.get("hdf5_compression", True),
+                                 max_pending_writes=self.options.get("max_pending_writes", 2),
+                                 shards=self.options.get("hdf5_shards", False),
+                                 workers=self.options.get("hdf5_workers"),
+                                 storage=self.options.get("hdf5_storage", "default"),
+                                 dataset_storage=self.options.get("hdf5_datasets"),
+                                 copy_rows=self.options.get("hdf5_copy_rows", 65536),
+                                 update=self.options.get("hdf5_update", False),
+                                 swmr=self.options.get("hdf5_swmr", True),
+                                 previews=self.options.get("hdf5_previews", DEFAULT_LEVELS))
         conv.convert()
 
 
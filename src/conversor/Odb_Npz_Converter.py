@@ -11,15 +11,54 @@ Estrutura dos arquivos gerados:
         connectivity.npy        # Array achatada de conectividade
         element_types.npy       # Array [n_elements]
         offsets.npy             # Offsets para conectividade
+        stress_components.json  # ordem das colunas de stress_tensor (Stress_Layout.py)
         time_series/
             step_X_nome/
                 frame_Y/
                     displacement.npy    # [n_nodes, 3]
-                    stress_tensor.npy   # [n_nodes, 9]
+                    stress_tensor.npy   # [n_nodes, 9] (ou [n_nodes, 6] com stress_storage='voigt')
                     von_mises.npy       # [n_nodes]
                     max_principal.npy   # [n_nodes]
                     min_principal.npy   # [n_nodes]
 
+Com layout='time_major' cada step guarda um único array memmap por campo,
+pré-alocado com todos os frames do intervalo:
+        time_series/
+            step_X_nome/
+                displacement.npy        # [n_frames, n_nodes, 3]
+                stress_tensor.npy       # [n_frames, n_nodes, 9 ou 6]
+                von_mises.npy           # [n_frames, n_nodes]
+                max_principal.npy       # [n_frames, n_nodes]
+                min_principal.npy       # [n_frames, n_nodes]
+                frames.json             # metadados: slot, frame, nome, step_time
+
+Com convert(shards=N) a geometria é extraída uma vez e os frames de cada step
+são divididos em N janelas contíguas, processadas em paralelo por processos que
+abrem o ODB somente leitura e gravam em pastas/slots disjuntos; ao final todos
+os frames são conferidos (e o frames.json do 'time_major' é reescrito).
+
+Gravação: os arquivos de cada frame são gravados por uma thread em segundo
+plano (Background_Writer.py) enquanto o próximo frame é lido do ODB, com no
+máximo max_pending_writes frames em trânsito; falhas de gravação fazem
+convert() retornar False ao final.
+
+Retomada: conversion_manifest.json (ver Conversion_Manifest.py) registra o ODB
+(caminho, tamanho, mtime), as opções e o checksum de cada frame gravado. Com
+resume=True (padrão) um ODB inalterado já convertido é pulado e uma conversão
+interrompida continua dos frames que faltam; frames cujo conteúdo em disco não
+confere com o checksum são refeitos.
+
+Subconjunto (fields / node_set / bbox / plane): apenas os componentes pedidos
+(ex.: fields='S:S33,U:U3') nos nós da região escolhida são lidos, via
+getSubset(region=...) antes dos bulkDataBlocks. Cada frame grava então um
+array compacto por campo ('S.npy' [n_subset, k], ...) e a raiz recebe:
+        subset_node_index.npy   # [n_subset] índices em coordinates.npy
+        subset_fields.json      # ordem das colunas de cada campo
+
+Se os blocos de S não trazem mises/maxPrincipal/minPrincipal, os invariantes
+são calculados do tensor médio (Stress_Invariants.py, que também serve de
+pós-processamento sobre stress_tensor.npy já gravados).
+
 Os dados de tensões são filtrados: se o valor de von Mises for inferior ao threshold (default: 1e-6),
 os valores de tensões (tensor, máximo e mínimo) são zerados.
 
@@ -33,17 +72,25 @@ Uso:
          instances='all',
          stress_threshold=1e-6,
          batch_size=1000,
-         compression=True
+         compression=True,
+         layout='frames'          # ou 'time_major'
     )
     converter.convert()
 """
 
 from __future__ import print_function
 import os, sys, time, gc
+import multiprocessing
 import numpy as np
 from odbAccess import *  # Disponibiliza constantes como ELEMENT_NODAL, INTEGRATION_POINT, etc.
 import re
+import json
 from numpy.lib.format import open_memmap   # já vem com NumPy
+from Conversion_Manifest import (load_manifest, save_manifest, new_manifest,
+                                 manifest_matches, frame_checksum, frame_paths, outputs_exist)
+from Stress_Invariants import tensor_invariants, DEFAULT_CHUNK as INVARIANT_CHUNK
+from Stress_Layout import STORAGES as STRESS_STORAGES, ABAQUS_TO_VOIGT, SUBSET_FIELDS_FILE, write_components
+from Background_Writer import BackgroundWriter
 
 try:    xrange
 except  NameError: xrange = range
@@ -51,7 +98,10 @@ except  NameError: xrange = range
 class OdbToNPYConverter(object):
     def __init__(self, odb_path, odb_name, output_path, mesh_type, 
                  steps='all', instances='all', stress_threshold=1e-6,
-                 batch_size=1000, compression=True, begin_frame='-1', end_frame='-1'):
+                 batch_size=1000, compression=True, begin_frame='-1', end_frame='-1',
+                 accumulation='vectorized', layout='frames',
+                 fields=None, node_set=None, bbox=None, plane=None, resume=True,
+                 stress_storage='full', max_pending_writes=2):
 
         self.odb_path           = odb_path
         self.odb_name           = odb_name
@@ -64,6 +114,28 @@ class OdbToNPYConverter(object):
         self.compression        = compression
         self.begin_frame        = begin_frame
         self.end_frame          = end_frame
+        # 'vectorized' (scatter-add por bloco) ou 'loop' (referência nó a nó)
+        self.accumulation       = accumulation
+        # 'frames' (uma pasta por frame) ou 'time_major' (memmap por campo e step)
+        self.layout             = layout
+        # Subconjunto: campos/componentes e região (nset, bbox ou plano)
+        self.fields             = self._parse_field_selection(fields)
+        self.node_set           = node_set
+        self.bbox               = bbox      # (xmin, ymin, zmin, xmax, ymax, zmax)
+        self.plane              = plane     # (eixo, valor, tolerância), ex.: ('z', 0.0, 1e-6)
+        self._subset            = None
+        # Planos de médias por campo ('U', 'S'), construídos no primeiro frame
+        self._plans             = {}
+        # 'full' (stress_tensor [n, 9]) ou 'voigt' ([n, 6], ordem em Stress_Layout)
+        if stress_storage not in STRESS_STORAGES:
+            raise ValueError("stress_storage must be one of {}".format(sorted(STRESS_STORAGES)))
+        self.stress_storage     = stress_storage
+        # Gravação em segundo plano: frames em trânsito (0 = gravação síncrona)
+        self.max_pending_writes = max_pending_writes
+        self._writer            = None
+        # Manifesto (conversion_manifest.json): pula ODBs/frames já convertidos
+        self.resume             = resume
+        self._manifest          = None
 
         if self.mesh_type == 12:
             self.mesh_conner = 8
@@ -75,13 +147,16 @@ class OdbToNPYConverter(object):
             print("Mesh type error or unidentified")
             sys.exit(0)
 
-    def convert(self):
+    def convert(self, shards=1):
         """
         Executa o processo completo de conversão:
           1. Abre o arquivo ODB
           2. Extrai a geometria e a topologia (de todas as instâncias selecionadas)
           3. Processa os dados temporais (steps e frames)
           4. Salva os dados em arquivos .npy separados por tipo e frame
+        Com shards > 1 os frames de cada step são divididos entre processos
+        (a geometria continua sendo extraída uma única vez).
+        Retorna True se a conversão terminou sem erro.
         """
         start_time = time.time()
         print("=== ODB TO NPY CONVERSION ===")
@@ -94,35 +169,147 @@ class OdbToNPYConverter(object):
         odb_full_path = os.path.join(self.odb_path, self.odb_name) + '.odb'
         if not os.path.exists(odb_full_path):
             print("ERROR: ODB file not found: {}".format(odb_full_path))
-            return
+            return False
         
+        if self._load_resume_state(odb_full_path):
+            print("Output is up to date with the ODB and options, skipping")
+            return True
+
         odb = openOdb(odb_full_path, readOnly=True)
         print("ODB opened successfully")
-
+        self._plans = {}
+        self._writer = BackgroundWriter(self.max_pending_writes, name="npy-writer")
         
         try:
             # 1) Extrai a geometria e topologia agregando os dados das instâncias selecionadas
             geom_data = self._extract_geometry(odb)
             print("Geometry extracted: total nodes = {}".format(geom_data["global_node_count"]))
+
+            n_nodes, instance_mapping = geom_data["global_node_count"], geom_data["instance_mapping"]
+            self._subset = None
+            if self._subset_requested():
+                self._subset = self._select_subset(odb, geom_data)
+                n_nodes, instance_mapping = self._subset["node_count"], self._subset["instance_mapping"]
+                print("Subset selected: {} nodes, fields = {}".format(n_nodes, self._subset["fields"] or "all"))
             
             # 2) Salva geometria e topologia imediatamente
             self._save_geometry_topology(geom_data)
+            write_components(self.output_path, self.stress_storage)
             print("Geometry and topology saved")
             
             # 3) Processa os dados temporais em chunks - não mantém tudo em memória
-            self._process_temporal_data_optimized(odb, geom_data["global_node_count"],
-                                                 geom_data["instance_mapping"])
+            if int(shards) > 1:
+                self._process_temporal_data_sharded(odb, odb_full_path, int(shards), n_nodes,
+                                                    instance_mapping, geom_data["instance_mapping"])
+            else:
+                self._process_temporal_data_optimized(odb, n_nodes, instance_mapping)
+
+            # Espera as gravações pendentes; falhas da thread de escrita aparecem aqui
+            self._writer.close()
             print("Temporal data processed and saved")
+
+            self._manifest["complete"] = True
+            self._manifest["completed_at"] = time.time()
+            save_manifest(self.output_path, self._manifest)
+            return True
             
         except Exception as e:
             print("General error in conversion: {}".format(str(e)))
+            return False
         finally:
+            self._writer.close(raise_errors=False)
+            self._writer = None
             try:
                 odb.close()
             except:
                 pass
             print("\nTotal time: {:.2f}s".format(time.time() - start_time))
 
+    # ------------------------------------------------------------------
+    # Manifesto: retomada de conversões e ODBs já convertidos
+    # ------------------------------------------------------------------
+    def _manifest_options(self):
+        """Opções que mudam o conteúdo da saída (uma mudança força reconversão)."""
+        return {"mesh_type": self.mesh_type, "steps": self.steps, "instances": self.instances,
+                "stress_threshold": self.stress_threshold, "begin_frame": self.begin_frame,
+                "end_frame": self.end_frame, "layout": self.layout, "fields": self.fields,
+                "node_set": self.node_set, "bbox": self.bbox, "plane": self.plane,
+                "stress_storage": self.stress_storage}
+
+    def _load_resume_state(self, odb_full_path):
+        """
+        Carrega o manifesto da saída se ele corresponde ao ODB e às opções atuais
+        (senão começa um novo). Retorna True se a conversão já estava completa e
+        as saídas registradas ainda existem e conferem com os checksums; se algo
+        falta ou mudou, segue como retomada (os frames intactos são mantidos).
+        """
+        options = self._manifest_options()
+        manifest = load_manifest(self.output_path) if self.resume else None
+        if manifest_matches(manifest, odb_full_path, options):
+            self._manifest = manifest
+            if manifest.get("complete"):
+                if self._outputs_intact():
+                    return True
+                print("Recorded outputs are missing or changed, resuming conversion")
+                manifest["complete"] = False
+                save_manifest(self.output_path, manifest)
+            print("Resuming conversion: {} frames already recorded".format(len(manifest["frames"])))
+        else:
+            manifest = new_manifest(odb_full_path, options)
+            save_manifest(self.output_path, manifest)
+        self._manifest = manifest
+        return False
+
+    @staticmethod
+    def _frame_key(step_dir, meta):
+        return "{}/{}".format(os.path.basename(step_dir), meta["name"])
+
+    @staticmethod
+    def _frame_record(meta, results):
+        return {"meta": meta, "fields": sorted(results), "checksum": frame_checksum(results)}
+
+    def _record_frame(self, step_dir, record):
+        """Registra um frame gravado; o manifesto é reescrito a cada frame."""
+        self._manifest["frames"][self._frame_key(step_dir, record["meta"])] = record
+        save_manifest(self.output_path, self._manifest)
+
+    def _record_intact(self, key, record):
+        """True se os arrays de um frame registrado existem e conferem com o checksum."""
+        paths = frame_paths(self.output_path, key, record, self.layout)
+        slot = record["meta"]["slot"]
+        try:
+            if self.layout == 'time_major':
+                arrays = dict((name, np.load(path, mmap_mode='r')[slot])
+                              for name, path in zip(record["fields"], paths))
+            else:
+                arrays = dict((name, np.load(path)) for name, path in zip(record["fields"], paths))
+        except (IOError, OSError, ValueError, IndexError):
+            return False
+        return frame_checksum(arrays) == record["checksum"]
+
+    def _outputs_intact(self):
+        """Geometria presente e todos os frames do manifesto conferindo com o checksum."""
+        if not outputs_exist(self.output_path, self._manifest):
+            return False
+        return all(self._record_intact(key, record)
+                   for key, record in self._manifest["frames"].items())
+
+    def _completed_frames(self, step):
+        """
+        Frames do step já registrados no manifesto cujo conteúdo em disco ainda
+        confere com o checksum. Retorna {slot: meta}; os demais são refeitos.
+        """
+        done = {}
+        for slot, f_idx in enumerate(step["frames"]):
+            meta = {"name": 'frame_{:03d}'.format(f_idx + 1)}
+            key = self._frame_key(step["dir"], meta)
+            record = self._manifest["frames"].get(key)
+            if record is None or record["meta"]["slot"] != slot:
+                continue
+            if self._record_intact(key, record):
+                done[slot] = record["meta"]
+        return done
+
     def _save_geometry_topology(self, geom_data):
         """Salva geometria e topologia imediatamente após extração."""
         np.save(os.path.join(self.output_path, 'coordinates.npy'),
@@ -260,81 +447,328 @@ class OdbToNPYConverter(object):
         """
         Extrai os dados de geometria e topologia agregando os nós e conectividade
         de todas as instâncias selecionadas.
+
+        Tudo é lido para arrays pré-alocados; o mapeamento label -> índice global
+        fica em arrays (labels + tabela densa) reaproveitados por todos os frames.
         """
         rootassembly = odb.rootAssembly
         instances_obj = rootassembly.instances
         available_instances = list(instances_obj.keys())
         instance_indices = self._get_indices_to_process(self.instances, available_instances, "instance")
-        
-        global_coords = []
+
+        selected = [available_instances[idx] for idx in instance_indices]
+        total_nodes = sum(len(instances_obj[name].nodes) for name in selected)
+
+        global_coords = np.empty((total_nodes, 3), dtype=np.float64)
         connectivity = []
-        element_types = []
-        offsets = []
         instance_mapping = {}
-        element_counter = 0
         current_global_node_count = 0
-        
-        for idx in instance_indices:
-            inst_name = available_instances[idx]
+
+        for inst_name in selected:
             inst_obj = instances_obj[inst_name]
             nodes = inst_obj.nodes
-            
-            # CORREÇÃO: Criar mapeamento correto label->índice
-            node_map = {}
-            node_labels = []  # Lista ordenada dos labels desta instância
-            
-            for node in nodes:
-                global_coords.append(node.coordinates)
-                node_map[node.label] = current_global_node_count
-                node_labels.append(node.label)
-                current_global_node_count += 1
-                
+            n_nodes = len(nodes)
+            global_start = current_global_node_count
+
+            # Labels e coordenadas direto nos arrays (sem dict por nó)
+            node_labels = np.empty(n_nodes, dtype=np.int64)
+            inst_coords = global_coords[global_start:global_start + n_nodes]
+            for i, node in enumerate(nodes):
+                node_labels[i] = node.label
+                inst_coords[i] = node.coordinates
+            current_global_node_count += n_nodes
+
+            node_lookup = self._build_node_lookup(node_labels, global_start)
             instance_mapping[inst_name] = {
-                "node_mapping": node_map,
-                "node_count": len(nodes),
-                "global_start": current_global_node_count - len(nodes),
-                "node_labels": node_labels  # ADICIONAR: lista dos labels reais
+                "node_count": n_nodes,
+                "global_start": global_start,
+                "node_labels": node_labels,   # labels reais, na ordem global
+                "node_lookup": node_lookup    # tabela densa label -> índice global
             }
-            
-            # Processa elementos usando o mapeamento correto
-            elements = inst_obj.elements
-            for elem in elements:
-                conn = elem.connectivity
-                if len(conn) < self.mesh_conner:
-                    continue
-                mapped = [node_map[nlabel] for nlabel in conn[:self.mesh_conner]]
-                
-                connectivity.extend(mapped)
-                element_types.append(self.mesh_type)
-                element_counter += 1
-                offsets.append(element_counter * self.mesh_conner)
-        
+
+            # Conectividade em labels -> remapeada de uma vez pela tabela
+            conn_labels = self._read_connectivity_labels(inst_obj.elements)
+            if conn_labels.size == 0:
+                continue
+
+            mapped = self._lookup_indices(node_lookup, conn_labels)
+            if np.any(mapped < 0):
+                missing = np.unique(conn_labels[mapped < 0])
+                raise KeyError("Instance {}: connectivity references unknown node labels {}".format(
+                    inst_name, missing[:10].tolist()))
+            connectivity.append(mapped)
+
+        if connectivity:
+            connectivity = np.concatenate(connectivity, axis=0)
+        else:
+            connectivity = np.empty((0, self.mesh_conner), dtype=np.int64)
+        n_elements = connectivity.shape[0]
+
         return {
-            "coordinates": np.array(global_coords, dtype=np.float64),
-            "connectivity": np.array(connectivity, dtype=np.int32),
-            "element_types": np.array(element_types, dtype=np.uint8),
-            "offsets": np.array(offsets, dtype=np.int32),
+            "coordinates": global_coords,
+            "connectivity": connectivity.astype(np.int32).ravel(),
+            "element_types": np.full(n_elements, self.mesh_type, dtype=np.uint8),
+            "offsets": (np.arange(1, n_elements + 1, dtype=np.int32) * self.mesh_conner),
             "global_node_count": current_global_node_count,
             "instance_mapping": instance_mapping
         }
 
+    def _read_connectivity_labels(self, elements):
+        """
+        Lê a conectividade (em labels de nó) para um array [n_elem, mesh_conner].
+        Elementos com menos nós que mesh_conner são ignorados; os demais são
+        truncados nos primeiros mesh_conner nós.
+        """
+        conn_labels = np.empty((len(elements), self.mesh_conner), dtype=np.int64)
+        n_valid = 0
+        for elem in elements:
+            conn = elem.connectivity
+            if len(conn) < self.mesh_conner:
+                continue
+            conn_labels[n_valid] = conn[:self.mesh_conner]
+            n_valid += 1
+        return conn_labels[:n_valid]
 
-    def _process_temporal_data_optimized(self, odb, global_node_count, instance_mapping):
+
+    @staticmethod
+    def _build_node_lookup(node_labels, global_start):
         """
-        Processa os dados temporais de forma otimizada:
-        1. Cache dos dados de campo para evitar múltiplos acessos
-        2. Processamento em chunks para economizar memória
-        3. Salvamento imediato de cada frame
+        Constrói uma tabela densa label -> índice global (int64).
+        Posições sem nó recebem -1.
+        """
+        labels = np.asarray(node_labels, dtype=np.int64)
+        if labels.size == 0:
+            return np.full(1, -1, dtype=np.int64)
+
+        lookup = np.full(int(labels.max()) + 1, -1, dtype=np.int64)
+        lookup[labels] = np.arange(global_start, global_start + labels.size, dtype=np.int64)
+        return lookup
+
+    @staticmethod
+    def _lookup_indices(lookup, block_labels):
+        """
+        Converte os labels de um bloco em índices globais através da tabela densa.
+        Labels fora da tabela (ou sem nó) retornam -1.
+        """
+        labels = np.asarray(block_labels, dtype=np.int64)
+        idx = np.full(labels.shape, -1, dtype=np.int64)
+        inside = (labels >= 0) & (labels < lookup.shape[0])
+        idx[inside] = lookup[labels[inside]]
+        return idx
+
+    # ------------------------------------------------------------------
+    # Subconjunto de campos e região
+    # ------------------------------------------------------------------
+    SUBSET_SET_NAME = "NPY_CONVERTER_SUBSET"
+    # Invariantes aceitos em 'fields' -> atributo do bulkDataBlock
+    INVARIANT_ATTRS = {"MISES": "mises", "MAXPRINCIPAL": "maxPrincipal", "MINPRINCIPAL": "minPrincipal"}
+
+    @staticmethod
+    def _parse_field_selection(fields):
+        """
+        Converte 'S:S33,U:U3' (ou lista ['S:S33', 'U']) em
+        [(campo, [componentes])]; lista vazia de componentes = todos.
+        """
+        if not fields:
+            return None
+        items = fields.split(",") if hasattr(fields, "split") else fields
+
+        selection = []
+        for item in items:
+            item = item.strip()
+            if not item:
+                continue
+            key, _, comp = item.partition(":")
+            key, comp = key.strip(), comp.strip()
+            for sel_key, comps in selection:
+                if sel_key == key:
+                    break
+            else:
+                comps = []
+                selection.append((key, comps))
+            if comp and comp not in comps:
+                comps.append(comp)
+        return selection or None
+
+    def _subset_requested(self):
+        return (self.fields is not None or self.node_set is not None or
+                self.bbox is not None or self.plane is not None)
+
+    def _select_subset(self, odb, geom_data):
+        """
+        Resolve a região pedida em índices globais e monta um mapeamento
+        label -> índice compacto por instância. Para bbox/plano cria (em memória)
+        um node set no ODB para usar em getSubset(region=...).
+        """
+        coords = geom_data["coordinates"]
+        instance_mapping = geom_data["instance_mapping"]
+        region = None
+
+        if self.node_set is not None:
+            region, labels_by_inst = self._find_node_set(odb, self.node_set)
+            selected = [self._lookup_indices(instance_mapping[name]["node_lookup"], labels)
+                        for name, labels in labels_by_inst.items() if name in instance_mapping]
+            node_index = np.unique(np.concatenate(selected)) if selected else np.empty(0, np.int64)
+            node_index = node_index[node_index >= 0]
+        elif self.bbox is not None or self.plane is not None:
+            mask = np.ones(coords.shape[0], dtype=bool)
+            if self.bbox is not None:
+                lo = np.asarray(self.bbox[:3], dtype=np.float64)
+                hi = np.asarray(self.bbox[3:], dtype=np.float64)
+                mask &= np.all((coords >= lo) & (coords <= hi), axis=1)
+            if self.plane is not None:
+                axis, value, tol = self.plane
+                axis = "xyz".index(str(axis).lower())
+                mask &= np.abs(coords[:, axis] - float(value)) <= float(tol)
+            node_index = np.flatnonzero(mask)
+            region = self._create_node_set(odb, node_index, instance_mapping)
+        else:
+            node_index = np.arange(coords.shape[0], dtype=np.int64)
+
+        # label -> índice compacto, por instância
+        compact = np.full(coords.shape[0], -1, dtype=np.int64)
+        compact[node_index] = np.arange(node_index.size, dtype=np.int64)
+        subset_mapping = {}
+        for name, inst_map in instance_mapping.items():
+            lookup = inst_map["node_lookup"]
+            sub_lookup = np.full(lookup.shape, -1, dtype=np.int64)
+            has_node = lookup >= 0
+            sub_lookup[has_node] = compact[lookup[has_node]]
+            subset_mapping[name] = {"node_lookup": sub_lookup}
+
+        np.save(os.path.join(self.output_path, "subset_node_index.npy"), node_index.astype(np.int64))
+        with open(os.path.join(self.output_path, SUBSET_FIELDS_FILE), "w") as f:
+            json.dump({"fields": [{"name": key, "components": comps}
+                                  for key, comps in (self.fields or (("U", []), ("S", [])))],
+                       "node_count": int(node_index.size)}, f, indent=1)
+
+        return {
+            "node_index": node_index,
+            "node_count": int(node_index.size),
+            "instance_mapping": subset_mapping,
+            "region": region,
+            "fields": self.fields
+        }
+
+    @staticmethod
+    def _find_node_set(odb, set_name):
+        """
+        Procura o node set no assembly e nas instâncias.
+        Retorna (objeto_região, {instância: labels}).
+        """
+        assembly = odb.rootAssembly
+        if set_name in assembly.nodeSets:
+            nset = assembly.nodeSets[set_name]
+            labels_by_inst = {}
+            for inst_name, nodes in zip(nset.instanceNames, nset.nodes):
+                labels_by_inst[inst_name] = np.array([n.label for n in nodes], dtype=np.int64)
+            return nset, labels_by_inst
+
+        for inst_name in assembly.instances.keys():
+            inst = assembly.instances[inst_name]
+            if set_name in inst.nodeSets:
+                nset = inst.nodeSets[set_name]
+                return nset, {inst_name: np.array([n.label for n in nset.nodes], dtype=np.int64)}
+
+        raise KeyError("Node set not found in ODB: {}".format(set_name))
+
+    def _create_node_set(self, odb, node_index, instance_mapping):
+        """
+        Cria um node set temporário com os nós selecionados (para getSubset).
+        Se o ODB não permitir, retorna None: o filtro por índice compacto
+        continua garantindo o resultado, só sem reduzir a leitura.
+        """
+        node_labels = []
+        for name, inst_map in instance_mapping.items():
+            start = inst_map["global_start"]
+            local = node_index[(node_index >= start) & (node_index < start + inst_map["node_count"])] - start
+            if local.size:
+                node_labels.append((name, tuple(int(l) for l in inst_map["node_labels"][local])))
+        if not node_labels:
+            return None
+
+        assembly = odb.rootAssembly
+        try:
+            if self.SUBSET_SET_NAME in assembly.nodeSets:
+                return assembly.nodeSets[self.SUBSET_SET_NAME]
+            return assembly.NodeSetFromNodeLabels(name=self.SUBSET_SET_NAME,
+                                                  nodeLabels=tuple(node_labels))
+        except Exception as e:
+            print("WARNING: could not create subset node set ({}); reading full fields".format(e))
+            return None
+
+    def _average_frame_subset(self, frame, node_count, subset_mapping):
+        """
+        Médias nodais apenas dos campos/componentes e nós do subconjunto.
+        Retorna dict nome_do_arquivo -> array [n_subset, k].
+        """
+        region = self._subset["region"]
+        results = {}
+        for key, comps in (self.fields or (("U", []), ("S", []))):
+            if key not in frame.fieldOutputs:
+                continue
+            field = frame.fieldOutputs[key]
+            if region is not None:
+                field = field.getSubset(region=region)
+
+            labels = list(getattr(field, "componentLabels", ()))
+            comps = comps or labels
+            column_map, extra_sums, columns = [], [], []
+            sum_data = np.zeros((node_count, len(comps)), dtype=np.float32)
+            for out_i, comp in enumerate(comps):
+                attr = self.INVARIANT_ATTRS.get(re.sub(r'[^A-Z]', '', comp.upper()))
+                if comp in labels:
+                    column_map.append((out_i, labels.index(comp)))
+                elif attr is not None:
+                    column = np.zeros(node_count, dtype=np.float32)
+                    extra_sums.append((attr, column))
+                    columns.append((out_i, column))
+                else:
+                    print("WARNING: component {} not found in field {}".format(comp, key))
+
+            divisor = self._accumulate_field(field, 'subset:' + key, column_map, sum_data,
+                                             extra_sums, node_count, subset_mapping)
+            for out_i, column in columns:
+                sum_data[:, out_i] = column
+
+            results[key] = sum_data / divisor[:, np.newaxis]
+
+            # Invariantes pedidos mas ausentes nos blocos: calculados do tensor médio
+            missing = [(out_i, self.INVARIANT_ATTRS[re.sub(r'[^A-Z]', '', comps[out_i].upper())])
+                       for out_i, column in columns if not np.any(column)]
+            if missing and key == 'S' and len(labels) >= 6:
+                voigt = np.zeros((node_count, 6), dtype=np.float32)
+                self._accumulate_field(field, 'subset:' + key, ABAQUS_TO_VOIGT, voigt,
+                                       (), node_count, subset_mapping)
+                invariants = dict(zip(("mises", "maxPrincipal", "minPrincipal"),
+                                      tensor_invariants(voigt / divisor[:, np.newaxis], INVARIANT_CHUNK)))
+                for out_i, attr in missing:
+                    results[key][:, out_i] = invariants[attr]
+
+        # THRESHOLD: só quando o von Mises faz parte da seleção de tensões
+        if "S" in results:
+            comps = dict(self.fields or ()).get("S") or []
+            mises = [i for i, c in enumerate(comps) if re.sub(r'[^A-Z]', '', c.upper()) == "MISES"]
+            if mises:
+                mask = results["S"][:, mises[0]] < self.stress_threshold
+                results["S"][mask] = 0.0
+
+        return results
+
+    def _plan_steps(self, odb):
+        """
+        Lista os steps a processar, com o intervalo de frames de cada um
+        (_get_frame_range) e a pasta de saída já criada.
         """
         steps_obj        = odb.steps
         available_steps  = list(steps_obj.keys())
         step_indices     = self._get_indices_to_process(self.steps, available_steps, "step")
 
+        planned = []
         for s_idx in step_indices:
             step_name = available_steps[s_idx]
-            frames    = steps_obj[step_name].frames
-            begin_f, end_f = self._get_frame_range(frames)
-            
+            begin_f, end_f = self._get_frame_range(steps_obj[step_name].frames)
+
             # Cria diretório do step
             safe_step_name = re.sub(r'[^\w\-\.]', '_', step_name) 
             step_dir = os.path.join(
@@ -344,29 +778,222 @@ class OdbToNPYConverter(object):
                 )
             if not os.path.exists(step_dir):
                 os.makedirs(step_dir)
-            
-            print("Processing step {}/{}: {}".format(s_idx + 1, len(step_indices), step_name))
 
-            for f_idx in range(begin_f, end_f + 1):
+            planned.append({"name": step_name, "dir": step_dir,
+                            "frames": list(range(begin_f, end_f + 1))})
+        return planned
+
+    @staticmethod
+    def _frame_meta(frame, slot, f_idx, step_name):
+        return {
+            "slot": slot,
+            "frame_index": f_idx,
+            "name": 'frame_{:03d}'.format(f_idx + 1),
+            "step_name": step_name,
+            "step_time": float(getattr(frame, "frameValue", f_idx))
+        }
+
+    def _process_temporal_data_optimized(self, odb, global_node_count, instance_mapping):
+        """
+        Processa os dados temporais de forma otimizada:
+        1. Cache dos dados de campo para evitar múltiplos acessos
+        2. Processamento em chunks para economizar memória
+        3. Salvamento imediato de cada frame
+        """
+        steps = self._plan_steps(odb)
+
+        for i, step in enumerate(steps):
+            frames = odb.steps[step["name"]].frames
+            print("Processing step {}/{}: {}".format(i + 1, len(steps), step["name"]))
+
+            # Frames já gravados e conferidos (manifesto) não são refeitos
+            done = self._completed_frames(step)
+            if len(done) == len(step["frames"]):
+                print("  All {} frames up to date".format(len(done)))
+                continue
+            if done:
+                print("  {} frames up to date, resuming".format(len(done)))
+
+            store = None
+            if self.layout == 'time_major':
+                store = self._open_frame_store(step["dir"], len(step["frames"]),
+                                               [done[k] for k in sorted(done)])
+
+            for slot, f_idx in enumerate(step["frames"]):
+                if slot in done:
+                    continue
                 frame = frames[f_idx]
-                print("  Processing frame {}/{}".format(f_idx + 1, end_f + 1))
+                print("  Processing frame {}/{}".format(f_idx + 1, step["frames"][-1] + 1))
+                meta = self._frame_meta(frame, slot, f_idx, step["name"])
                 
-                # Processa e salva frame em chunks
-                self._process_and_save_frame(frame, step_dir, f_idx, global_node_count, instance_mapping)
-                
-                # Força limpeza de memória
-                gc.collect()
+                # Calcula o frame (o plano de médias é reaproveitado entre frames) e
+                # entrega a gravação à thread de escrita: o próximo frame já é lido
+                # enquanto este é gravado
+                results = self._average_frame(frame, global_node_count, instance_mapping)
+                self._writer.submit(self._write_frame, step["dir"], results, meta, store,
+                                    description="{} {}".format(step["name"], meta["name"]))
+
+            if store is not None:
+                self._writer.submit(self._close_frame_store, store)
+
+    # ------------------------------------------------------------------
+    # Conversão em shards: o intervalo de frames é dividido entre processos
+    # ------------------------------------------------------------------
+    def _process_temporal_data_sharded(self, odb, odb_full_path, shards,
+                                       global_node_count, instance_mapping, geom_mapping):
+        """
+        Divide os frames de cada step entre 'shards' processos, que abrem o ODB
+        somente leitura e gravam em slots/pastas disjuntos da mesma saída.
+
+        O primeiro frame de cada step é processado aqui: constrói os planos de
+        médias (herdados pelos shards) e, no layout 'time_major', pré-aloca os
+        memmaps que os shards preenchem. No fim, _merge_frame_shards confere
+        que todos os frames foram gravados.
+        """
+        steps = self._plan_steps(odb)
+        frame_meta, jobs = {}, []
+
+        for i, step in enumerate(steps):
+            frames = odb.steps[step["name"]].frames
+            first = step["frames"][0]
+            print("Processing step {}/{}: {} (first frame, {} shards for the rest)".format(
+                i + 1, len(steps), step["name"], shards))
+
+            # Frames já gravados e conferidos (manifesto) não são refeitos
+            done = self._completed_frames(step)
+            frame_meta[step["dir"]] = [done[k] for k in sorted(done)]
+
+            if 0 not in done:
+                meta = self._frame_meta(frames[first], 0, first, step["name"])
+                if self.layout == 'time_major':
+                    store = self._open_frame_store(step["dir"], len(step["frames"]),
+                                                   frame_meta[step["dir"]])
+                    results = self._average_frame(frames[first], global_node_count, instance_mapping)
+                    self._store_frame(store, 0, results, meta)
+                    self._close_frame_store(store)
+                else:
+                    results = self._process_and_save_frame(frames[first], step["dir"], first,
+                                                           global_node_count, instance_mapping)
+                self._record_frame(step["dir"], self._frame_record(meta, results))
+                frame_meta[step["dir"]].append(meta)
+
+            for slot, f_idx in enumerate(step["frames"][1:], 1):
+                if slot not in done:
+                    jobs.append((step["name"], step["dir"], slot, f_idx))
+
+        chunks = self._split_shards(jobs, shards)
+        if chunks:
+            state = self._shard_state(global_node_count, instance_mapping, geom_mapping)
+            pool = multiprocessing.Pool(len(chunks))
+            try:
+                pending = [pool.apply_async(_convert_frame_shard, (state, odb_full_path, chunk))
+                           for chunk in chunks]
+                for k, result in enumerate(pending):
+                    written = result.get()
+                    print("  Shard {}/{} done: {} frames".format(k + 1, len(chunks), len(written)))
+                    for step_dir, record in written:
+                        self._record_frame(step_dir, record)
+                        frame_meta[step_dir].append(record["meta"])
+            finally:
+                pool.close()
+                pool.join()
+
+        self._merge_frame_shards(steps, frame_meta)
+
+    @staticmethod
+    def _split_shards(jobs, shards):
+        """Fatias contíguas (janelas de frames) de tamanho quase igual."""
+        shards = max(1, min(int(shards), len(jobs)))
+        bounds = np.linspace(0, len(jobs), shards + 1).astype(int)
+        return [jobs[bounds[k]:bounds[k + 1]] for k in xrange(shards) if bounds[k + 1] > bounds[k]]
+
+    def _shard_state(self, global_node_count, instance_mapping, geom_mapping):
+        """
+        Estado do conversor enviado aos shards. A região do subconjunto é um
+        objeto do ODB do processo pai: cada shard a resolve de novo.
+        """
+        state = dict(self.__dict__)
+        state["_writer"] = None
+        if self._subset is not None:
+            state["_subset"] = dict(self._subset, region=None)
+        state["_shard"] = {"node_count": global_node_count,
+                           "instance_mapping": instance_mapping,
+                           "geom_mapping": geom_mapping}
+        return state
+
+    def _subset_region(self, odb, node_index, instance_mapping):
+        if self.node_set is not None:
+            return self._find_node_set(odb, self.node_set)[0]
+        if self.bbox is not None or self.plane is not None:
+            return self._create_node_set(odb, node_index, instance_mapping)
+        return None
+
+    def _convert_shard(self, odb, shard_jobs):
+        """
+        Executado em cada processo: processa os frames (step, slot, frame) da
+        fatia e devolve [(step_dir, registro do manifesto)] dos frames gravados.
+        """
+        shard = self._shard
+        if self._subset is not None:
+            self._subset["region"] = self._subset_region(odb, self._subset["node_index"],
+                                                         shard["geom_mapping"])
+
+        arrays, written = {}, []
+        try:
+            for step_name, step_dir, slot, f_idx in shard_jobs:
+                frame = odb.steps[step_name].frames[f_idx]
+                if self.layout == 'time_major':
+                    results = self._average_frame(frame, shard["node_count"], shard["instance_mapping"])
+                    for name, values in results.items():
+                        key = (step_dir, name)
+                        if key not in arrays:
+                            arrays[key] = np.load(os.path.join(step_dir, name + ".npy"), mmap_mode='r+')
+                        arrays[key][slot] = values
+                else:
+                    results = self._process_and_save_frame(frame, step_dir, f_idx,
+                                                           shard["node_count"], shard["instance_mapping"])
+                meta = self._frame_meta(frame, slot, f_idx, step_name)
+                written.append((step_dir, self._frame_record(meta, results)))
+        finally:
+            for arr in arrays.values():
+                arr.flush()
+        return written
+
+    def _merge_frame_shards(self, steps, frame_meta):
+        """
+        Valida que todos os frames de cada step foram gravados pelos shards e,
+        no layout 'time_major', reescreve o frames.json com todos os slots.
+        """
+        missing = []
+        for step in steps:
+            metas = sorted(frame_meta.get(step["dir"], []), key=lambda m: m["slot"])
+            done = set(m["slot"] for m in metas)
+            for slot, f_idx in enumerate(step["frames"]):
+                if slot not in done:
+                    missing.append("{} frame {}".format(step["name"], f_idx + 1))
+
+            if self.layout == 'time_major':
+                self._write_frame_index({"step_dir": step["dir"],
+                                         "n_slots": len(step["frames"]),
+                                         "frames": metas})
+            else:
+                # Cada pasta de frame deve ter os mesmos arquivos do primeiro frame
+                expected = set(os.listdir(os.path.join(step["dir"], metas[0]["name"])))
+                for m in metas[1:]:
+                    frame_dir = os.path.join(step["dir"], m["name"])
+                    if not os.path.isdir(frame_dir) or not expected.issubset(os.listdir(frame_dir)):
+                        missing.append("{} {} (incomplete)".format(step["name"], m["name"]))
+
+        if missing:
+            raise RuntimeError("Sharded conversion is missing frames: {}".format(", ".join(missing)))
+        print("All frames present after merging {} steps".format(len(steps)))
 
     def stress_map(self):
-        _STRESS_MAP = (
-            (0, 0),  # S11
-            (4, 1),  # S22
-            (8, 2),  # S33
-            (1, 3), (3, 3),  # S12 -> (0,1) e (1,0)
-            (2, 4), (6, 4),  # S13
-            (5, 5), (7, 5),  # S23
-        )
-        return _STRESS_MAP
+        """(coluna de stress_tensor, coluna de S do Abaqus) conforme stress_storage."""
+        return STRESS_STORAGES[self.stress_storage][1]
+
+    def stress_columns(self):
+        return len(STRESS_STORAGES[self.stress_storage][0])
 
     @staticmethod
     def _get_nonempty_attr(obj, attr, default=None):
@@ -380,111 +1007,240 @@ class OdbToNPYConverter(object):
 
         return val
 
-    def _process_and_save_frame(self, frame, step_dir, frame_idx, global_node_count, instance_mapping):
+    DISP_MAP = ((0, 0), (1, 1), (2, 2))  # U1, U2, U3
+
+    @staticmethod
+    def _accumulate_block_loop(inst_map, block_labels, block_data, column_map,
+                               sum_data, count, extras=()):
         """
-        VERSÃO OTIMIZADA: Usa os invariantes JÁ CALCULADOS pelo Abaqus
+        Implementação de referência: acumula um bulkDataBlock nó a nó.
+            column_map -> pares (coluna_saida, componente_bloco)
+            extras     -> pares (valores_do_bloco, array_de_soma) para escalares
         """
-        frame_dir = os.path.join(step_dir, 'frame_{:03d}'.format(frame_idx + 1))
-        if not os.path.exists(frame_dir):
-            os.makedirs(frame_dir)
+        lookup = inst_map.get("node_lookup")
+        if lookup is None: return
 
-        # 1. Alocação
-        sum_disp = np.zeros((global_node_count, 3), dtype=np.float32)
-        sum_stress = np.zeros((global_node_count, 9), dtype=np.float32)
+        n_lookup = lookup.shape[0]
 
-        # NOVO: Arrays para invariantes
-        sum_mises = np.zeros(global_node_count, dtype=np.float32)
-        sum_max_principal = np.zeros(global_node_count, dtype=np.float32)
-        sum_min_principal = np.zeros(global_node_count, dtype=np.float32)
+        for i in xrange(len(block_labels)):
+            label = int(block_labels[i])
+            if label < 0 or label >= n_lookup:continue
 
-        count_disp = np.zeros(global_node_count, dtype=np.float32)
-        count_stress = np.zeros(global_node_count, dtype=np.float32)
+            idx = lookup[label]
+            if idx < 0:continue
 
-        field_u = frame.fieldOutputs['U'] if 'U' in frame.fieldOutputs else None
-        if field_u is not None:
-            for block in field_u.bulkDataBlocks:
-                # Guard: bloco/instância inválidos
-                inst = getattr(block, "instance", None)
-                if not inst:continue
+            d = block_data[i]
+
+            row = sum_data[idx]
+            for out_i, in_i in column_map:
+                row[out_i] += d[in_i]
 
-                inst_name = inst.name
-                inst_map = instance_mapping.get(inst_name)
-                if not inst_map:continue
+            for values, target in extras:
+                target[idx] += values[i]
 
-                node_map = inst_map.get("node_mapping")
-                if not node_map:continue
+            count[idx] += 1.0
 
-                block_labels = self._get_nonempty_attr(block, "nodeLabels")
-                block_data   = self._get_nonempty_attr(block, "data")
+    @classmethod
+    def _accumulate_block_vectorized(cls, inst_map, block_labels, block_data, column_map,
+                                     sum_data, count, extras=()):
+        """
+        Acumula um bulkDataBlock inteiro de uma vez: labels -> índices globais
+        pela tabela densa e scatter-add com np.bincount.
+        Mesmo contrato de _accumulate_block_loop.
+        """
+        lookup = inst_map.get("node_lookup")
+        if lookup is None: return
 
-                if block_labels is None or block_data is None: continue
+        idx, keep = cls._plan_block_indices(lookup, block_labels)
+        if idx.size == 0: return
 
-                get_idx = node_map.get
+        cls._scatter_block(idx, keep, block_data, column_map, sum_data, extras)
+        count += np.bincount(idx, minlength=count.shape[0])
 
-                for i in xrange(len(block_labels)):
-                    idx = get_idx(block_labels[i])
-                    if idx is None:continue
+    @classmethod
+    def _plan_block_indices(cls, lookup, block_labels):
+        """
+        Índices globais válidos de um bloco e a máscara dos valores mantidos
+        (None quando todos os valores do bloco são mantidos).
+        """
+        idx  = cls._lookup_indices(lookup, block_labels)
+        keep = idx >= 0
+        if np.all(keep):
+            return idx, None
+        return idx[keep], keep
 
-                    sum_disp[idx]   += block_data[i]
-                    count_disp[idx] += 1.0
+    @staticmethod
+    def _scatter_block(idx, keep, block_data, column_map, sum_data, extras=()):
+        """
+        Scatter-add dos valores de um bloco em sum_data (colunas de column_map)
+        e dos escalares de extras, usando índices globais já resolvidos.
+        """
+        n = sum_data.shape[0]
 
-        # 3. TENSÃO (COM INVARIANTES DO ABAQUS!)
-        field_s = frame.fieldOutputs['S'] if 'S' in frame.fieldOutputs else None
-        if field_s is not None:
-            stress_map = self.stress_map()
-            for block in field_s.bulkDataBlocks:
+        data = np.asarray(block_data)
+        if data.ndim == 1:
+            data = data[:, np.newaxis]
+        if keep is not None:
+            data = data[keep]
 
-                inst = getattr(block, "instance", None)
-                if not inst:continue
+        sums = {}  # componente do bloco -> soma por nó (reusada, ex.: S12 em duas colunas)
+        for out_i, in_i in column_map:
+            if in_i not in sums:
+                sums[in_i] = np.bincount(idx, weights=data[:, in_i], minlength=n)
+            sum_data[:, out_i] += sums[in_i]
 
-                inst_map = instance_mapping.get(inst.name)
-                if not inst_map:continue
+        for values, target in extras:
+            values = np.asarray(values)
+            if keep is not None:
+                values = values[keep]
+            target += np.bincount(idx, weights=values, minlength=n)
 
-                node_map = inst_map.get("node_mapping")
-                if not node_map:continue
+    # ------------------------------------------------------------------
+    # Plano de médias (invariante entre frames)
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _block_signature(block, inst_name, block_labels):
+        """
+        Identifica um bloco para validar o plano de médias em frames seguintes:
+        (instância, posição, nº de valores, primeiro label, último label).
+        """
+        return (inst_name, str(getattr(block, "position", None)), len(block_labels),
+                int(block_labels[0]), int(block_labels[-1]))
 
-                block_labels = self._get_nonempty_attr(block, "nodeLabels")
-                block_data   = self._get_nonempty_attr(block, "data")
+    def _field_blocks(self, field, instance_mapping):
+        """
+        Lista os bulkDataBlocks úteis de um campo como
+        (block, inst_map, labels, data, assinatura).
+        """
+        blocks = []
+        for block in field.bulkDataBlocks:
+            # Guard: bloco/instância inválidos
+            inst = getattr(block, "instance", None)
+            if not inst:continue
 
-                if block_labels is None or block_data is None: continue
+            inst_map = instance_mapping.get(inst.name)
+            if not inst_map:continue
 
-                block_mises  = self._get_nonempty_attr(block, "mises")
-                block_max_p  = self._get_nonempty_attr(block, "maxPrincipal")
-                block_min_p  = self._get_nonempty_attr(block, "minPrincipal")
+            block_labels = self._get_nonempty_attr(block, "nodeLabels")
+            block_data   = self._get_nonempty_attr(block, "data")
 
+            if block_labels is None or block_data is None: continue
 
-                get_idx = node_map.get
+            signature = self._block_signature(block, inst.name, block_labels)
+            blocks.append((block, inst_map, block_labels, block_data, signature))
+        return blocks
 
-                for i in xrange(len(block_labels)):
-                    idx = get_idx(block_labels[i])
-                    if idx is None:continue
-                    
-                    d = block_data[i]
+    def _build_averaging_plan(self, blocks, global_node_count):
+        """
+        Constrói o plano de médias de um campo a partir dos blocos do primeiro frame:
+        por bloco (instância x posição NODAL/ELEMENT_NODAL) os índices globais,
+        e por nó o nº de ocorrências (count) e o divisor já limitado a >= 1.
+        """
+        entries = []
+        count = np.zeros(global_node_count, dtype=np.float32)
+        for block, inst_map, block_labels, _, signature in blocks:
+            idx, keep = self._plan_block_indices(inst_map["node_lookup"], block_labels)
+            count += np.bincount(idx, minlength=global_node_count)
+            entries.append({"signature": signature, "idx": idx, "keep": keep})
 
-                    row = sum_stress[idx]
-                    for out_i, in_i in stress_map:
-                        row[out_i] += d[in_i]
+        return {
+            "signatures": [e["signature"] for e in entries],
+            "blocks": entries,
+            "count": count,
+            "divisor": np.maximum(count, 1.0)
+        }
+
+    def _averaging_plan(self, field_key, blocks, global_node_count):
+        """
+        Retorna o plano de médias do campo, construindo-o no primeiro frame
+        (ou de novo, se a estrutura dos blocos mudar).
+        """
+        signatures = [b[4] for b in blocks]
+        plan = self._plans.get(field_key)
+        if plan is None or plan["signatures"] != signatures:
+            plan = self._build_averaging_plan(blocks, global_node_count)
+            self._plans[field_key] = plan
+        return plan
 
-                    if block_mises is not None:
-                        sum_mises[idx] += block_mises[i]
-                    if block_max_p is not None:
-                        sum_max_principal[idx] += block_max_p[i]
-                    if block_min_p is not None:
-                        sum_min_principal[idx] += block_min_p[i]
+    def _accumulate_field(self, field, field_key, column_map, sum_data, extra_sums,
+                          global_node_count, instance_mapping):
+        """
+        Soma todos os blocos de um campo em sum_data (e os escalares listados
+        em extra_sums como (atributo, array_de_soma)).
+        Retorna o divisor por nó para a média.
+        """
+        blocks = self._field_blocks(field, instance_mapping)
 
-                    count_stress[idx] += 1.0
+        def block_extras(block):
+            # Escalares presentes no bloco: (valores do bloco, array de soma)
+            extras = []
+            for attr, target in extra_sums:
+                values = self._get_nonempty_attr(block, attr)
+                if values is not None:
+                    extras.append((values, target))
+            return extras
 
-        # 4. MÉDIAS
-        np.maximum(count_disp, 1.0, out=count_disp)
-        np.maximum(count_stress, 1.0, out=count_stress)
+        if self.accumulation == 'loop':
+            count = np.zeros(global_node_count, dtype=np.float32)
+            for block, inst_map, block_labels, block_data, _ in blocks:
+                self._accumulate_block_loop(inst_map, block_labels, block_data, column_map,
+                                            sum_data, count, block_extras(block))
+            return np.maximum(count, 1.0)
 
-        full_displacement = sum_disp / count_disp[:, np.newaxis]
-        full_stress_tensor = sum_stress / count_stress[:, np.newaxis]
+        plan = self._averaging_plan(field_key, blocks, global_node_count)
+        for entry, (block, _, _, block_data, _) in zip(plan["blocks"], blocks):
+            self._scatter_block(entry["idx"], entry["keep"], block_data, column_map,
+                                sum_data, block_extras(block))
+        return plan["divisor"]
+
+    def _average_frame(self, frame, global_node_count, instance_mapping):
+        """
+        Calcula as médias nodais de um frame.
+        Retorna dict nome_do_arquivo -> array.
+        """
+        if self._subset is not None:
+            return self._average_frame_subset(frame, global_node_count, instance_mapping)
+
+        # 1. Alocação
+        sum_disp = np.zeros((global_node_count, 3), dtype=np.float32)
+        sum_stress = np.zeros((global_node_count, self.stress_columns()), dtype=np.float32)
+
+        # NOVO: Arrays para invariantes
+        sum_mises = np.zeros(global_node_count, dtype=np.float32)
+        sum_max_principal = np.zeros(global_node_count, dtype=np.float32)
+        sum_min_principal = np.zeros(global_node_count, dtype=np.float32)
+
+        div_disp = div_stress = np.ones(global_node_count, dtype=np.float32)
+
+        # 2. DESLOCAMENTO
+        field_u = frame.fieldOutputs['U'] if 'U' in frame.fieldOutputs else None
+        if field_u is not None:
+            div_disp = self._accumulate_field(field_u, 'U', self.DISP_MAP, sum_disp, (),
+                                              global_node_count, instance_mapping)
+
+        # 3. TENSÃO (COM INVARIANTES DO ABAQUS!)
+        field_s = frame.fieldOutputs['S'] if 'S' in frame.fieldOutputs else None
+        if field_s is not None:
+            extra_sums = (("mises",        sum_mises),
+                          ("maxPrincipal", sum_max_principal),
+                          ("minPrincipal", sum_min_principal))
+            div_stress = self._accumulate_field(field_s, 'S', self.stress_map(), sum_stress,
+                                                extra_sums, global_node_count, instance_mapping)
+
+        # 4. MÉDIAS (divisores em cache no plano)
+        full_displacement = sum_disp / div_disp[:, np.newaxis]
+        full_stress_tensor = sum_stress / div_stress[:, np.newaxis]
 
         # MÉDIAS DOS INVARIANTES (DIRETO DO ABAQUS)
-        full_von_mises = sum_mises / count_stress
-        full_max_principal = sum_max_principal / count_stress
-        full_min_principal = sum_min_principal / count_stress
+        full_von_mises = sum_mises / div_stress
+        full_max_principal = sum_max_principal / div_stress
+        full_min_principal = sum_min_principal / div_stress
+
+        # Blocos sem mises/maxPrincipal/minPrincipal (somas zeradas): invariantes
+        # calculados do tensor médio, senão o threshold zeraria todo o tensor
+        if field_s is not None and not np.any(sum_mises):
+            full_von_mises, full_max_principal, full_min_principal = tensor_invariants(
+                full_stress_tensor, INVARIANT_CHUNK)
 
         # 5. THRESHOLD (igual)
         mask = full_von_mises < self.stress_threshold
@@ -494,12 +1250,103 @@ class OdbToNPYConverter(object):
             full_min_principal[mask] = 0.0
             full_stress_tensor[mask] = 0.0
 
+        return {
+            "displacement": full_displacement,
+            "stress_tensor": full_stress_tensor,
+            "von_mises": full_von_mises,
+            "max_principal": full_max_principal,
+            "min_principal": full_min_principal
+        }
+
+    # ------------------------------------------------------------------
+    # Layout 'time_major': um memmap [n_frames, n_nodes, k] por campo
+    # ------------------------------------------------------------------
+    FRAME_INDEX_FILE = "frames.json"
+
+    def _open_frame_store(self, step_dir, n_frames, frames=None):
+        """
+        Prepara o store do step. Os arrays (open_memmap) de cada campo são
+        pré-alocados para todos os frames no primeiro _store_frame, quando a
+        forma de cada campo [n_nodes, k] é conhecida. Com 'frames' (retomada)
+        os arrays existentes são reabertos e esses slots preservados.
+        """
+        return {"step_dir": step_dir, "n_slots": n_frames, "arrays": {},
+                "frames": list(frames or []), "reuse": bool(frames)}
+
+    def _store_frame(self, store, slot, results, meta):
+        """Grava os resultados de um frame no slot correspondente e atualiza o sidecar."""
+        arrays = store["arrays"]
+        for name, values in results.items():
+            if name not in arrays:
+                path  = os.path.join(store["step_dir"], name + ".npy")
+                shape = (store["n_slots"],) + values.shape
+                if store["reuse"] and os.path.exists(path):
+                    arrays[name] = np.load(path, mmap_mode='r+')
+                if name not in arrays or arrays[name].shape != shape:
+                    arrays[name] = open_memmap(path, mode='w+', dtype=np.float32, shape=shape)
+            arrays[name][slot] = values
+        store["frames"].append(meta)
+        store["frames"].sort(key=lambda m: m["slot"])
+        self._write_frame_index(store)
+
+    def _write_frame_index(self, store):
+        """Sidecar com os frames já gravados (reescrito via arquivo temporário)."""
+        path = os.path.join(store["step_dir"], self.FRAME_INDEX_FILE)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"layout": "time_major",
+                       "n_slots": store["n_slots"],
+                       "frames": store["frames"]}, f, indent=1)
+        if os.path.exists(path):
+            os.remove(path)
+        os.rename(tmp_path, path)
+
+    @staticmethod
+    def _close_frame_store(store):
+        for arr in store["arrays"].values():
+            arr.flush()
+        store["arrays"].clear()
+
+    def _process_and_save_frame(self, frame, step_dir, frame_idx, global_node_count, instance_mapping):
+        """
+        VERSÃO OTIMIZADA: Usa os invariantes JÁ CALCULADOS pelo Abaqus
+        """
+        results = self._average_frame(frame, global_node_count, instance_mapping)
+
         # 6. SAVE
-        np.save(os.path.join(frame_dir, "displacement.npy"), full_displacement)
-        np.save(os.path.join(frame_dir, "stress_tensor.npy"), full_stress_tensor)
-        np.save(os.path.join(frame_dir, "von_mises.npy"), full_von_mises)
-        np.save(os.path.join(frame_dir, "max_principal.npy"), full_max_principal)
-        np.save(os.path.join(frame_dir, "min_principal.npy"), full_min_principal)
+        self._save_frame_files(os.path.join(step_dir, 'frame_{:03d}'.format(frame_idx + 1)), results)
+        return results
+
+    @staticmethod
+    def _save_frame_files(frame_dir, results):
+        if not os.path.exists(frame_dir):
+            os.makedirs(frame_dir)
+        for name, arr in results.items():
+            np.save(os.path.join(frame_dir, name + ".npy"), arr)
+
+    def _write_frame(self, step_dir, results, meta, store=None):
+        """
+        Tarefa da thread de escrita: grava um frame (pasta própria ou slot do
+        store 'time_major') e só então o registra no manifesto.
+        """
+        if store is None:
+            self._save_frame_files(os.path.join(step_dir, meta["name"]), results)
+        else:
+            self._store_frame(store, meta["slot"], results, meta)
+        self._record_frame(step_dir, self._frame_record(meta, results))
+
+def _convert_frame_shard(state, odb_full_path, shard_jobs):
+    """Ponto de entrada de cada shard (função de módulo para o multiprocessing)."""
+    converter = OdbToNPYConverter.__new__(OdbToNPYConverter)
+    converter.__dict__.update(state)
+    odb = openOdb(odb_full_path, readOnly=True)
+    try:
+        return converter._convert_shard(odb, shard_jobs)
+    finally:
+        try:
+            odb.close()
+        except:
+            pass
 
 if __name__ == '__main__':
     converter = OdbToNPYConverter(
@@ -11,6 +11,9 @@ import inspect
 import json
 import logging
 import re
+import time
+import traceback
+import multiprocessing
 
 # Define current directory and module paths
 current_dir = os.path.dirname(os.path.abspath(inspect.getfile(inspect.currentframe())))
@@ -44,7 +47,13 @@ class ODB2NPYParameters(object):
             'MeshType': '12',                # '12' para Hexaedro, '10' para Tetraedro
             'stress_threshold': 1e-6,          # Threshold para filtragem de stress baixos
             'batch_size': 1000,                # Quantidade de nós processados por vez
-            'inspect_first': True              # Inspeciona a estrutura do ODB antes da conversão
+            'inspect_first': True,             # Inspeciona a estrutura do ODB antes da conversão
+            'workers': 1,                      # > 1: ODBs distribuídos entre processos de longa duração
+            'worker_memory_mb': None,          # Pico de memória acima do qual o worker é reciclado
+            'shards': 1,                       # > 1: frames de um mesmo ODB divididos entre processos
+            'resume': True,                    # pula ODBs/frames já registrados no conversion_manifest.json
+            'stress_storage': 'full',          # 'voigt': stress_tensor com 6 componentes (Stress_Layout.py)
+            'max_pending_writes': 2            # frames gravados em segundo plano (0 = síncrono)
         }
         self.method_type = method_type
         self.method_type_dir = method_type_dir
@@ -274,11 +283,28 @@ class OdbBatchConverter(object):
             batch_size=self.conversion_params.get('batch_size', 1000),
             compression=False,
             begin_frame=begin_frame,
-            end_frame=end_frame
+            end_frame=end_frame,
+            layout=self.conversion_params.get('layout', 'frames'),
+            fields=self.conversion_params.get('fields'),
+            node_set=self.conversion_params.get('node_set'),
+            bbox=self.conversion_params.get('bbox'),
+            plane=self.conversion_params.get('plane'),
+            resume=self.conversion_params.get('resume', True),
+            stress_storage=self.conversion_params.get('stress_storage', 'full'),
+            max_pending_writes=self.conversion_params.get('max_pending_writes', 2)
         )
 
-        converter.convert()
-        self.logger.info("\nConversão concluída com sucesso para: {}".format(os.path.basename(odb_file)))
+        # Workers do batch paralelo são daemon e não podem criar processos filhos:
+        # nesse caso o ODB é convertido sem shards.
+        shards = int(self.conversion_params.get('shards', 1))
+        if shards > 1 and multiprocessing.current_process().daemon:
+            shards = 1
+        ok = converter.convert(shards=shards)
+        if ok:
+            self.logger.info("\nConversão concluída com sucesso para: {}".format(os.path.basename(odb_file)))
+        else:
+            self.logger.info("\nConversão FALHOU para: {}".format(os.path.basename(odb_file)))
+        return ok
 
             
     def _convert_frame_params(self, begin_frame, end_frame):
@@ -311,19 +337,231 @@ class OdbBatchConverter(object):
             os.makedirs(self.NPY_Dir)
             self.logger.info("Diretório de saída criado: {}".format(self.NPY_Dir))
 
+        jobs = []
         for odb_file in odb_files:
             odb_name = os.path.splitext(os.path.basename(odb_file))[0]
             # ao invés de passar sempre self.NPY_Dir, crie um subdiretório:
             out_dir = os.path.join(self.NPY_Dir, odb_name)
             if not os.path.exists(out_dir):
                 os.makedirs(out_dir)
-            self.convert_single_odb(odb_file, out_dir)
+            jobs.append((odb_file, out_dir))
+
+        workers = int(self.conversion_params.get('workers', 1))
+        if workers > 1 and len(jobs) > 1:
+            report = self.convert_parallel(jobs, workers)
+        else:
+            report = [self.run_job(job) for job in jobs]
+        self.write_report(report)
 
         complete_message = ("\n{line}\nCONVERSÃO COMPLETA!\nArquivos XDMF salvos em: {output_dir}\n{line}"
                             .format(line="=" * 45, output_dir=self.NPY_Dir))
         self.logger.info(complete_message)
 
 
+    # ------------------------------------------------------------------
+    # Conversão paralela: N workers de longa duração consumindo uma fila
+    # ------------------------------------------------------------------
+    def run_job(self, job, worker_id=0):
+        """
+        Converte um ODB e devolve a entrada do relatório (nunca levanta exceção).
+        """
+        odb_file, out_dir = job
+        start = time.time()
+        entry = {'odb': odb_file, 'output': out_dir, 'worker': worker_id}
+        try:
+            ok = self.convert_single_odb(odb_file, out_dir)
+            entry.update(status='ok' if ok else 'failed',
+                         error=None if ok else 'converter reported an error (see log)')
+        except Exception as e:
+            entry.update(status='failed', error='{}: {}'.format(type(e).__name__, e),
+                         traceback=traceback.format_exc())
+        entry['seconds'] = round(time.time() - start, 3)
+        return entry
+
+    def convert_parallel(self, jobs, workers):
+        """
+        Distribui os ODBs entre `workers` processos de longa duração (o custo de
+        iniciar o interpretador é pago uma vez por worker, não por arquivo).
+        Um worker que ultrapassa 'worker_memory_mb' termina após o job atual e é
+        substituído; um worker que morre durante um job gera falha só daquele ODB.
+        Cada worker recebe os jobs do processo principal por um Pipe próprio e
+        responde por ele: send() grava na hora (sem thread de fila nem trava
+        compartilhada), então um worker morto não leva resultados já enviados
+        nem bloqueia os demais.
+        """
+        executable = self.conversion_params.get('worker_executable')
+        if executable:
+            multiprocessing.set_executable(executable)
+
+        memory_mb = self.conversion_params.get('worker_memory_mb')
+        waiting = list(range(len(jobs)))    # índices ainda não distribuídos, em ordem
+        waiting.reverse()
+        n_workers = min(workers, len(jobs))
+
+        self.logger.info("Conversão paralela: {} ODBs, {} workers, limite de memória: {}".format(
+            len(jobs), n_workers, "{} MB".format(memory_mb) if memory_mb else "nenhum"))
+
+        state = {}      # worker_id -> {"proc", "conn", "job": índice em andamento ou None}
+        next_id = [0]
+        results = {}
+
+        def dispatch(worker):
+            """Envia o próximo job ao worker ou, se acabaram, o sentinela None."""
+            worker["job"] = waiting.pop() if waiting else None
+            try:
+                worker["conn"].send(None if worker["job"] is None else (worker["job"], jobs[worker["job"]]))
+            except (IOError, OSError):
+                # Worker já morto: o job volta para a fila e a saída é tratada no laço
+                if worker["job"] is not None:
+                    waiting.append(worker["job"])
+                worker["job"] = None
+
+        def spawn():
+            worker_id = next_id[0]
+            next_id[0] += 1
+            conn, child_conn = multiprocessing.Pipe()
+            proc = multiprocessing.Process(
+                target=_conversion_worker,
+                args=(worker_id, self.Simulation_dir, self.NPY_Dir, self.conversion_params,
+                      child_conn, memory_mb))
+            proc.daemon = True
+            proc.start()
+            child_conn.close()
+            state[worker_id] = {"proc": proc, "conn": conn, "job": None}
+            dispatch(state[worker_id])
+
+        for _ in range(n_workers):
+            spawn()
+
+        while len(results) < len(jobs):
+            idle = True
+            for worker_id, worker in list(state.items()):
+                # is_alive antes do poll: o que o worker enviou antes de sair já está no pipe
+                alive = worker["proc"].is_alive()
+                message = None
+                try:
+                    if worker["conn"].poll():
+                        message = worker["conn"].recv()
+                except (EOFError, IOError, OSError):
+                    alive = False
+
+                if message is not None:
+                    idle = False
+                    _, entry, peak = message
+                    results[entry['index']] = entry
+                    self.logger.info("[worker {}] {} -> {} ({:.1f}s)".format(
+                        worker_id, os.path.basename(entry['odb']), entry['status'], entry['seconds']))
+                    if peak is None:
+                        dispatch(worker)
+                    else:
+                        # O worker termina sozinho; o substituto é criado quando ele sair
+                        worker["job"] = None
+                        self.logger.info("[worker {}] limite de memória atingido ({:.0f} MB), reiniciando".format(
+                            worker_id, peak))
+                    continue
+                if alive:
+                    continue
+
+                # Worker saiu: sentinela, reciclagem ou morte no meio de um job
+                idle = False
+                del state[worker_id]
+                worker["proc"].join()
+                worker["conn"].close()
+                index = worker["job"]
+                if index is not None and index not in results:
+                    odb_file, out_dir = jobs[index]
+                    results[index] = {'index': index, 'odb': odb_file, 'output': out_dir,
+                                      'worker': worker_id, 'status': 'failed', 'seconds': None,
+                                      'error': 'worker exited with code {}'.format(worker["proc"].exitcode)}
+                    self.logger.info("[worker {}] morreu durante {} (exit code {})".format(
+                        worker_id, os.path.basename(odb_file), worker["proc"].exitcode))
+                if waiting:
+                    spawn()
+
+            if not state and len(results) < len(jobs):
+                for index, (odb_file, out_dir) in enumerate(jobs):
+                    if index not in results:
+                        results[index] = {'index': index, 'odb': odb_file, 'output': out_dir,
+                                          'worker': None, 'status': 'failed', 'seconds': None,
+                                          'error': 'no worker left to run the job'}
+            if idle:
+                time.sleep(0.05)
+
+        for worker in state.values():
+            worker["proc"].join()
+            worker["conn"].close()
+        return [results[i] for i in range(len(jobs))]
+
+    def write_report(self, report):
+        """Grava conversion_report.json no NPY_Dir e registra o resumo das falhas."""
+        failed = [r for r in report if r['status'] != 'ok']
+        report_path = os.path.join(self.NPY_Dir, 'conversion_report.json')
+        with open(report_path, 'w') as f:
+            json.dump({'total': len(report), 'failed': len(failed), 'jobs': report}, f, indent=2)
+
+        message = "Relatório: {} ODBs, {} falhas -> {}\n".format(len(report), len(failed), report_path)
+        for r in failed:
+            message += "  - {}: {}\n".format(os.path.basename(r['odb']), r['error'])
+        self.logger.info(message)
+        return report_path
+
+
+def _process_peak_memory_mb():
+    """Pico de memória (MB) do processo atual; None se não for possível medir."""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024.0 * 1024.0) if sys.platform == 'darwin' else peak / 1024.0
+    except ImportError:
+        pass
+    try:
+        import ctypes
+
+        class _MemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", ctypes.c_ulong), ("PageFaultCount", ctypes.c_ulong),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = _MemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                 ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize / (1024.0 * 1024.0)
+    except Exception:
+        return None
+
+
+def _conversion_worker(worker_id, Simulation_dir, NPY_Dir, conversion_params, conn, memory_mb):
+    """
+    Loop de um worker: recebe (índice, job) do agendador pelo pipe até o
+    sentinela None e responde ('done', entrada do relatório, pico). O limite de
+    memória é verificado ao fim de cada job (pico do processo): acima dele o
+    pico vai na resposta e o worker termina, liberando a memória para o
+    substituto; senão o pico é None.
+    """
+    converter = OdbBatchConverter(Simulation_dir, NPY_Dir, conversion_params)
+    while True:
+        try:
+            item = conn.recv()
+        except EOFError:
+            break               # agendador encerrado
+        if item is None:
+            break
+        index, job = item
+        entry = converter.run_job(job, worker_id)
+        entry['index'] = index
+
+        peak = _process_peak_memory_mb()
+        recycle = memory_mb and peak is not None and peak > memory_mb
+        conn.send(('done', entry, peak if recycle else None))
+        if recycle:
+            break
+    conn.close()
+
+
 # Exemplo de uso no script principal (ou o módulo de execução)
 if __name__ == "__main__":
     # Primeira etapa: obter parâmetros e diretórios
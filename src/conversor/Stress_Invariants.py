@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+"""
+Stress_Invariants: von Mises e tensões principais calculados do tensor de
+tensões em lote (numpy), por blocos de nós para limitar a memória.
+
+Usado pelo OdbToNPYConverter quando os bulkDataBlocks de S não trazem
+mises/maxPrincipal/minPrincipal, e como pós-processamento sobre saídas já
+existentes (stress_tensor.npy), sem reler o ODB:
+
+    python Stress_Invariants.py C:\\Temp\\npy_files\\Model_A [--overwrite]
+
+Observação: no conversor o Abaqus média os invariantes de cada elemento; aqui
+eles são calculados do tensor já mediado no nó (diferem levemente em nós
+compartilhados por elementos com tensões descontínuas).
+
+Compatível com Python 2.7 (Abaqus) e 3.x.
+"""
+
+from __future__ import print_function
+import os
+import sys
+import numpy as np
+from numpy.lib.format import open_memmap
+from Stress_Layout import expand_stress, read_components
+
+try:    xrange
+except  NameError: xrange = range
+
+DEFAULT_CHUNK   = 200000          # nós por bloco (~200k x 3 x 3 float64 = 14 MB)
+INVARIANT_NAMES = ("von_mises", "max_principal", "min_principal")
+
+
+def tensor_invariants(stress, chunk_size=DEFAULT_CHUNK, out=None, components=None):
+    """
+    Retorna (von_mises, max_principal, min_principal), arrays float32 [n],
+    de um tensor [n, 9] ou [n, 6] (ordem em 'components', padrão de
+    Stress_Layout). Cada bloco de chunk_size nós usa uma única chamada de
+    np.linalg.eigvalsh sobre [chunk, 3, 3]. 'out' permite gravar direto em
+    arrays existentes (ex.: memmaps).
+    """
+    n = stress.shape[0]
+    if out is None:
+        out = tuple(np.empty(n, dtype=np.float32) for _ in INVARIANT_NAMES)
+    mises, max_p, min_p = out
+    chunk_size = max(1, int(chunk_size))
+
+    for start in xrange(0, n, chunk_size):
+        stop = min(start + chunk_size, n)
+        t = expand_stress(stress[start:stop], components)
+        s11, s22, s33 = t[:, 0, 0], t[:, 1, 1], t[:, 2, 2]
+        mises[start:stop] = np.sqrt(0.5 * ((s11 - s22) ** 2 + (s22 - s33) ** 2 + (s33 - s11) ** 2) +
+                                    3.0 * (t[:, 0, 1] ** 2 + t[:, 0, 2] ** 2 + t[:, 1, 2] ** 2))
+        eig = np.linalg.eigvalsh(t)            # autovalores em ordem crescente
+        max_p[start:stop] = eig[:, 2]
+        min_p[start:stop] = eig[:, 0]
+    return mises, max_p, min_p
+
+
+def _needs_invariants(paths, overwrite):
+    if overwrite:
+        return True
+    for path in paths:
+        if not os.path.exists(path):
+            return True
+        if not np.any(np.load(path, mmap_mode='r')):
+            return True
+    return False
+
+
+def fill_invariants(output_path, overwrite=False, chunk_size=DEFAULT_CHUNK):
+    """
+    Pós-processamento de uma saída do conversor: para cada stress_tensor.npy em
+    time_series/ (layout 'frames' ou 'time_major') grava von_mises.npy,
+    max_principal.npy e min_principal.npy quando faltam ou estão zerados
+    (ou sempre, com overwrite=True). Atualiza os checksums do manifesto de
+    conversão, se existir. Retorna o número de arrays de tensão processados.
+    """
+    series_dir = os.path.join(output_path, "time_series")
+    if not os.path.isdir(series_dir):
+        raise IOError("No time_series directory in {}".format(output_path))
+
+    components = read_components(output_path)
+    processed, touched = 0, []
+    for root, dirs, files in os.walk(series_dir):
+        dirs.sort()
+        if "stress_tensor.npy" not in files:
+            continue
+        targets = [os.path.join(root, name + ".npy") for name in INVARIANT_NAMES]
+        if not _needs_invariants(targets, overwrite):
+            continue
+
+        stress = np.load(os.path.join(root, "stress_tensor.npy"), mmap_mode='r')
+        if stress.ndim == 2:
+            # layout 'frames': um frame por pasta
+            out = tensor_invariants(stress, chunk_size, components=components)
+            for path, values in zip(targets, out):
+                np.save(path, values)
+        else:
+            # layout 'time_major': [n_frames, n_nodes, k], preenchido frame a frame
+            out = [open_memmap(path, mode='w+', dtype=np.float32, shape=stress.shape[:2])
+                   for path in targets]
+            for slot in xrange(stress.shape[0]):
+                tensor_invariants(stress[slot], chunk_size, out=tuple(arr[slot] for arr in out),
+                                  components=components)
+            for arr in out:
+                arr.flush()
+            del out
+        processed += 1
+        touched.append(root)
+        print("Invariants written: {}".format(os.path.relpath(root, output_path)))
+
+    if touched:
+        _refresh_manifest(output_path)
+    return processed
+
+
+def _refresh_manifest(output_path):
+    """Recalcula os checksums dos frames registrados (o conteúdo mudou)."""
+    try:
+        from Conversion_Manifest import load_manifest, save_manifest, frame_checksum
+    except ImportError:
+        return
+    manifest = load_manifest(output_path)
+    if manifest is None:
+        return
+    series_dir = os.path.join(output_path, "time_series")
+    for key, record in manifest["frames"].items():
+        step_dir = os.path.join(series_dir, key.split("/")[0])
+        meta = record["meta"]
+        arrays = {}
+        for name in record["fields"]:
+            frame_path = os.path.join(step_dir, meta["name"], name + ".npy")
+            if os.path.exists(frame_path):
+                arrays[name] = np.load(frame_path)
+            else:
+                arrays[name] = np.load(os.path.join(step_dir, name + ".npy"), mmap_mode='r')[meta["slot"]]
+        record["checksum"] = frame_checksum(arrays)
+    save_manifest(output_path, manifest)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        print("Usage: python Stress_Invariants.py <converter_output_dir> [--overwrite]")
+        sys.exit(1)
+    n = fill_invariants(sys.argv[1], overwrite="--overwrite" in sys.argv[2:])
+    print("{} stress arrays processed".format(n))
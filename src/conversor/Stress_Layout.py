@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Stress_Layout: ordem declarada das colunas de stress_tensor nas saídas do
+conversor e leitura compatível das duas formas de armazenamento.
+
+    'full'  -> [n, 9]  tensor 3x3 achatado por linhas   (S11 S12 S13 S21 ... S33)
+    'voigt' -> [n, 6]  simétrico, na ordem do Tensor6 do XDMF (S11 S12 S13 S22 S23 S33)
+
+O OdbToNPYConverter grava a ordem usada em stress_components.json (raiz do
+modelo); o Npy2XdmfConverter a copia para o atributo 'components' de cada
+dataset stress_tensor do HDF5. Leitores devem pedir componentes pelo nome
+(stress_component) e expandir para 3x3 só quando precisarem (expand_stress).
+
+Compatível com Python 2.7 (Abaqus) e 3.x.
+"""
+
+from __future__ import print_function
+import os
+import json
+import numpy as np
+
+COMPONENTS_FILE    = "stress_components.json"
+SUBSET_FIELDS_FILE = "subset_fields.json"
+
+FULL_COMPONENTS  = ("S11", "S12", "S13", "S21", "S22", "S23", "S31", "S32", "S33")
+VOIGT_COMPONENTS = ("S11", "S12", "S13", "S22", "S23", "S33")
+
+# (coluna de saída, coluna do vetor de S do Abaqus [S11, S22, S33, S12, S13, S23])
+ABAQUS_TO_FULL = (
+    (0, 0),  # S11
+    (4, 1),  # S22
+    (8, 2),  # S33
+    (1, 3), (3, 3),  # S12 -> (0,1) e (1,0)
+    (2, 4), (6, 4),  # S13
+    (5, 5), (7, 5),  # S23
+)
+ABAQUS_TO_VOIGT = ((0, 0), (3, 1), (5, 2), (1, 3), (2, 4), (4, 5))
+
+# componentLabels do Abaqus (sólidos 3D): ordem dos campos compactos sem seleção
+ABAQUS_LABELS = {
+    "S": ("S11", "S22", "S33", "S12", "S13", "S23"),
+    "U": ("U1", "U2", "U3"),
+}
+
+STORAGES = {
+    "full":  (FULL_COMPONENTS, ABAQUS_TO_FULL),
+    "voigt": (VOIGT_COMPONENTS, ABAQUS_TO_VOIGT),
+}
+
+
+def components_for(n_columns):
+    """Ordem padrão deduzida do número de colunas (saídas sem ordem declarada)."""
+    if n_columns == 9:
+        return FULL_COMPONENTS
+    if n_columns == 6:
+        return VOIGT_COMPONENTS
+    raise ValueError("Unknown stress layout with {} columns".format(n_columns))
+
+
+def components_of(dataset):
+    """Ordem declarada no atributo 'components' de um dataset HDF5 (ou None)."""
+    value = getattr(dataset, "attrs", {}).get("components")
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode("ascii")
+    return tuple(str(value).split())
+
+
+def write_components(output_path, storage):
+    with open(os.path.join(output_path, COMPONENTS_FILE), "w") as f:
+        json.dump({"storage": storage, "components": list(STORAGES[storage][0])}, f, indent=1)
+
+
+def read_components(model_dir):
+    """Ordem declarada em stress_components.json de uma pasta do conversor (ou None)."""
+    path = os.path.join(model_dir, COMPONENTS_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return tuple(json.load(f)["components"])
+
+
+def read_field_components(model_dir):
+    """
+    Ordem das colunas de cada campo compacto ('S.npy', 'U.npy', ...) de uma
+    conversão por subconjunto, lida de subset_fields.json: {campo: componentes}.
+    Lista vazia = todas as componentes do Abaqus (ABAQUS_LABELS). {} sem o arquivo.
+    """
+    path = os.path.join(model_dir, SUBSET_FIELDS_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        fields = json.load(f).get("fields", [])
+    result = {}
+    for field in fields:
+        comps = tuple(field.get("components") or ABAQUS_LABELS.get(field["name"], ()))
+        if comps:
+            result[field["name"]] = comps
+    return result
+
+
+def stress_component(stress, name, components=None):
+    """
+    Uma componente (ex.: 'S33') de um array ou dataset [..., k]; lê só essa
+    coluna de um dataset h5py. Para o tensor completo, S21 == S12 etc.
+    """
+    components = tuple(components or components_for(stress.shape[-1]))
+    if name not in components and len(name) == 3:
+        name = name[0] + name[2] + name[1]          # simetria: S32 -> S23
+    return stress[..., components.index(name)]
+
+
+def expand_stress(stress, components=None):
+    """Array [..., 9] ou [..., 6] -> tensores [..., 3, 3] (float64)."""
+    stress = np.asarray(stress)
+    components = tuple(components or components_for(stress.shape[-1]))
+    full = np.empty(stress.shape[:-1] + (3, 3), dtype=np.float64)
+    for i in range(3):
+        for j in range(3):
+            full[..., i, j] = stress_component(stress, "S{}{}".format(i + 1, j + 1), components)
+    return full
@@ -0,0 +1,316 @@
+# -*- coding: utf-8 -*-
+"""
+odbAccess (stand-in): imitação em Python puro da parte da API do Abaqus usada
+pelo OdbToNPYConverter, para exercitar o conversor e o batch sem Abaqus.
+
+Um "ODB" sintético é um pequeno arquivo JSON com a especificação do modelo;
+openOdb() lê essa especificação e gera sob demanda a malha (hexaedros C3D8 em
+grade regular), os steps/frames e os campos U (NODAL) e S (ELEMENT_NODAL) com
+bulkDataBlocks, de forma determinística.
+
+Parâmetros da especificação (DEFAULT_SPEC): n_nodes, n_frames, n_steps,
+n_instances, size, seed, invariants e duplication. 'duplication' é o número
+médio de valores ELEMENT_NODAL de S por nó: None mantém o natural da grade de
+hexaedros (~8 no interior); valores maiores repetem a conectividade nos blocos
+de S, imitando malhas com mais elementos por nó (tetraedros: ~20).
+
+Para testar o batch, a especificação também aceita 'fail' (openOdb levanta
+IOError, como um ODB corrompido) e 'exit_code' (openOdb encerra o processo
+com esse código, como um Abaqus que morre no meio da conversão).
+
+O benchmark de throughput do conversor (scripts/bench_odb_converter.py) usa
+este módulo.
+
+Uso:
+    import sys
+    sys.path.insert(0, os.path.join(conversor_dir, 'odb_standin'))
+    from odbAccess import write_synthetic_odb
+    write_synthetic_odb(r'C:\\Temp\\fake\\Model_A.odb', n_nodes=20000, n_frames=5)
+    # a partir daqui 'from odbAccess import *' no conversor usa o stand-in
+"""
+
+from __future__ import print_function
+import os
+import json
+import numpy as np
+
+try:    xrange
+except  NameError: xrange = range
+
+
+class SymbolicConstant(str):
+    """Equivalente das constantes simbólicas do Abaqus (NODAL, ELEMENT_NODAL...)."""
+    def __repr__(self):
+        return str(self)
+
+
+NODAL             = SymbolicConstant('NODAL')
+ELEMENT_NODAL     = SymbolicConstant('ELEMENT_NODAL')
+INTEGRATION_POINT = SymbolicConstant('INTEGRATION_POINT')
+CENTROID          = SymbolicConstant('CENTROID')
+
+DEFAULT_SPEC = {
+    "n_nodes":    1000,           # nº aproximado de nós (grade nx x ny x nz)
+    "n_frames":   3,              # frames por step
+    "n_steps":    1,
+    "n_instances": 1,
+    "size":       (10.0, 10.0, 10.0),
+    "seed":       0,
+    "invariants": True,           # blocos de S com mises/maxPrincipal/minPrincipal
+    "duplication": None           # valores ELEMENT_NODAL por nó (None: o da grade)
+}
+
+
+# ----------------------------------------------------------------------------
+# Malha
+# ----------------------------------------------------------------------------
+class OdbMeshNode(object):
+    __slots__ = ("label", "coordinates")
+
+    def __init__(self, label, coordinates):
+        self.label = label
+        self.coordinates = coordinates
+
+
+class OdbMeshElement(object):
+    __slots__ = ("label", "connectivity", "type")
+
+    def __init__(self, label, connectivity, type='C3D8'):
+        self.label = label
+        self.connectivity = connectivity
+        self.type = type
+
+
+class OdbSet(object):
+    def __init__(self, name, nodes, instanceNames=None):
+        self.name = name
+        self.nodes = nodes
+        self.instanceNames = instanceNames
+
+    def _labels_by_instance(self):
+        if self.instanceNames is None:
+            return None
+        return dict((name, set(n.label for n in nodes))
+                    for name, nodes in zip(self.instanceNames, self.nodes))
+
+
+class OdbInstance(object):
+    def __init__(self, name, labels, coords, conn_labels, duplication=None):
+        self.name = name
+        self.node_labels = labels            # arrays usados para gerar os campos
+        self.node_coords = coords
+        self.conn_labels = conn_labels
+        # Linhas ELEMENT_NODAL de S: a conectividade repetida 'reps' vezes
+        reps = 1
+        if duplication:
+            reps = max(1, int(round(float(duplication) * labels.size / conn_labels.size)))
+        self.en_labels = np.tile(conn_labels.ravel(), reps)
+        self.en_elements = np.tile(np.repeat(np.arange(1, conn_labels.shape[0] + 1),
+                                             conn_labels.shape[1]), reps)
+        self.nodes = [OdbMeshNode(int(l), tuple(float(c) for c in xyz))
+                      for l, xyz in zip(labels, coords)]
+        self.elements = [OdbMeshElement(i + 1, tuple(int(l) for l in row))
+                         for i, row in enumerate(conn_labels)]
+        self.nodeSets = {}
+        self.elementSets = {}
+
+
+class OdbAssembly(object):
+    def __init__(self, instances):
+        self.instances = instances
+        self.nodeSets = {}
+        self.elementSets = {}
+
+    def NodeSetFromNodeLabels(self, name, nodeLabels):
+        by_label = {}
+        names, nodes = [], []
+        for inst_name, labels in nodeLabels:
+            inst = self.instances[inst_name]
+            if inst_name not in by_label:
+                by_label[inst_name] = dict((n.label, n) for n in inst.nodes)
+            names.append(inst_name)
+            nodes.append(tuple(by_label[inst_name][l] for l in labels))
+        nset = OdbSet(name, tuple(nodes), tuple(names))
+        self.nodeSets[name] = nset
+        return nset
+
+
+def _structured_mesh(n_nodes, size, offset):
+    """Grade regular de hexaedros com ~n_nodes nós."""
+    n_side = max(2, int(round(n_nodes ** (1.0 / 3.0))))
+    nx = ny = nz = n_side
+    axes = [np.linspace(0.0, size[i], n) for i, n in enumerate((nx, ny, nz))]
+    zz, yy, xx = np.meshgrid(axes[2], axes[1], axes[0], indexing='ij')
+    coords = np.column_stack((xx.ravel() + offset, yy.ravel(), zz.ravel()))
+    labels = np.arange(1, coords.shape[0] + 1, dtype=np.int64)
+
+    grid = labels.reshape(nz, ny, nx)
+    c = [grid[k:nz - 1 + k, j:ny - 1 + j, i:nx - 1 + i].ravel()
+         for k, j, i in ((0, 0, 0), (0, 0, 1), (0, 1, 1), (0, 1, 0),
+                         (1, 0, 0), (1, 0, 1), (1, 1, 1), (1, 1, 0))]
+    conn_labels = np.column_stack(c)
+    return labels, coords, conn_labels
+
+
+# ----------------------------------------------------------------------------
+# Campos
+# ----------------------------------------------------------------------------
+class FieldBulkData(object):
+    def __init__(self, instance, position, nodeLabels, data, elementLabels=None,
+                 mises=None, maxPrincipal=None, minPrincipal=None):
+        self.instance = instance
+        self.position = position
+        self.nodeLabels = nodeLabels
+        self.elementLabels = elementLabels
+        self.data = data
+        self.mises = mises
+        self.maxPrincipal = maxPrincipal
+        self.minPrincipal = minPrincipal
+
+    def _subset(self, keep):
+        def take(arr):
+            return None if arr is None else arr[keep]
+        return FieldBulkData(self.instance, self.position, self.nodeLabels[keep],
+                             self.data[keep], take(self.elementLabels),
+                             take(self.mises), take(self.maxPrincipal), take(self.minPrincipal))
+
+
+class FieldOutput(object):
+    def __init__(self, name, componentLabels, bulkDataBlocks):
+        self.name = name
+        self.componentLabels = componentLabels
+        self.bulkDataBlocks = bulkDataBlocks
+
+    @property
+    def values(self):
+        # O conversor só usa bulkDataBlocks; values fica vazio de propósito.
+        return []
+
+    def getSubset(self, position=None, region=None):
+        blocks = self.bulkDataBlocks
+        if position is not None:
+            blocks = [b for b in blocks if b.position == position]
+        if region is not None:
+            by_inst = region._labels_by_instance()
+            subset = []
+            for b in blocks:
+                if by_inst is None:
+                    labels = set(n.label for n in region.nodes)
+                else:
+                    labels = by_inst.get(b.instance.name, set())
+                keep = np.fromiter((l in labels for l in b.nodeLabels), dtype=bool,
+                                   count=len(b.nodeLabels))
+                if np.any(keep):
+                    subset.append(b._subset(keep))
+            blocks = subset
+        return FieldOutput(self.name, self.componentLabels, blocks)
+
+
+def _principal(s6):
+    """Invariantes (mises, max, min) de tensores em Voigt [S11,S22,S33,S12,S13,S23]."""
+    t = np.empty((s6.shape[0], 3, 3), dtype=np.float64)
+    t[:, 0, 0], t[:, 1, 1], t[:, 2, 2] = s6[:, 0], s6[:, 1], s6[:, 2]
+    t[:, 0, 1] = t[:, 1, 0] = s6[:, 3]
+    t[:, 0, 2] = t[:, 2, 0] = s6[:, 4]
+    t[:, 1, 2] = t[:, 2, 1] = s6[:, 5]
+    eig = np.linalg.eigvalsh(t)
+    mises = np.sqrt(0.5 * ((s6[:, 0] - s6[:, 1]) ** 2 + (s6[:, 1] - s6[:, 2]) ** 2 +
+                           (s6[:, 2] - s6[:, 0]) ** 2) +
+                    3.0 * (s6[:, 3] ** 2 + s6[:, 4] ** 2 + s6[:, 5] ** 2))
+    return (mises.astype(np.float32), eig[:, 2].astype(np.float32),
+            eig[:, 0].astype(np.float32))
+
+
+class OdbFrame(object):
+    """Frame cujos campos são gerados a cada acesso (memória limitada)."""
+    def __init__(self, odb, step_index, frame_index, frameValue):
+        self._odb = odb
+        self.step_index = step_index
+        self.frameId = frame_index
+        self.incrementNumber = frame_index
+        self.frameValue = frameValue
+
+    @property
+    def fieldOutputs(self):
+        return self._odb._build_fields(self)
+
+
+class OdbStep(object):
+    def __init__(self, odb, name, index, n_frames):
+        self.name = name
+        self.frames = [OdbFrame(odb, index, i, (i + 1.0) / n_frames) for i in xrange(n_frames)]
+
+
+class Odb(object):
+    def __init__(self, path, spec):
+        self.path = path
+        self.name = path
+        self.spec = spec
+        self.isReadOnly = True
+
+        instances = {}
+        size = spec["size"]
+        for i in xrange(spec["n_instances"]):
+            labels, coords, conn = _structured_mesh(spec["n_nodes"] // spec["n_instances"],
+                                                    size, offset=i * 1.5 * size[0])
+            name = "PART-{}-1".format(i + 1)
+            instances[name] = OdbInstance(name, labels, coords, conn, spec.get("duplication"))
+        self.rootAssembly = OdbAssembly(instances)
+
+        self.steps = {}
+        for s in xrange(spec["n_steps"]):
+            name = "Step-{}".format(s + 1)
+            self.steps[name] = OdbStep(self, name, s, spec["n_frames"])
+
+    def _build_fields(self, frame):
+        """U nodal e S elemento-nodal, funções suaves das coordenadas e do tempo."""
+        t = frame.frameValue + frame.step_index
+        rng = np.random.RandomState(self.spec["seed"] + 7919 * frame.step_index + frame.frameId)
+        u_blocks, s_blocks = [], []
+        for name in sorted(self.rootAssembly.instances):
+            inst = self.rootAssembly.instances[name]
+            xyz = inst.node_coords
+            u = (1e-3 * t * np.column_stack((np.sin(xyz[:, 0]), np.cos(xyz[:, 1]), xyz[:, 2])))
+            u_blocks.append(FieldBulkData(inst, NODAL, inst.node_labels.copy(), u.astype(np.float32)))
+
+            en_labels = inst.en_labels
+            en_xyz = xyz[en_labels - 1]
+            s6 = np.empty((en_labels.size, 6), dtype=np.float64)
+            s6[:, 0] = 100.0 * t * np.cos(en_xyz[:, 0])
+            s6[:, 1] = 80.0 * t * np.sin(en_xyz[:, 1])
+            s6[:, 2] = 120.0 * t * (en_xyz[:, 2] - en_xyz[:, 0])
+            s6[:, 3:] = 10.0 * t
+            s6 += rng.normal(0.0, 1.0, size=s6.shape)   # descontinuidade entre elementos
+            invariants = _principal(s6) if self.spec["invariants"] else (None, None, None)
+            s_blocks.append(FieldBulkData(inst, ELEMENT_NODAL, en_labels.copy(), s6.astype(np.float32),
+                                          inst.en_elements, *invariants))
+        return {
+            'U': FieldOutput('U', ('U1', 'U2', 'U3'), u_blocks),
+            'S': FieldOutput('S', ('S11', 'S22', 'S33', 'S12', 'S13', 'S23'), s_blocks)
+        }
+
+    def close(self):
+        pass
+
+
+# ----------------------------------------------------------------------------
+# API
+# ----------------------------------------------------------------------------
+def write_synthetic_odb(path, **spec):
+    """Grava a especificação de um ODB sintético (JSON) em path."""
+    full = dict(DEFAULT_SPEC)
+    full.update(spec)
+    with open(path, "w") as f:
+        json.dump(full, f, indent=1)
+    return path
+
+
+def openOdb(path, readOnly=True):
+    with open(path, "r") as f:
+        spec = dict(DEFAULT_SPEC)
+        spec.update(json.load(f))
+    if spec.get("fail"):
+        raise IOError("Synthetic ODB marked as corrupt: {}".format(path))
+    if spec.get("exit_code") is not None:
+        os._exit(int(spec["exit_code"]))       # processo morto sem limpeza
+    return Odb(path, spec)
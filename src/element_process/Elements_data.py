@@ -0,0 +1,106 @@
+"""
+Elements_data.py
+What it does:
+Binary companion of elements_data.txt. s1_Ele_Extractor writes elements_data.npz next to the text file with the element IDs, the element type codes (plus the type names they index) and the centroids, and the readers of the element table (ElementTensionInterpolator, StressProcessor, Elements_plot) load it instead of parsing the text when it exists and is newer than the .inp it came from. The text file stays as the human-readable export and as the fallback.
+
+Example of use:
+    from Modules_python.Elements_data import load_elements_table
+    df = load_elements_table("./Output/Mesh-0_98--Lenth-50/elements_data.txt")
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+ELEMENTS_TXT = "elements_data.txt"
+ELEMENTS_NPZ = "elements_data.npz"
+
+def save_elements_npz(npz_path, elements, type_codes, type_names, centroids, inp_file=None):
+    """
+    save_elements_npz / (function)
+    What it does:
+    Writes the element table in binary form (uncompressed .npz, written to a temporary file and renamed, so readers never see a partial file). The absolute path of the source .inp is stored to check later whether the file is still current.
+    Parameters:
+        npz_path (str): Output path (elements_data.npz).
+        elements (np.array): Element IDs [n].
+        type_codes (np.array): Index of each element's type in type_names [n].
+        type_names (list): Element type names.
+        centroids (np.array): Centroid coordinates [n, 3].
+        inp_file (str, optional): The .inp the elements were read from.
+    """
+    tmp_path = npz_path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        np.savez(f,
+                 elements=np.asarray(elements, dtype=np.int64),
+                 type_codes=np.asarray(type_codes, dtype=np.int16),
+                 type_names=np.array([name or '' for name in type_names], dtype=str),
+                 centroids=np.asarray(centroids, dtype=np.float64).reshape(-1, 3),
+                 inp_file=np.array(os.path.abspath(inp_file) if inp_file else ''))
+    os.replace(tmp_path, npz_path)
+
+def elements_npz_for(elements_file):
+    """
+    elements_npz_for / (function)
+    What it does:
+    Returns the elements_data.npz that sits next to an elements table file (or in a directory), or None when there is none or it is older than the .inp it was extracted from.
+    Parameters:
+        elements_file (str): Path to elements_data.txt or to its directory.
+    Returns:
+        str or None: Path to the usable .npz.
+    """
+    folder = elements_file if os.path.isdir(elements_file) else os.path.dirname(elements_file)
+    npz_path = os.path.join(folder, ELEMENTS_NPZ)
+    if not os.path.isfile(npz_path):
+        return None
+    try:
+        with np.load(npz_path) as data:
+            inp_file = str(data['inp_file'])
+    except Exception:
+        return None
+    if inp_file and os.path.isfile(inp_file) and os.path.getmtime(inp_file) > os.path.getmtime(npz_path):
+        return None
+    return npz_path
+
+def load_elements_npz(npz_path):
+    """
+    load_elements_npz / (function)
+    What it does:
+    Loads an elements_data.npz written by save_elements_npz.
+    Parameters:
+        npz_path (str): Path to the .npz file.
+    Returns:
+        dict: elements [n], types [n] (names), type_codes [n], type_names, centroids [n, 3].
+    """
+    with np.load(npz_path) as data:
+        type_names = data['type_names']
+        type_codes = data['type_codes']
+        return {
+            'elements': data['elements'],
+            'types': type_names[type_codes] if len(type_names) else np.array([''] * len(type_codes)),
+            'type_codes': type_codes,
+            'type_names': type_names.tolist(),
+            'centroids': data['centroids'],
+        }
+
+def load_elements_table(elements_file):
+    """
+    load_elements_table / (function)
+    What it does:
+    Reads the element table as a pandas DataFrame with the columns of elements_data.txt (Element, Type, X_center, Y_center, Z_center), from the binary .npz when a current one exists and from the tab-separated text otherwise.
+    Parameters:
+        elements_file (str): Path to elements_data.txt.
+    Returns:
+        pd.DataFrame: Element table.
+    """
+    npz_path = elements_npz_for(elements_file)
+    if npz_path is None:
+        return pd.read_csv(elements_file, sep='\t')
+    data = load_elements_npz(npz_path)
+    centroids = data['centroids']
+    return pd.DataFrame({
+        'Element': data['elements'],
+        'Type': data['types'],
+        'X_center': centroids[:, 0],
+        'Y_center': centroids[:, 1],
+        'Z_center': centroids[:, 2]
+    })
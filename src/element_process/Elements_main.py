@@ -13,13 +13,13 @@ import os
 import glob
 from .s1_Ele_Extractor       import run_element_extractor
 from .s2_RE_Field            import main as generate_stress
-from .s3_RE_Interpolator     import ElementTensionInterpolator
+from .s3_RE_Interpolator     import ElementTensionInterpolator, OPERATOR_CACHE_DIR
 from utils                  import *
 
 # Configure the logger for this module.
 logger = setup_logger(__name__, clear=True)
 
-def Nodes_main(base_dir=None, use_s1=True, use_s2=True, use_s3=True):
+def Nodes_main(base_dir=None, use_s1=True, use_s2=True, use_s3=True, cache_dir=None):
     """
     Nodes_main / (function)
     What it does:
@@ -33,9 +33,12 @@ def Nodes_main(base_dir=None, use_s1=True, use_s2=True, use_s3=True):
         use_s1 (bool): Whether to run node extraction. Defaults to True.
         use_s2 (bool): Whether to generate residual stress field. Defaults to True.
         use_s3 (bool): Whether to interpolate stresses. Defaults to True.
+        cache_dir (str, optional): Folder of the interpolation operators cached by step 3, shared by all meshes of the batch. Defaults to Output/interpolation_cache in base_dir.
     """
     if base_dir is None:
         base_dir = os.getcwd()
+    if cache_dir is None:
+        cache_dir = os.path.join(base_dir, 'Output', OPERATOR_CACHE_DIR)
     
     # Buscar todos os arquivos .inp com o padrão "Mesh-*--Lenth-*.inp"
     inp_pattern = os.path.join(base_dir, "Mesh-*--Lenth-*.inp")
@@ -78,7 +81,7 @@ def Nodes_main(base_dir=None, use_s1=True, use_s2=True, use_s3=True):
             # Passo 3: Interpolar tensões no campo original
             logger.info("="*10 + " Interpolating stresses..." + "\n")
             if use_s3:
-                interpolator = ElementTensionInterpolator(output_dir)
+                interpolator = ElementTensionInterpolator(output_dir, cache_dir)
                 interpolator.Class_runner()
             else:
                 logger.info("Stress interpolation disabled. Skipping this step.\n")
@@ -25,14 +25,19 @@ from mpl_toolkits.mplot3d import Axes3D
 import pandas as pd
 import os
 
+try:
+    from .Elements_data import load_elements_table
+except ImportError:
+    from Elements_data import load_elements_table
+
 def load_element_data(filepath):
     """
     load_element_data / (function)
     What it does:
-    Loads element centroid coordinates from a tab-separated file, renaming columns to standard X, Y, Z labels. Returns a pandas DataFrame with element positions for further analysis or plotting.
+    Loads element centroid coordinates from a tab-separated file (or from the binary elements_data.npz next to it, when current), renaming columns to standard X, Y, Z labels. Returns a pandas DataFrame with element positions for further analysis or plotting.
     """
     try:
-        df = pd.read_csv(filepath, sep='\t')
+        df = load_elements_table(filepath)
         df.rename(columns={
             'X_center': 'X',
             'Y_center': 'Y',
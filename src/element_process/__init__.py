@@ -14,7 +14,7 @@ from .s1_Ele_Extractor     import run_element_extractor
 from .s2_RE_ExnCon         import StressProcessor
 from .s2_RE_ExnCon2        import StressProcessorBatch
 from .s2_RE_Field          import main as generate_stress
-from .s3_RE_Interpolator   import ElementTensionInterpolator
+from .s3_RE_Interpolator   import ElementTensionInterpolator, prune_operator_cache
 
 __all__ = [
     "Nodes_main",
@@ -23,6 +23,7 @@ __all__ = [
     "StressProcessorBatch",
     "generate_stress",
     "ElementTensionInterpolator",
+    "prune_operator_cache",
     
     'Elements_main',
     's1_Ele_Extractor',
@@ -2,7 +2,7 @@
 """
 s1_Ele_Extractor.py
 What it does:
-Extracts element and node information from Abaqus .inp files, computes element centroid coordinates, and saves the results for further analysis or visualization. Provides functions for parsing element connectivity, node coordinates, and exporting structured data to text and CSV files. Useful for preprocessing finite element models for post-processing or machine learning tasks.
+Extracts element and node information from Abaqus .inp files, computes element centroid coordinates, and saves the results for further analysis or visualization. Provides functions for parsing element connectivity, node coordinates, and exporting structured data to text and CSV files, plus the binary elements_data.npz read by the later steps. Useful for preprocessing finite element models for post-processing or machine learning tasks.
 
 Example of use:
     from Modules_python.s1_Ele_Extractor import run_element_extractor
@@ -12,53 +12,269 @@ Example of use:
 from utils import *
 import numpy as np
 import os
+import warnings
 import pandas as pd
+from .Elements_data import ELEMENTS_NPZ, save_elements_npz
 
 # Initialize the logger for this module
 logger = setup_logger(__name__)
 
-def extract_elements_from_inp(input_file):
+# Data lines parsed together (one numpy conversion per block)
+BLOCK_LINES = 65536
+# Elements per chunk in the centroid gather (bounds the temporary arrays)
+CENTROID_CHUNK = 262144
+
+class _GrowableArray:
     """
-    extract_elements_from_inp / (function)
+    _GrowableArray / (class)
     What it does:
-    Parses an Abaqus .inp file to extract element IDs, element types, and the list of connected node IDs for each element. Returns arrays and lists suitable for further processing or coordinate calculation.
+    Append-only numpy buffer that doubles its capacity when full, so a file of unknown size is read without Python lists of numbers.
+    """
+    def __init__(self, dtype, width=None, capacity=1024):
+        self._shape = (capacity,) if width is None else (capacity, width)
+        self._data = np.empty(self._shape, dtype=dtype)
+        self._size = 0
+
+    def extend(self, values):
+        n = len(values)
+        if self._size + n > len(self._data):
+            capacity = max(2 * len(self._data), self._size + n)
+            data = np.empty((capacity,) + self._data.shape[1:], dtype=self._data.dtype)
+            data[:self._size] = self._data[:self._size]
+            self._data = data
+        self._data[self._size:self._size + n] = values
+        self._size += n
+
+    def array(self):
+        """Trimmed copy of the filled part (the buffer itself is released)."""
+        out = self._data[:self._size].copy()
+        self._data = self._data[:0]
+        return out
+
+def _keyword(line):
+    """('*element', {'type': 'C3D8R', ...}) of a keyword line; parameter names in lower case."""
+    parts = line.split(',')
+    params = {}
+    for part in parts[1:]:
+        if '=' in part:
+            key, value = part.split('=', 1)
+            params[key.strip().lower()] = value.strip()
+    return parts[0].strip().lower(), params
+
+def _parse_block(lines, dtype, width=None):
+    """
+    _parse_block / (function)
+    What it does:
+    Converts comma-separated data lines into a 2D array with one numpy call when every line has the same number of values (and exactly 'width' of them, when given). Returns None otherwise, so the caller falls back to parsing line by line.
+    """
+    n_values = lines[0].count(',') + 1
+    if width is not None and n_values != width:
+        return None
+    if any(line.count(',') + 1 != n_values for line in lines):
+        return None
+    try:
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", DeprecationWarning)
+            values = np.fromstring(" ".join(lines).replace(',', ' '), dtype=dtype, sep=' ')
+    except (ValueError, DeprecationWarning):
+        return None
+    if values.size != n_values * len(lines):
+        return None
+    return values.reshape(len(lines), n_values)
+
+def read_inp_mesh(input_file, block_lines=BLOCK_LINES):
+    """
+    read_inp_mesh / (function)
+    What it does:
+    Reads the nodes and elements of an Abaqus .inp file in a single streaming pass. Data lines are gathered in blocks of block_lines and each block is converted with one numpy call (line-by-line parsing only for irregular blocks), appended to growable numpy buffers. Element connectivity is stored in CSR form: the nodes of element i are connectivity[offsets[i]:offsets[i + 1]]. Element lines ending with a comma continue on the next line. Comment lines (**) are ignored and *Node/*Element blocks end at the next keyword.
     Parameters:
         input_file (str): Path to the .inp file.
+        block_lines (int): Data lines converted per numpy call.
     Returns:
-        tuple: (elements, element_types, connected_nodes)
-            - elements: NumPy array of element IDs
-            - element_types: NumPy array of element types
-            - connected_nodes: List of lists of connected node IDs
+        dict:
+            - node_labels: int64 array [n_nodes]
+            - node_coords: float64 array [n_nodes, 3]
+            - elements: int64 array of element IDs [n_elems]
+            - type_codes: int16 array [n_elems], index into type_names
+            - type_names: list of element type names (the type= of each *Element block)
+            - offsets: int64 array [n_elems + 1]
+            - connectivity: int64 array of node IDs
     """
-    elements = []
-    element_types = []
-    connected_nodes = []
-    extracting = False
+    node_labels = _GrowableArray(np.int64)
+    node_coords = _GrowableArray(np.float64, 3)
+    elements = _GrowableArray(np.int64)
+    type_codes = _GrowableArray(np.int16)
+    counts = _GrowableArray(np.int64)
+    connectivity = _GrowableArray(np.int64)
+    type_names = []
+
+    section = None          # 'node', 'element' or None
     current_type = None
+    pending = []            # data lines not converted yet
+    carry = ''              # element continued on the next line
+
+    def flush():
+        if not pending:
+            return
+        if section == 'node':
+            block = _parse_block(pending, np.float64, width=4)
+            if block is None:
+                block = _parse_node_lines(pending)
+            node_labels.extend(block[:, 0].astype(np.int64))
+            node_coords.extend(block[:, 1:4])
+        else:
+            code = type_names.index(current_type)
+            block = _parse_block(pending, np.int64)
+            if block is not None and block.shape[1] >= 2:
+                elements.extend(block[:, 0])
+                counts.extend(np.full(len(block), block.shape[1] - 1, dtype=np.int64))
+                connectivity.extend(block[:, 1:].ravel())
+                type_codes.extend(np.full(len(block), code, dtype=np.int16))
+            else:
+                labels, sizes, nodes = _parse_element_lines(pending)
+                elements.extend(labels)
+                counts.extend(sizes)
+                connectivity.extend(nodes)
+                type_codes.extend(np.full(len(labels), code, dtype=np.int16))
+        del pending[:]
 
     with open(input_file, 'r') as f:
         for line in f:
             line = line.strip()
-            if line.startswith('*Element'):
-                extracting = True
-                if 'type=' in line.lower():
-                    current_type = line.split('=')[1].strip().strip(',')
+            if not line or line.startswith('**'):
                 continue
-            if line.startswith('*') and not line.startswith('*Element'):
-                extracting = False
+            if line.startswith('*'):
+                if carry:
+                    pending.append(carry.rstrip(','))
+                    carry = ''
+                flush()
+                keyword, params = _keyword(line)
+                if keyword == '*node':
+                    section = 'node'
+                elif keyword == '*element':
+                    section = 'element'
+                    current_type = params.get('type', current_type)
+                    if current_type not in type_names:
+                        type_names.append(current_type)
+                else:
+                    section = None
+                continue
+            if section is None:
+                continue
+            if section == 'element':
+                if line.endswith(','):
+                    carry += line
+                    continue
+                line, carry = carry + line, ''
+            pending.append(line)
+            if len(pending) >= block_lines:
+                flush()
+        if carry:
+            pending.append(carry.rstrip(','))
+        flush()
+
+    counts = counts.array()
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    return {
+        'node_labels': node_labels.array(),
+        'node_coords': node_coords.array(),
+        'elements': elements.array(),
+        'type_codes': type_codes.array(),
+        'type_names': type_names,
+        'offsets': offsets,
+        'connectivity': connectivity.array(),
+    }
+
+def _parse_node_lines(lines):
+    """Line-by-line fallback for node blocks: [label, x, y, z] rows, invalid lines skipped."""
+    rows = []
+    for line in lines:
+        parts = line.replace(',', ' ').split()
+        if len(parts) >= 4:
+            try:
+                rows.append((int(parts[0]), float(parts[1]), float(parts[2]), float(parts[3])))
+            except ValueError:
+                pass
+    return np.array(rows, dtype=np.float64).reshape(-1, 4)
+
+def _parse_element_lines(lines):
+    """Line-by-line fallback for element blocks: (labels, node counts, node IDs), invalid lines skipped."""
+    labels, sizes, nodes = [], [], []
+    for line in lines:
+        parts = line.replace(',', ' ').split()
+        if len(parts) >= 2:  # At least one element and one node
+            try:
+                values = [int(p) for p in parts]
+            except ValueError:
                 continue
-            if extracting and line and not line.startswith('*'):
-                parts = line.replace(',', ' ').split()
-                if len(parts) >= 2:  # At least one element and one node
-                    try:
-                        elements.append(int(parts[0]))
-                        element_types.append(current_type)
-                        # The remaining values are connected nodes
-                        connected_nodes.append([int(p) for p in parts[1:]])
-                    except ValueError:
-                        pass
-
-    return np.array(elements), np.array(element_types), connected_nodes
+            labels.append(values[0])
+            sizes.append(len(values) - 1)
+            nodes.extend(values[1:])
+    return (np.array(labels, dtype=np.int64), np.array(sizes, dtype=np.int64),
+            np.array(nodes, dtype=np.int64))
+
+def element_centroids(node_labels, node_coords, offsets, connectivity, chunk=CENTROID_CHUNK):
+    """
+    element_centroids / (function)
+    What it does:
+    Computes the centroid of every element of a CSR connectivity in one gather-and-mean per chunk of elements. Node IDs missing from node_labels are left out of the mean; an element with no known node gets NaN.
+    Parameters:
+        node_labels (np.array): Node IDs [n_nodes].
+        node_coords (np.array): Node coordinates [n_nodes, 3].
+        offsets (np.array): CSR offsets [n_elems + 1].
+        connectivity (np.array): Node IDs of all elements, concatenated.
+        chunk (int): Elements per chunk.
+    Returns:
+        tuple: (avg_x, avg_y, avg_z) as NumPy arrays.
+    """
+    node_labels = np.asarray(node_labels, dtype=np.int64)
+    node_coords = np.asarray(node_coords, dtype=np.float64).reshape(-1, 3)
+    n_elems = len(offsets) - 1
+    centroids = np.full((n_elems, 3), np.nan)
+
+    # label -> row by binary search; for repeated labels the last row wins (as in a dict)
+    order = np.argsort(node_labels, kind='stable')
+    sorted_labels = node_labels[order]
+    for start in range(0, n_elems, max(1, int(chunk))):
+        stop = min(start + max(1, int(chunk)), n_elems)
+        first, last = offsets[start], offsets[stop]
+        if last == first:
+            continue
+        query = connectivity[first:last]
+        if len(sorted_labels):
+            pos = np.clip(np.searchsorted(sorted_labels, query, side='right') - 1, 0, None)
+            found = sorted_labels[pos] == query
+            rows = order[pos]
+        else:
+            found = np.zeros(len(query), dtype=bool)
+            rows = np.zeros(len(query), dtype=np.int64)
+        points = node_coords[rows] if len(node_coords) else np.zeros((len(query), 3))
+        points[~found] = 0.0
+        segments = offsets[start:stop] - first
+        sums = np.add.reduceat(points, segments, axis=0)
+        known = np.add.reduceat(found.astype(np.int64), segments)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            centroids[start:stop] = sums / known[:, None]
+    return centroids[:, 0], centroids[:, 1], centroids[:, 2]
+
+def extract_elements_from_inp(input_file):
+    """
+    extract_elements_from_inp / (function)
+    What it does:
+    Parses an Abaqus .inp file to extract element IDs, element types, and the list of connected node IDs for each element. Kept for callers of the list-based interface; run_element_extractor uses read_inp_mesh directly.
+    Parameters:
+        input_file (str): Path to the .inp file.
+    Returns:
+        tuple: (elements, element_types, connected_nodes)
+            - elements: NumPy array of element IDs
+            - element_types: NumPy array of element types
+            - connected_nodes: List of lists of connected node IDs
+    """
+    mesh = read_inp_mesh(input_file)
+    offsets, connectivity = mesh['offsets'], mesh['connectivity']
+    connected_nodes = [connectivity[offsets[i]:offsets[i + 1]].tolist() for i in range(len(offsets) - 1)]
+    return mesh['elements'], _element_types(mesh), connected_nodes
 
 def get_element_coordinates(connected_nodes, node_coords):
     """
@@ -71,64 +287,31 @@ def get_element_coordinates(connected_nodes, node_coords):
     Returns:
         tuple: (avg_x, avg_y, avg_z) as NumPy arrays.
     """
-    x_coords = []
-    y_coords = []
-    z_coords = []
-    
-    for nodes in connected_nodes:
-        x_vals = []
-        y_vals = []
-        z_vals = []
-        
-        for node in nodes:
-            if node in node_coords:
-                x_vals.append(node_coords[node][0])
-                y_vals.append(node_coords[node][1])
-                z_vals.append(node_coords[node][2])
-        
-        if x_vals:  # If valid values exist
-            x_coords.append(np.mean(x_vals))
-            y_coords.append(np.mean(y_vals))
-            z_coords.append(np.mean(z_vals))
-        else:
-            x_coords.append(np.nan)
-            y_coords.append(np.nan)
-            z_coords.append(np.nan)
-    
-    return np.array(x_coords), np.array(y_coords), np.array(z_coords)
+    sizes = np.array([len(nodes) for nodes in connected_nodes], dtype=np.int64)
+    offsets = np.zeros(len(sizes) + 1, dtype=np.int64)
+    np.cumsum(sizes, out=offsets[1:])
+    connectivity = np.fromiter((n for nodes in connected_nodes for n in nodes), dtype=np.int64,
+                               count=int(offsets[-1]))
+    labels = np.fromiter(node_coords.keys(), dtype=np.int64, count=len(node_coords))
+    coords = np.array(list(node_coords.values()), dtype=np.float64).reshape(-1, 3)
+    return element_centroids(labels, coords, offsets, connectivity)
 
 def extract_node_coordinates(input_file):
     """
     extract_node_coordinates / (function)
     What it does:
-    Parses an Abaqus .inp file to extract node IDs and their (x, y, z) coordinates, returning a dictionary for fast lookup during element centroid calculation.
+    Parses an Abaqus .inp file to extract node IDs and their (x, y, z) coordinates, returning a dictionary for fast lookup during element centroid calculation. Kept for callers of the dict-based interface; run_element_extractor uses read_inp_mesh directly.
     Parameters:
         input_file (str): Path to the .inp file.
     Returns:
         dict: Mapping from node ID to (x, y, z) coordinates.
     """
-    node_coords = {}
-    extracting = False
-    
-    with open(input_file, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if line.startswith('*Node'):
-                extracting = True
-                continue
-            if line.startswith('*') and not line.startswith('*Node'):
-                extracting = False
-                continue
-            if extracting and line and not line.startswith('*'):
-                parts = line.replace(',', ' ').split()
-                if len(parts) >= 4:
-                    try:
-                        node_id = int(parts[0])
-                        node_coords[node_id] = (float(parts[1]), float(parts[2]), float(parts[3]))
-                    except ValueError:
-                        pass
-    
-    return node_coords
+    mesh = read_inp_mesh(input_file)
+    return dict(zip(mesh['node_labels'].tolist(), map(tuple, mesh['node_coords'].tolist())))
+
+def _element_types(mesh):
+    """Per-element type names (NumPy array) from the type codes of read_inp_mesh."""
+    return np.array(mesh['type_names'])[mesh['type_codes']]
 
 def save_element_info(elements, element_types, x, y, z, output_dir):
     """
@@ -173,7 +356,7 @@ def run_element_extractor(input_file, output_dir):
     """
     run_element_extractor / (function)
     What it does:
-    Orchestrates the extraction of node coordinates and element connectivity from an Abaqus .inp file, computes element centroids, and saves the results to the output directory. Ensures the output directory exists and logs the process.
+    Orchestrates the extraction of node coordinates and element connectivity from an Abaqus .inp file, computes element centroids, and saves the results to the output directory (elements_data.txt and elements_data.npz). Ensures the output directory exists and logs the process.
     Parameters:
         input_file (str): Path to the .inp file.
         output_dir (str): Output directory for saving extracted data.
@@ -181,14 +364,17 @@ def run_element_extractor(input_file, output_dir):
     # Ensure the output directory exists
     os.makedirs(output_dir, exist_ok=True)
     
-    # First, extract node coordinates from the .inp file
-    node_coords = extract_node_coordinates(input_file)
-    
-    # Next, extract element information
-    elements, element_types, connected_nodes = extract_elements_from_inp(input_file)
-    
+    # One streaming pass over the .inp: nodes and CSR connectivity as numpy arrays
+    mesh = read_inp_mesh(input_file)
+    logger.info(f"Read {len(mesh['node_labels'])} nodes and {len(mesh['elements'])} elements from {os.path.basename(input_file)}")
+
     # Calculate the average coordinates for each element
-    x, y, z = get_element_coordinates(connected_nodes, node_coords)
-    
-    # Save the extracted information
-    save_element_info(elements, element_types, x, y, z, output_dir)
\ No newline at end of file
+    x, y, z = element_centroids(mesh['node_labels'], mesh['node_coords'],
+                                mesh['offsets'], mesh['connectivity'])
+
+    # Save the extracted information: text export first, then the binary table the later steps read
+    save_element_info(mesh['elements'], _element_types(mesh), x, y, z, output_dir)
+    npz_path = os.path.join(output_dir, ELEMENTS_NPZ)
+    save_elements_npz(npz_path, mesh['elements'], mesh['type_codes'], mesh['type_names'],
+                      np.column_stack([x, y, z]), inp_file=input_file)
+    logger.info(f"Binary element data saved in: {npz_path}")
@@ -27,6 +27,8 @@ from typing import Dict, List, Optional, Union, Tuple, Any, Iterator
 from functools import lru_cache
 
 from utils import *
+from conversor.Stress_Layout import stress_component, components_of
+from .Elements_data import load_elements_table
 
 class StressProcessor:
     """
@@ -109,34 +111,73 @@ class StressProcessor:
         data = {}
         file_path = os.path.join(hdf5_folder, combined_file_name)
         
-        with h5py.File(file_path, 'r') as hf:
+        # swmr=True: lê os modelos já concluídos enquanto o conversor grava os demais
+        with h5py.File(file_path, 'r', swmr=True) as hf:
             for sim_name in hf.keys():  # cada simulação
-                sim_group = hf[sim_name]
-                
-                # Coordenadas da geometria
-                coords = sim_group["geometry"]["coordinates"][:]
+                if sim_name == "meshes":
+                    continue            # geometrias compartilhadas (hard links em <sim>/geometry)
+                sim_group = hf.get(sim_name)    # None: shard ainda não gravado
+                if sim_group is None or not sim_group.attrs.get("completed", True):
+                    continue
                 
-                # Pegar o primeiro frame disponível para stress
-                ts_group = sim_group["time_series"]
-                first_step = list(ts_group.keys())[0]
-                first_frame = list(ts_group[first_step].keys())[0]
-                                
-                frame_grp = ts_group[first_step][first_frame]
-                print(list(frame_grp.keys()))
+                try:
+                    coords, s33 = self._read_first_frame_s33(sim_group)
+                except (KeyError, IndexError, ValueError) as e:
+                    self.logger.warning(f"Skipping {sim_name}: {e}")
+                    continue
 
-                # Assumir que existe um campo de stress (ajustar nome conforme necessário)
-                stress_field = ts_group[first_step][first_frame]["stress_tensor"][:]  # ou "s33"
-                
                 data[f"{sim_name}.h5"] = {
                     'x': coords[:, 0],
                     'y': coords[:, 1], 
                     'z': coords[:, 2],
-                    's33': stress_field[:, 8]  # stress_field ou stress_field[:, 2] se for tensor
+                    's33': s33
                 }
         
         return data
 
 
+    @staticmethod
+    def _read_first_frame_s33(sim_group) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        _read_first_frame_s33 / (method)
+        What it does:
+        Reads the node coordinates and S33 of the first available frame of one simulation group. Full conversions store 'stress_tensor' over all nodes; subset conversions store a compact 'S' dataset [n_subset, k] whose rows follow geometry/subset_node_index, so the coordinates are restricted to those nodes. S33 is taken by name from the 'components' attribute.
+        Parameters:
+            sim_group (h5py.Group): Group of one simulation in the combined HDF5.
+        Returns:
+            tuple: (coords [n, 3], s33 [n])
+        Raises:
+            KeyError / ValueError: When the frame has no stress or S33 cannot be located.
+        """
+        geometry = sim_group["geometry"]
+        coords = geometry["coordinates"][:]
+
+        # Pegar o primeiro frame disponível para stress
+        ts_group = sim_group["time_series"]
+        first_step = list(ts_group.keys())[0]
+        first_frame = list(ts_group[first_step].keys())[0]
+        frame_grp = ts_group[first_step][first_frame]
+        print(list(frame_grp.keys()))
+
+        if "subset_node_index" not in geometry:
+            # S33 pelo nome: a ordem das colunas (9 ou 6) vem do atributo 'components'
+            stress_dset = frame_grp["stress_tensor"]
+            return coords, stress_component(stress_dset, "S33", components_of(stress_dset))
+
+        # Conversão por subconjunto: campo compacto 'S' só nos nós do subconjunto
+        coords = coords[geometry["subset_node_index"][:]]
+        if "S" not in frame_grp:
+            raise KeyError(f"no 'S' field in subset frame {frame_grp.name}")
+        stress_dset = frame_grp["S"]
+        components = components_of(stress_dset)
+        if components is None:
+            raise ValueError(f"compact field {stress_dset.name} has no 'components' attribute")
+        if "S33" not in components:
+            raise ValueError(f"S33 not among the converted components {' '.join(components)}")
+        if stress_dset.shape[0] != coords.shape[0]:
+            raise ValueError(f"{stress_dset.name} has {stress_dset.shape[0]} rows for {coords.shape[0]} subset nodes")
+        return coords, stress_dset[:, components.index("S33")]
+
     def extract_z0_data_by_z(self, data: Dict[str, Dict[str, np.ndarray]]) -> Dict[float, Dict[str, Dict[str, np.ndarray]]]:
         """
         extract_z0_data_by_z / (method)
@@ -184,14 +225,14 @@ class StressProcessor:
         """
         read_mesh_file / (method)
         What it does:
-        Reads the mesh file and returns a DataFrame with the element data, including element IDs and centroid coordinates. Returns None if reading fails.
+        Reads the mesh file and returns a DataFrame with the element data, including element IDs and centroid coordinates. The binary elements_data.npz next to it is used when it is current. Returns None if reading fails.
         Parameters:
             mesh_file (str): Path to the mesh file.
         Returns:
             Optional[pd.DataFrame]: DataFrame with mesh element data or None if failed.
         """
         try:
-            df = pd.read_csv(mesh_file, sep='\t')
+            df = load_elements_table(mesh_file)
             self.logger.info(f"Mesh file read successfully: {len(df)} elements")
             self.logger.info(f"Columns: {list(df.columns)}")
             return df
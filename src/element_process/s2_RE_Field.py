@@ -2,18 +2,30 @@
 """
 s2_RE_Field.py
 What it does:
-Generates a synthetic residual stress field in cylindrical coordinates for a given mesh, based on coordinate limits extracted from an information file or default values. The script creates a homogeneous node mesh, computes geometric center, calculates stresses, and saves the results in a text file. Useful for testing, benchmarking, or initializing simulation workflows when real stress data is unavailable.
+Generates a synthetic residual stress field in cylindrical coordinates for a given mesh, based on coordinate limits extracted from an information file or default values. The script creates a homogeneous node mesh, computes geometric center, calculates stresses, and saves the results in a text file (residual_stress.txt) and in a binary .npy with the same columns (residual_stress.npy). The mesh and the stresses are produced in fixed-size chunks of nodes, so the memory use does not grow with the field size; the stress profile is a pluggable function (see STRESS_LAWS). Useful for testing, benchmarking, or initializing simulation workflows when real stress data is unavailable.
 
 Example of use:
     from Modules_python.s2_RE_Field import main
     main(output_dir="./Output/Mesh-0_98--Lenth-50")
+    main(output_dir="./Output/bench", law="quench", target_density=400, text=False)
 """
 
 import numpy as np
 import os
 import re
+import time
 import pandas as pd
 from dataclasses import dataclass
+from numpy.lib.format import open_memmap
+
+# Nodes per chunk in the generator and the writers (~1M x 12 float64 = 96 MB)
+DEFAULT_CHUNK = 1000000
+
+# Columns of residual_stress.txt / residual_stress.npy
+FIELD_COLUMNS = ("ID", "X", "Y", "Z", "R", "Theta", "Sigma_r", "Sigma_theta", "Sigma_z",
+                 "Tau_r_theta", "Tau_r_z", "Tau_theta_z")
+TEXT_FILE = "residual_stress.txt"
+BINARY_FILE = "residual_stress.npy"
 
 @dataclass
 class CoordinateLimits:
@@ -117,11 +129,11 @@ def extract_coordinate_limits(file_path):
         return {}
 
 
-def generate_mesh(limits, target_density=15):
+def grid_axes(limits, target_density=15):
     """
-    generate_mesh / (function)
+    grid_axes / (function)
     What it does:
-    Generates a node mesh with homogeneous density based on the provided coordinate limits. The number of divisions for each axis is scaled to maintain uniform node spacing. Returns a NumPy array with columns [ID, X, Y, Z].
+    Returns the node coordinates along each axis (x, y, z) of the homogeneous mesh. The number of divisions for each axis is scaled to maintain uniform node spacing.
     """
     # Calculate ranges for each coordinate
     x_range = limits.x_max - limits.x_min
@@ -141,18 +153,34 @@ def generate_mesh(limits, target_density=15):
     x = np.linspace(limits.x_min, limits.x_max, x_divisions)
     y = np.linspace(limits.y_min, limits.y_max, y_divisions)
     z = np.linspace(limits.z_min, limits.z_max, z_divisions)
-    
-    total_nodes = x_divisions * y_divisions * z_divisions
-    nodes = np.zeros((total_nodes, 4))
-    
-    idx = 0
-    for z_val in z:
-        for y_val in y:
-            for x_val in x:
-                nodes[idx] = [idx + 1, x_val, y_val, z_val]
-                idx += 1
-                
-    return nodes
+    return x, y, z
+
+
+def generate_mesh(limits, target_density=15):
+    """
+    generate_mesh / (function)
+    What it does:
+    Generates a node mesh with homogeneous density based on the provided coordinate limits. Nodes are numbered with x varying fastest, then y, then z. Returns a NumPy array with columns [ID, X, Y, Z].
+    """
+    x, y, z = grid_axes(limits, target_density)
+    zz, yy, xx = np.meshgrid(z, y, x, indexing='ij')
+    ids = np.arange(1, xx.size + 1, dtype=np.float64)
+    return np.column_stack([ids, xx.ravel(), yy.ravel(), zz.ravel()])
+
+
+def iter_mesh_chunks(axes, chunk_size=DEFAULT_CHUNK):
+    """
+    iter_mesh_chunks / (function)
+    What it does:
+    Yields the nodes of the mesh defined by the axes from grid_axes in chunks of at most chunk_size nodes, in the same order and format as generate_mesh ([ID, X, Y, Z]). Only one chunk is in memory at a time.
+    """
+    x, y, z = axes
+    shape = (len(z), len(y), len(x))
+    total_nodes = len(x) * len(y) * len(z)
+    for start in range(0, total_nodes, max(1, int(chunk_size))):
+        flat = np.arange(start, min(start + max(1, int(chunk_size)), total_nodes))
+        iz, iy, ix = np.unravel_index(flat, shape)
+        yield np.column_stack([flat + 1.0, x[ix], y[iy], z[iz]])
 
 
 def calculate_geometric_center(limits):
@@ -168,12 +196,60 @@ def calculate_geometric_center(limits):
     )
 
 
-def calculate_cylindrical_stress(nodes, center):
+def max_distance_from_center(axes, center):
+    """
+    max_distance_from_center / (function)
+    What it does:
+    Largest 3D distance between the center and a node of the mesh. The farthest node is always a corner of the grid, so only the 8 corners are checked (the result equals the maximum over all nodes, without computing it).
+    """
+    x, y, z = axes
+    corners = np.array([(cx, cy, cz) for cx in (x[0], x[-1]) for cy in (y[0], y[-1]) for cz in (z[0], z[-1])])
+    dx = corners[:, 0] - center[0]
+    dy = corners[:, 1] - center[1]
+    dz = corners[:, 2] - center[2]
+    # same expressions as calculate_cylindrical_stress, so the value is bit-identical
+    r = np.sqrt(dx**2 + dy**2)
+    return float(np.max(np.sqrt(r**2 + dz**2)))
+
+
+def power_law_stress(distance_norm, r, theta, dz, amplitude=5000.0):
+    """
+    power_law_stress / (function)
+    What it does:
+    Default stress profile: normal stresses growing with the normalized distance from the center (sigma_r ~ d^2, sigma_theta ~ d, sigma_z ~ d^1.5), zero shear. Returns (sigma_r, sigma_theta, sigma_z, tau_rt, tau_rz, tau_tz).
+    """
+    # Tau (shear) as zero, if desired
+    zero = 0.0 * distance_norm
+    return (amplitude * (distance_norm**2), amplitude * distance_norm, amplitude * (distance_norm**1.5),
+            zero, zero, zero)
+
+
+def quench_stress(distance_norm, r, theta, dz, amplitude=5000.0):
+    """
+    quench_stress / (function)
+    What it does:
+    Parabolic profile of a quenched bar: compressive near the surface and tensile in the core (sigma_theta = sigma_z = A(2d^2 - 1), sigma_r = A(d^2 - 1)), zero shear. Returns (sigma_r, sigma_theta, sigma_z, tau_rt, tau_rz, tau_tz).
+    """
+    d2 = distance_norm**2
+    zero = 0.0 * distance_norm
+    return amplitude * (d2 - 1.0), amplitude * (2.0 * d2 - 1.0), amplitude * (2.0 * d2 - 1.0), zero, zero, zero
+
+
+# Stress profiles selectable by name (main(law=...)); any function with the same signature also works
+STRESS_LAWS = {
+    "power": power_law_stress,
+    "quench": quench_stress,
+}
+
+
+def calculate_cylindrical_stress(nodes, center, law=power_law_stress, max_distance=None):
     """
     calculate_cylindrical_stress / (function)
     What it does:
-    Calculates synthetic residual stresses in cylindrical coordinates for each node, based on its distance from the geometric center. Returns a list of dictionaries with node coordinates and stress components.
+    Calculates synthetic residual stresses in cylindrical coordinates for each node, based on its distance from the geometric center, in one vectorized pass. The profile is given by 'law' (a function of STRESS_LAWS or its name). For chunked use, max_distance (the normalization distance of the whole mesh) must be given; by default it is the maximum over 'nodes'. Returns a NumPy array [N, 12] with the columns of FIELD_COLUMNS.
     """
+    if isinstance(law, str):
+        law = STRESS_LAWS[law]
     dx = nodes[:, 1] - center[0]
     dy = nodes[:, 2] - center[1]
     dz = nodes[:, 3] - center[2]
@@ -184,69 +260,99 @@ def calculate_cylindrical_stress(nodes, center):
     
     # 3D distance from center
     distance_3d = np.sqrt(r**2 + dz**2)
-    max_distance = np.max(distance_3d) if len(distance_3d) else 1.0
+    if max_distance is None:
+        max_distance = np.max(distance_3d) if len(distance_3d) else 1.0
     distance_norm = distance_3d / max_distance
     
-    # Example stress calculation based on normalized distances
-    sigma_r = 5000.0 * (distance_norm**2)
-    sigma_theta = 5000.0 * distance_norm
-    sigma_z = 5000.0 * (distance_norm**1.5)
-    
-    # Tau (shear) as zero, if desired
-    tau_rt = 0.0 * distance_norm
-    tau_rz = 0.0 * distance_norm
-    tau_tz = 0.0 * distance_norm
-    
-    results = []
-    for i in range(len(nodes)):
-        results.append({
-            'id': int(nodes[i, 0]),
-            'x': nodes[i, 1],
-            'y': nodes[i, 2],
-            'z': nodes[i, 3],
-            'r': r[i],
-            'theta': theta[i],
-            'sigma_r': sigma_r[i],
-            'sigma_theta': sigma_theta[i],
-            'sigma_z': sigma_z[i],
-            'tau_rt': tau_rt[i],
-            'tau_rz': tau_rz[i],
-            'tau_tz': tau_tz[i]
-        })
+    results = np.empty((len(nodes), len(FIELD_COLUMNS)))
+    results[:, 0:4] = nodes[:, 0:4]
+    results[:, 4] = r
+    results[:, 5] = theta
+    for column, values in enumerate(law(distance_norm, r, theta, dz), start=6):
+        results[:, column] = values
     return results
 
 
-def save_stress_field(results, output_dir):
+class StressFieldWriter:
+    """
+    StressFieldWriter / (class)
+    What it does:
+    Writes a stress field chunk by chunk to residual_stress.txt (same text format as before, formatted one chunk at a time) and/or residual_stress.npy (float64 [N, 12] with the columns of FIELD_COLUMNS, written through a memory map). The total number of nodes must be known up front for the binary file.
+    """
+    # "{id}, {x:.8f}, ..." of the text format
+    ROW_FORMAT = "%d" + ", %.8f" * (len(FIELD_COLUMNS) - 1) + "\n"
+    # Rows formatted per string operation (bounds the temporary tuple/string)
+    TEXT_ROWS = 8192
+
+    def __init__(self, output_dir, total_nodes, text=True, binary=True):
+        os.makedirs(output_dir, exist_ok=True)
+        self.text_path = os.path.join(output_dir, TEXT_FILE) if text else None
+        self.binary_path = os.path.join(output_dir, BINARY_FILE) if binary else None
+        self.total_nodes = int(total_nodes)
+        self.written = 0
+        self._text = None
+        self._binary = None
+        if self.text_path:
+            self._text = open(self.text_path, 'w')
+            self._text.write("** Residual stress field in cylindrical coordinates\n")
+            self._text.write(", ".join(FIELD_COLUMNS) + "\n")
+        if self.binary_path:
+            self._binary = open_memmap(self.binary_path, mode='w+', dtype=np.float64,
+                                       shape=(self.total_nodes, len(FIELD_COLUMNS)))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def write(self, results):
+        """Appends a chunk [n, 12] from calculate_cylindrical_stress."""
+        n = len(results)
+        if self._text is not None:
+            for start in range(0, n, self.TEXT_ROWS):
+                block = results[start:start + self.TEXT_ROWS]
+                self._text.write((self.ROW_FORMAT * len(block)) % tuple(block.ravel()))
+        if self._binary is not None:
+            self._binary[self.written:self.written + n] = results
+        self.written += n
+
+    def close(self):
+        if self._text is not None:
+            self._text.close()
+            self._text = None
+        if self._binary is not None:
+            self._binary.flush()
+            self._binary = None
+        for path in (self.text_path, self.binary_path):
+            if path:
+                print(f"File generated: {os.path.abspath(path)}")
+
+
+def save_stress_field(results, output_dir, text=True, binary=True, chunk_size=DEFAULT_CHUNK):
     """
     save_stress_field / (function)
     What it does:
-    Saves the calculated stress field to a text file in the specified output directory, including node coordinates and all stress components in cylindrical coordinates.
+    Saves the calculated stress field (array from calculate_cylindrical_stress) to the text file and/or the binary .npy in the specified output directory, including node coordinates and all stress components in cylindrical coordinates.
     """
-    os.makedirs(output_dir, exist_ok=True)
-    output_path = os.path.join(output_dir, "residual_stress.txt")
-    
-    with open(output_path, 'w') as f:
-        f.write("** Residual stress field in cylindrical coordinates\n")
-        f.write("ID, X, Y, Z, R, Theta, Sigma_r, Sigma_theta, Sigma_z, Tau_r_theta, Tau_r_z, Tau_theta_z\n")
-        
-        for result in results:
-            line = (
-                f"{result['id']}, {result['x']:.8f}, {result['y']:.8f}, {result['z']:.8f}, "
-                f"{result['r']:.8f}, {result['theta']:.8f}, "
-                f"{result['sigma_r']:.8f}, {result['sigma_theta']:.8f}, "
-                f"{result['sigma_z']:.8f}, {result['tau_rt']:.8f}, "
-                f"{result['tau_rz']:.8f}, {result['tau_tz']:.8f}\n"
-            )
-            f.write(line)
-    
-    print(f"File generated: {os.path.abspath(output_path)}")
+    with StressFieldWriter(output_dir, len(results), text=text, binary=binary) as writer:
+        for start in range(0, len(results), max(1, int(chunk_size))):
+            writer.write(results[start:start + max(1, int(chunk_size))])
 
 
-def main(output_dir=None):
+def main(output_dir=None, law="power", target_density=15, chunk_size=DEFAULT_CHUNK, text=True, binary=True):
     """
     main / (function)
     What it does:
-    Main entry point for generating a synthetic residual stress field. Loads coordinate limits from an information file if available, generates a node mesh, computes geometric center, calculates stresses, and saves the results to a text file in the output directory.
+    Main entry point for generating a synthetic residual stress field. Loads coordinate limits from an information file if available, computes geometric center, then generates the node mesh and the stresses chunk by chunk and streams them to the text and/or binary files in the output directory.
+    Parameters:
+        output_dir (str, optional): Output directory (defaults to this module's folder).
+        law (str or callable): Stress profile, a key of STRESS_LAWS or a function with the same signature.
+        target_density (int): Divisions along the shortest axis of the mesh.
+        chunk_size (int): Nodes generated, calculated and written at a time.
+        text (bool): Write residual_stress.txt.
+        binary (bool): Write residual_stress.npy.
     """
     if output_dir is None:
         output_dir = os.path.dirname(__file__)
@@ -270,24 +376,22 @@ def main(output_dir=None):
     print(f"  Y: {limits.y_min:.4f} to {limits.y_max:.4f}")
     print(f"  Z: {limits.z_min:.4f} to {limits.z_max:.4f}")
     
-    # Generate node mesh
-    print("Generating mesh...")
-    t0 = __import__('time').time()
-    nodes = generate_mesh(limits)
-    print(f"Mesh generated with {len(nodes)} nodes in {__import__('time').time() - t0:.2f} s")
+    # Node mesh (axes only: the nodes are generated chunk by chunk)
+    axes = grid_axes(limits, target_density)
+    total_nodes = len(axes[0]) * len(axes[1]) * len(axes[2])
     
     # Calculate geometric center
     center = calculate_geometric_center(limits)
     print(f"Geometric center: ({center[0]:.4f}, {center[1]:.4f}, {center[2]:.4f})")
+    max_distance = max_distance_from_center(axes, center)
     
-    # Calculate stresses
-    print("Calculating stresses...")
-    t0 = __import__('time').time()
-    stress_results = calculate_cylindrical_stress(nodes, center)
-    print(f"Stresses calculated in {__import__('time').time() - t0:.2f} s")
-    
-    # Save results
-    save_stress_field(stress_results, output_dir)
+    # Generate, calculate and save the field in chunks
+    print(f"Calculating stresses for {total_nodes} nodes ('{getattr(law, '__name__', law)}' profile)...")
+    t0 = time.time()
+    with StressFieldWriter(output_dir, total_nodes, text=text, binary=binary) as writer:
+        for nodes in iter_mesh_chunks(axes, chunk_size):
+            writer.write(calculate_cylindrical_stress(nodes, center, law, max_distance))
+    print(f"Stresses calculated and saved in {time.time() - t0:.2f} s")
     
     print("Process completed!")
 
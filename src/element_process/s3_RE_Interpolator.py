@@ -4,6 +4,8 @@ s3_RE_Interpolator.py
 What it does:
 Manages the interpolation of stress fields between finite element meshes. Loads mesh and stress data, performs coordinate matching, and interpolates stress components using linear and nearest-neighbor methods. Generates output files compatible with Abaqus for simulation or post-processing. Useful for transferring residual stress fields between meshes of different resolutions or topologies.
 
+The interpolation itself is a linear map from source to target values, stored as a sparse matrix W (target x source: the 4 barycentric weights of the enclosing tetrahedron, or a single 1.0 on the nearest source point for targets outside the convex hull). W is cached on disk, keyed by SHA-1 hashes of the source and target coordinates, so every further case or run on the same pair of meshes is a sparse product W @ source_values instead of a new triangulation. The cache folder is interpolation_cache/ inside the case folder by default; Nodes_main passes Output/interpolation_cache/ so all cases of a batch share it. The cache is bounded: after each write the least recently used operators are removed beyond OPERATOR_CACHE_MAX_BYTES (and, optionally, those older than a maximum age); prune_operator_cache(cache_dir, max_bytes=0) empties it.
+
 Example of use:
     from Modules_python.s3_RE_Interpolator import ElementTensionInterpolator
     interpolator = ElementTensionInterpolator(output_dir="./Output/Mesh-0_98--Lenth-50")
@@ -12,8 +14,64 @@ Example of use:
 
 import numpy as np
 import os
-from scipy.interpolate import LinearNDInterpolator, NearestNDInterpolator
+import glob
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from scipy import sparse
+from scipy.interpolate import LinearNDInterpolator
+from scipy.spatial import Delaunay, cKDTree
 import pandas as pd
+from .Elements_data import elements_npz_for, load_elements_npz
+
+
+# Pontos alvo avaliados por tarefa do pool de threads
+DEFAULT_CHUNK = 65536
+
+# Operadores W gravados (um .npz por par de malhas fonte/alvo)
+OPERATOR_CACHE_DIR = "interpolation_cache"
+OPERATOR_VERSION = b"W1"
+OPERATOR_CACHE_MAX_BYTES = 2 * 1024**3     # limite do cache; os menos usados saem primeiro
+
+
+def prune_operator_cache(cache_dir, max_bytes=OPERATOR_CACHE_MAX_BYTES, max_age_days=None, keep=()):
+    """
+    prune_operator_cache / (function)
+    What it does:
+    Bounds the folder of cached interpolation operators: removes the W_*.npz files not used for more than max_age_days, then the least recently used ones (file mtime, refreshed on every cache hit) until the total size is at most max_bytes. max_bytes=0 clears the cache. Files in keep are never removed.
+    Parameters:
+        cache_dir (str): Folder of the cached operators.
+        max_bytes (int, optional): Size limit in bytes (None: no limit).
+        max_age_days (float, optional): Age limit in days (None: no limit).
+        keep (iterable): Paths that must stay (e.g. the operator just written).
+    Returns:
+        tuple: (number of operators, total bytes) left in the cache.
+    """
+    keep = {os.path.abspath(path) for path in keep}
+    entries = []
+    for path in glob.glob(os.path.join(cache_dir, "W_*.npz")):
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        entries.append((st.st_mtime, st.st_size, path))
+    entries.sort()                              # mais antigos primeiro
+    
+    total = sum(size for _, size, _ in entries)
+    oldest_allowed = time.time() - max_age_days * 86400.0 if max_age_days is not None else None
+    left = []
+    for mtime, size, path in entries:
+        expired = oldest_allowed is not None and mtime < oldest_allowed
+        over = max_bytes is not None and total > max_bytes
+        if (expired or over) and os.path.abspath(path) not in keep:
+            try:
+                os.remove(path)
+                total -= size
+                continue
+            except OSError:
+                pass
+        left.append(path)
+    return len(left), total
 
 
 class ElementTensionInterpolator:
@@ -23,15 +81,24 @@ class ElementTensionInterpolator:
     Manages the interpolation of stress fields between finite element meshes. Loads mesh and stress data, matches coordinates, and interpolates stress components using linear and nearest-neighbor methods. Generates output files compatible with Abaqus.
     """
     
-    def __init__(self, output_dir):
+    def __init__(self, output_dir, cache_dir=None, use_operator_cache=True,
+                 cache_max_bytes=OPERATOR_CACHE_MAX_BYTES, cache_max_age_days=None):
         """
         __init__ / (method)
         What it does:
         Initializes the element tension interpolator with the specified output directory. Sets up internal variables for mesh and stress data.
         Parameters:
             output_dir (str): Directory where files are stored and results will be saved.
+            cache_dir (str, optional): Folder of the cached interpolation operators. Defaults to interpolation_cache/ inside output_dir; pass a folder in the batch output root to share it between cases.
+            use_operator_cache (bool): Interpolate through the cached operator W (False: direct interpolation, nothing written).
+            cache_max_bytes (int, optional): Size limit of the cache folder, enforced after each write (None: no limit).
+            cache_max_age_days (float, optional): Operators unused for longer are removed after each write (None: no limit).
         """
         self.output_dir = output_dir
+        self.cache_dir = cache_dir or os.path.join(os.path.abspath(output_dir), OPERATOR_CACHE_DIR)
+        self.use_operator_cache = use_operator_cache
+        self.cache_max_bytes = cache_max_bytes
+        self.cache_max_age_days = cache_max_age_days
         self.target_elements = None
         self.target_coords = None
         self.target_types = None
@@ -44,7 +111,7 @@ class ElementTensionInterpolator:
         """
         load_abaqus_elements / (method)
         What it does:
-        Loads the original Abaqus mesh elements from a file, extracting element IDs, centroid coordinates, and types. Supports both pandas and manual parsing for robustness. Returns True if successful, False otherwise.
+        Loads the original Abaqus mesh elements from a file, extracting element IDs, centroid coordinates, and types. Uses the binary elements_data.npz next to the file when it is current; otherwise supports both pandas and manual parsing for robustness. Returns True if successful, False otherwise.
         Parameters:
             elements_file (str, optional): Path to the elements file. If None, attempts to find automatically.
         Returns:
@@ -57,6 +124,17 @@ class ElementTensionInterpolator:
                 return False
         
         elements_file_path = os.path.join(self.output_dir, elements_file)
+        
+        # Tabela binária gravada pelo s1_Ele_Extractor, se não estiver desatualizada
+        npz_path = elements_npz_for(elements_file_path)
+        if npz_path is not None:
+            print(f"Carregando elementos do arquivo: {npz_path}")
+            data = load_elements_npz(npz_path)
+            self.target_elements = data['elements']
+            self.target_coords = data['centroids']
+            self.target_types = data['types']
+            return True
+        
         print(f"Carregando elementos do arquivo: {elements_file_path}")
         
         try:
@@ -117,7 +195,7 @@ class ElementTensionInterpolator:
         """
         load_tension_field / (method)
         What it does:
-        Loads the residual stress field from a file, supporting both Abaqus and cylindrical formats. Extracts stress components and coordinates, converting to cartesian if needed. Returns True if successful, False otherwise.
+        Loads the residual stress field from a file, supporting both Abaqus and cylindrical formats. Extracts stress components and coordinates, converting to cartesian if needed. A binary copy of a cylindrical file (residual_stress.npy from s2_RE_Field) is used instead of the text when the text is absent or not newer than it; a .npy path is loaded directly. Returns True if successful, False otherwise.
         Parameters:
             tension_file (str, optional): Path to the tension file. If None, attempts to find automatically.
         Returns:
@@ -130,6 +208,14 @@ class ElementTensionInterpolator:
                 return False
         
         tension_file_path = os.path.join(self.output_dir, tension_file)
+        
+        # Cópia binária gravada pelo s2_RE_Field (mesmas colunas do formato cilíndrico);
+        # o texto pode não existir (s2 com text=False): mtimes só comparados se ambos existem
+        binary_path = os.path.splitext(tension_file_path)[0] + ".npy"
+        if os.path.isfile(binary_path) and (not os.path.isfile(tension_file_path) or
+                                            os.path.getmtime(binary_path) >= os.path.getmtime(tension_file_path)):
+            return self._load_tension_binary(binary_path)
+        
         print(f"Carregando tensões do arquivo: {tension_file_path}")
         
         points = []
@@ -232,6 +318,42 @@ class ElementTensionInterpolator:
             self.source_coords = np.array(coordinates)
             return True
     
+    def _load_tension_binary(self, binary_path):
+        """
+        _load_tension_binary / (method)
+        What it does:
+        Loads a binary stress field [N, 12] in the cylindrical column order (Id, X, Y, Z, R, Theta, Sr, St, Sz, Trt, Trz, Ttz) and converts the stresses to cartesian with array operations. Returns True if successful, False otherwise.
+        Parameters:
+            binary_path (str): Path to the .npy file.
+        Returns:
+            bool: True if the stress field was loaded successfully, False otherwise.
+        """
+        print(f"Carregando tensões do arquivo: {binary_path}")
+        try:
+            data = np.load(binary_path, mmap_mode='r')
+            if data.ndim != 2 or data.shape[1] < 12 or len(data) == 0:
+                print("Nenhum ponto de tensão encontrado no arquivo.")
+                return False
+            theta = np.asarray(data[:, 5])
+            sigma_r, sigma_t, sigma_z = data[:, 6], data[:, 7], data[:, 8]
+            tau_rz, tau_tz = data[:, 10], data[:, 11]
+            cos, sin = np.cos(theta), np.sin(theta)
+            
+            # Converter tensões cilíndricas para cartesianas
+            self.source_tensions = np.column_stack([
+                sigma_r * cos**2 + sigma_t * sin**2,
+                sigma_r * sin**2 + sigma_t * cos**2,
+                sigma_z,
+                (sigma_r - sigma_t) * sin * cos,
+                tau_rz * cos - tau_tz * sin,
+                tau_rz * sin + tau_tz * cos])
+            self.source_points = data[:, 0].astype(np.int64)
+            self.source_coords = np.array(data[:, 1:4])
+            return True
+        except Exception as e:
+            print(f"Erro ao carregar arquivo de tensões: {e}")
+            return False
+    
     def _match_points_with_elements(self):
         """
         _match_points_with_elements / (method)
@@ -262,11 +384,14 @@ class ElementTensionInterpolator:
             print("Nenhuma correspondência encontrada. Impossível interpolar.")
             return False
     
-    def interpolate_tensions(self):
+    def interpolate_tensions(self, workers=None, chunk_size=DEFAULT_CHUNK):
         """
         interpolate_tensions / (method)
         What it does:
-        Interpolates stress components from the source mesh to the target mesh using linear and nearest-neighbor methods. Handles insufficient data and fallback strategies. Returns True if interpolation is successful, False otherwise.
+        Interpolates stress components from the source mesh to the target mesh using linear and nearest-neighbor methods. The source points are triangulated once and the six components are interpolated together; target points outside the convex hull get the values of their nearest source point from a single cKDTree. Target points are evaluated in chunks spread over a thread pool. Handles insufficient data and fallback strategies. Returns True if interpolation is successful, False otherwise.
+        Parameters:
+            workers (int, optional): Threads for the evaluation (defaults to the number of CPUs).
+            chunk_size (int): Target points per task.
         Returns:
             bool: True if interpolation was successful, False otherwise.
         """
@@ -281,40 +406,181 @@ class ElementTensionInterpolator:
                                          (len(self.target_coords), 1))
             return True
             
-        # Componentes de tensão
-        components = ['S11', 'S22', 'S33', 'S12', 'S13', 'S23']
-        self.target_tensions = np.zeros((len(self.target_coords), 6))
+        source_coords = np.asarray(self.source_coords, dtype=np.float64)
+        target_coords = np.asarray(self.target_coords, dtype=np.float64)
+        values = np.asarray(self.source_tensions, dtype=np.float64)
+        workers = workers or os.cpu_count() or 1
         
-        # Para cada componente de tensão, criar um interpolador
-        for i in range(6):
-            values = self.source_tensions[:, i]
-            
+        if self.use_operator_cache:
             try:
-                # Tentar interpolação linear
-                interpolator = LinearNDInterpolator(self.source_coords, values)
-                interpolated_tensions = interpolator(self.target_coords)
-                
-                # Se houver valores NaN, usar o interpolador de vizinho mais próximo
-                nan_mask = np.isnan(interpolated_tensions)
-                if np.any(nan_mask):
-                    nn_interpolator = NearestNDInterpolator(self.source_coords, values)
-                    interpolated_tensions[nan_mask] = nn_interpolator(self.target_coords[nan_mask])
-                    
-                self.target_tensions[:, i] = interpolated_tensions
+                # W (alvo x fonte) do cache ou montado agora; o caso se resume a W @ valores
+                W = self.interpolation_operator(workers, chunk_size)
+                self.target_tensions = np.asarray(W @ values)
+                print(f"Interpolação concluída para {len(self.target_coords)} elementos.")
+                return True
             except Exception as e:
-                print(f"Erro na interpolação da componente {components[i]}: {e}")
-                try:
-                    # Fallback para interpolador de vizinho mais próximo
-                    nn_interpolator = NearestNDInterpolator(self.source_coords, values)
-                    self.target_tensions[:, i] = nn_interpolator(self.target_coords)
-                except Exception as e2:
-                    print(f"Erro no fallback para vizinho mais próximo: {e2}")
-                    # Em último caso, use valores médios
-                    self.target_tensions[:, i] = np.mean(values) * np.ones(len(self.target_coords))
+                print(f"Erro no operador de interpolação: {e}. Usando interpolação direta.")
+        
+        try:
+            # Uma única triangulação de Delaunay para as seis componentes
+            interpolator = LinearNDInterpolator(Delaunay(source_coords), values)
+        except Exception as e:
+            print(f"Erro na triangulação dos pontos fonte: {e}")
+            interpolator = None
+        
+        try:
+            tree = cKDTree(source_coords)
+            if interpolator is None:
+                # Fallback para vizinho mais próximo em todos os pontos
+                _, nearest = tree.query(target_coords, workers=workers)
+                self.target_tensions = values[nearest]
+            else:
+                self.target_tensions = self._evaluate_chunks(interpolator, target_coords, workers, chunk_size)
+                # Pontos fora do casco convexo: vizinho mais próximo
+                nan_rows = np.isnan(self.target_tensions).any(axis=1)
+                if np.any(nan_rows):
+                    _, nearest = tree.query(target_coords[nan_rows], workers=workers)
+                    self.target_tensions[nan_rows] = values[nearest]
+        except Exception as e:
+            print(f"Erro no fallback para vizinho mais próximo: {e}")
+            # Em último caso, use valores médios
+            self.target_tensions = np.tile(np.mean(values, axis=0), (len(target_coords), 1))
         
         print(f"Interpolação concluída para {len(self.target_coords)} elementos.")
         return True
     
+    @staticmethod
+    def _evaluate_chunks(func, points, workers, chunk_size=DEFAULT_CHUNK):
+        """
+        _evaluate_chunks / (method)
+        What it does:
+        Evaluates func (an interpolator, or any function of a block of points returning an array or a tuple of arrays) on the points in chunks of chunk_size rows, one task per chunk on a thread pool (the simplex search and the barycentric evaluation run without the GIL). Returns the results of the chunks concatenated.
+        """
+        chunk_size = max(1, int(chunk_size))
+        chunks = [points[start:start + chunk_size] for start in range(0, len(points), chunk_size)]
+        if workers <= 1 or len(chunks) <= 1:
+            return func(points)
+        # A primeira chamada monta as transformadas baricêntricas da triangulação (cache compartilhado)
+        func(points[:1])
+        
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(func, chunks))
+        if isinstance(results[0], tuple):
+            return tuple(np.concatenate(parts) for parts in zip(*results))
+        return np.concatenate(results)
+    
+    def interpolation_operator(self, workers=None, chunk_size=DEFAULT_CHUNK):
+        """
+        interpolation_operator / (method)
+        What it does:
+        Returns the sparse interpolation operator W (target x source) of the loaded source and target coordinates, so that target_values = W @ source_values. It is loaded from the cache when an operator for the same coordinates exists, otherwise built and saved there, and the cache is then pruned to its size/age limits.
+        Parameters:
+            workers (int, optional): Threads used to build it (defaults to the number of CPUs).
+            chunk_size (int): Target points per task.
+        Returns:
+            scipy.sparse.csr_matrix: Operator [n_target, n_source].
+        """
+        source_coords = np.asarray(self.source_coords, dtype=np.float64)
+        target_coords = np.asarray(self.target_coords, dtype=np.float64)
+        cache_path = self._operator_cache_path(source_coords, target_coords)
+        
+        if os.path.isfile(cache_path):
+            try:
+                W = sparse.load_npz(cache_path).tocsr()
+                if W.shape == (len(target_coords), len(source_coords)):
+                    os.utime(cache_path)            # uso recente: fica por último na poda
+                    print(f"Operador de interpolação carregado do cache: {cache_path}")
+                    return W
+            except Exception as e:
+                print(f"Cache do operador ilegível ({e}); recalculando.")
+        
+        W = self.build_interpolation_operator(source_coords, target_coords, workers, chunk_size)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = cache_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            sparse.save_npz(f, W, compressed=False)
+        os.replace(tmp_path, cache_path)
+        n_files, total = prune_operator_cache(self.cache_dir, self.cache_max_bytes,
+                                              self.cache_max_age_days, keep=[cache_path])
+        print(f"Operador de interpolação salvo no cache: {cache_path} "
+              f"({os.path.getsize(cache_path) / 1024**2:.1f} MB; cache: {n_files} operadores, "
+              f"{total / 1024**2:.1f} MB)")
+        return W
+    
+    @classmethod
+    def build_interpolation_operator(cls, source_coords, target_coords, workers=None, chunk_size=DEFAULT_CHUNK):
+        """
+        build_interpolation_operator / (method)
+        What it does:
+        Builds the sparse linear-interpolation operator from source to target points: one Delaunay triangulation of the source, the enclosing simplex and barycentric weights of every target (in chunks on a thread pool), and a single nearest-neighbour entry (cKDTree) for the targets outside the convex hull or for all of them if the triangulation fails. W @ values equals the linear interpolation with nearest-neighbour fill of interpolate_tensions.
+        Parameters:
+            source_coords (np.array): Source points [n_source, 3].
+            target_coords (np.array): Target points [n_target, 3].
+            workers (int, optional): Threads (defaults to the number of CPUs).
+            chunk_size (int): Target points per task.
+        Returns:
+            scipy.sparse.csr_matrix: Operator [n_target, n_source].
+        """
+        source_coords = np.asarray(source_coords, dtype=np.float64)
+        target_coords = np.asarray(target_coords, dtype=np.float64)
+        workers = workers or os.cpu_count() or 1
+        n_target, n_dims = target_coords.shape
+        if n_target == 0:
+            return sparse.csr_matrix((0, len(source_coords)))
+        
+        try:
+            tri = Delaunay(source_coords)
+            simplex, weights = cls._evaluate_chunks(lambda points: cls._barycentric(tri, points),
+                                                    target_coords, workers, chunk_size)
+            inside = simplex >= 0
+        except Exception as e:
+            print(f"Erro na triangulação dos pontos fonte: {e}")
+            inside = np.zeros(n_target, dtype=bool)
+        
+        rows = [np.repeat(np.flatnonzero(inside), n_dims + 1)]
+        cols = [tri.simplices[simplex[inside]].ravel()] if inside.any() else []
+        data = [weights[inside].ravel()] if inside.any() else []
+        
+        # Pontos fora do casco convexo: peso 1 no vizinho mais próximo
+        outside = np.flatnonzero(~inside)
+        if len(outside):
+            _, nearest = cKDTree(source_coords).query(target_coords[outside], workers=workers)
+            rows.append(outside)
+            cols.append(nearest)
+            data.append(np.ones(len(outside)))
+        
+        W = sparse.csr_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))),
+                              shape=(n_target, len(source_coords)))
+        W.eliminate_zeros()
+        return W
+    
+    @staticmethod
+    def _barycentric(tri, points):
+        """
+        _barycentric / (method)
+        What it does:
+        Enclosing simplex of each point (-1 outside the triangulation) and its barycentric weights [n_points, n_dims + 1], in the vertex order of tri.simplices.
+        """
+        simplex = tri.find_simplex(points)
+        n_dims = points.shape[1]
+        weights = np.zeros((len(points), n_dims + 1))
+        inside = simplex >= 0
+        transform = tri.transform[simplex[inside]]
+        b = np.einsum('ijk,ik->ij', transform[:, :n_dims], points[inside] - transform[:, n_dims])
+        weights[inside, :n_dims] = b
+        weights[inside, n_dims] = 1.0 - b.sum(axis=1)
+        return simplex, weights
+    
+    def _operator_cache_path(self, source_coords, target_coords):
+        """Cache file of the operator: SHA-1 of the source and of the target coordinates (shape + float64 bytes)."""
+        keys = []
+        for coords in (source_coords, target_coords):
+            digest = hashlib.sha1(OPERATOR_VERSION)
+            digest.update(str(coords.shape).encode("utf-8"))
+            digest.update(np.ascontiguousarray(coords, dtype=np.float64).tobytes())
+            keys.append(digest.hexdigest()[:20])
+        return os.path.join(self.cache_dir, f"W_{keys[0]}_{keys[1]}.npz")
+    
     def generate_interpolated_tension_file(self, output_file=None):
         """
         generate_interpolated_tension_file / (method)
@@ -384,14 +650,14 @@ class ElementTensionInterpolator:
         """
         _find_tension_file / (method)
         What it does:
-        Searches for the tension (stress) file in the output directory, preferring the standard name but falling back to other candidates if needed. Returns the filename or None if not found.
+        Searches for the tension (stress) file in the output directory, preferring the standard name (the text file, or its binary copy when s2_RE_Field wrote only the binary) but falling back to other candidates if needed. Returns the filename or None if not found.
         Returns:
             str: Name of the found file, or None if not found.
         """
         # Primeiro, procura pelo arquivo gerado pelo script anterior
-        tension_file = "residual_stress.txt"
-        if os.path.isfile(os.path.join(self.output_dir, tension_file)):
-            return tension_file
+        for tension_file in ("residual_stress.txt", "residual_stress.npy"):
+            if os.path.isfile(os.path.join(self.output_dir, tension_file)):
+                return tension_file
             
         # Se não encontrar, busca outros arquivos de tensão
         for filename in os.listdir(self.output_dir):
@@ -413,7 +679,8 @@ class ElementTensionInterpolator:
         print("=============================================")
         
         # Cria instância do interpolador
-        interpolator = ElementTensionInterpolator(output_dir)
+        interpolator = ElementTensionInterpolator(output_dir, self.cache_dir, self.use_operator_cache,
+                                                  self.cache_max_bytes, self.cache_max_age_days)
         
         # Carrega elementos alvo
         print("Carregando elementos alvo...")
@@ -1,5 +1,10 @@
+from typing import TYPE_CHECKING
+
 from ..importations import *
 
+if TYPE_CHECKING:   # só para a anotação: importar o conversor aqui é desnecessário em execução
+    from conversor.Background_Writer import BackgroundWriter
+
 logger = logging.getLogger(__name__)
 
 class NumpyEncoder(json.JSONEncoder):
@@ -13,7 +18,11 @@ class NumpyEncoder(json.JSONEncoder):
             return obj.tolist()
         return super(NumpyEncoder, self).default(obj)
 
-def save_json(data: dict, filepath: str, indent: int = 2):
+def save_json(data: dict, filepath: str, indent: int = 2, writer: "BackgroundWriter" = None):
+    # Com um BackgroundWriter a gravação vai para a thread de escrita (data não deve mudar depois)
+    if writer is not None:
+        writer.submit(save_json, data, filepath, indent, description=filepath)
+        return
 
     parent_dir = os.path.dirname(filepath)
     if parent_dir:
@@ -32,15 +41,8 @@ def load_json(filepath: str) -> dict:
 class IOUtils:
     
     @staticmethod
-    def save_json(data: dict, filepath: str, indent: int = 2):
-        parent_dir = os.path.dirname(filepath)
-        if parent_dir:
-            os.makedirs(parent_dir, exist_ok=True)
-
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, cls=NumpyEncoder, indent=indent)
-            
-        logger.info(f"Arquivo salvo com sucesso: {filepath}")
+    def save_json(data: dict, filepath: str, indent: int = 2, writer: "BackgroundWriter" = None):
+        save_json(data, filepath, indent, writer)
     
     @staticmethod
     def load_json(filepath: str) -> dict:
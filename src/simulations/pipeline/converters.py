@@ -4,6 +4,7 @@ from .imports import *
 from .config import SimulationConfig
 from simulations._inp_modules import *
 from conversor.Npy_2_Xdmf import NPY2XDMFParameters, NpyBatchToXdmfConverter
+from conversor.Conversion_Manifest import odb_batch_is_current
 
 
 class ResultConverter:
@@ -16,12 +17,33 @@ class ResultConverter:
         print(f"RESULTS CONVERSION PIPELINE: {method_type}")
         print(f"{'=' * 60}\n")
 
-        # --- ETAPA 1: Extração ODB -> NPY ---
-        self._run_abaqus_extraction(script_module)
+        # --- ETAPA 1: Extração ODB -> NPY (pulada se nenhum ODB mudou) ---
+        if self._odb_outputs_current(method_type, target_dir_key):
+            print(">>> Etapa 1: NPY já atualizado para todos os ODBs (manifestos), extração pulada.")
+        else:
+            self._run_abaqus_extraction(script_module)
 
         # --- ETAPA 2: Conversão NPY -> XDMF ---
         self._run_npy_to_xdmf(method_type, target_dir_key)
 
+    def _odb_outputs_current(self, method_type, target_dir_key) -> bool:
+        # Todos os ODBs com manifesto completo, mesma assinatura (caminho, tamanho,
+        # mtime) e concluído depois da última alteração do config.json
+        params_loader = NPY2XDMFParameters(
+            method_type     = method_type,
+            method_type_dir = target_dir_key
+        )
+        simulation_dir, _, _ = params_loader.run()
+        if not simulation_dir:
+            return False
+
+        config_mtime = None
+        if os.path.exists(params_loader.config_path):
+            config_mtime = os.path.getmtime(params_loader.config_path)
+        return odb_batch_is_current(simulation_dir,
+                                    os.path.join(simulation_dir, "npy_files"),
+                                    newer_than=config_mtime)
+
     def _run_abaqus_extraction(self, script_module: str) -> bool:
         print(">>> Etapa 1: Extraindo dados do ODB (Abaqus Python)...")
 
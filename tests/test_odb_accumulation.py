@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Compara as duas implementações de acumulação de bulkDataBlocks do
+OdbToNPYConverter (_accumulate_block_loop, a referência nó a nó, e
+_accumulate_block_vectorized) nos mesmos blocos sintéticos.
+
+O conversor importa odbAccess; aqui usa o stand-in de src/conversor/odb_standin.
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+CONVERSOR_DIR = os.path.join(os.path.dirname(__file__), os.pardir, "src", "conversor")
+sys.path[:0] = [os.path.join(CONVERSOR_DIR, "odb_standin"), CONVERSOR_DIR]
+
+from Odb_Npz_Converter import OdbToNPYConverter  # noqa: E402
+from Stress_Layout import ABAQUS_TO_FULL  # noqa: E402
+
+N_NODES = 50
+N_LABELS = 80       # labels 0..79; parte deles fora da instância
+INVARIANTS = ("mises", "maxPrincipal", "minPrincipal")
+
+
+def make_lookup(rng):
+    """Tabela densa label -> índice global, com labels sem nó (-1)."""
+    lookup = np.full(N_LABELS, -1, dtype=np.int64)
+    labels = rng.choice(np.arange(1, N_LABELS), size=N_NODES, replace=False)
+    lookup[labels] = rng.permutation(N_NODES)
+    return lookup
+
+
+def make_block(rng, n_values, n_components, invariants):
+    """
+    Bloco ELEMENT_NODAL: labels repetidos (vários elementos por nó), labels
+    ausentes da tabela e labels além do fim dela.
+    """
+    labels = rng.integers(0, N_LABELS + 10, size=n_values)
+    labels[:5] = labels[5]                      # duplicados garantidos
+    labels[-1] = N_LABELS + 3                   # fora da tabela
+    block = {"labels": labels,
+             "data": rng.normal(scale=100.0, size=(n_values, n_components)).astype(np.float32)}
+    if invariants:
+        for attr in INVARIANTS:
+            block[attr] = rng.normal(scale=100.0, size=n_values).astype(np.float32)
+    return block
+
+
+def accumulate(method, inst_map, blocks, column_map, n_columns, invariants):
+    sum_data = np.zeros((N_NODES, n_columns), dtype=np.float32)
+    count = np.zeros(N_NODES, dtype=np.float32)
+    extra_sums = dict((attr, np.zeros(N_NODES, dtype=np.float32)) for attr in INVARIANTS)
+    for block in blocks:
+        extras = [(block[attr], extra_sums[attr]) for attr in INVARIANTS if invariants and attr in block]
+        method(inst_map, block["labels"], block["data"], column_map, sum_data, count, extras)
+    return sum_data, count, extra_sums
+
+
+@pytest.mark.parametrize("invariants", [True, False])
+@pytest.mark.parametrize("field", ["S", "U"])
+def test_vectorized_matches_loop(field, invariants):
+    rng = np.random.default_rng(1 if invariants else 2)
+    inst_map = {"node_lookup": make_lookup(rng)}
+    if field == "S":
+        column_map, n_columns, n_components = ABAQUS_TO_FULL, 9, 6
+    else:
+        column_map, n_columns, n_components = OdbToNPYConverter.DISP_MAP, 3, 3
+    blocks = [make_block(rng, n, n_components, invariants) for n in (400, 37, 8)]
+
+    ref = accumulate(OdbToNPYConverter._accumulate_block_loop, inst_map, blocks,
+                     column_map, n_columns, invariants)
+    vec = accumulate(OdbToNPYConverter._accumulate_block_vectorized, inst_map, blocks,
+                     column_map, n_columns, invariants)
+
+    np.testing.assert_array_equal(vec[1], ref[1])
+    assert ref[1].sum() > 0
+    scale = np.abs(ref[0]).max()
+    np.testing.assert_allclose(vec[0], ref[0], rtol=1e-5, atol=1e-5 * scale)
+    for attr in INVARIANTS:
+        np.testing.assert_allclose(vec[2][attr], ref[2][attr], rtol=1e-5, atol=1e-5 * scale)
+        assert np.any(ref[2][attr]) == invariants
+
+
+def test_block_without_known_labels():
+    rng = np.random.default_rng(3)
+    lookup = make_lookup(rng)
+    unknown = np.flatnonzero(lookup < 0)
+    block = {"labels": np.concatenate([unknown[:4], [N_LABELS, N_LABELS + 7]]),
+             "data": np.ones((6, 6), dtype=np.float32)}
+    for method in (OdbToNPYConverter._accumulate_block_loop,
+                   OdbToNPYConverter._accumulate_block_vectorized):
+        sum_data, count, _ = accumulate(method, {"node_lookup": lookup}, [block],
+                                        ABAQUS_TO_FULL, 9, False)
+        assert not sum_data.any()
+        assert not count.any()
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Agendador do batch paralelo (OdbBatchConverter.convert_parallel) com ODBs
+sintéticos do stand-in de odbAccess (src/conversor/odb_standin): lote com
+ODBs bons e corrompidos, reciclagem de workers pelo limite de memória e
+worker morto no meio de um job.
+
+Odb_Npz_Parameters importa 'utils' (setup_logger) do ambiente do projeto; sem
+ele o módulo é ignorado.
+"""
+
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+CONVERSOR_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir, "src", "conversor"))
+sys.path[:0] = [os.path.join(CONVERSOR_DIR, "odb_standin"), CONVERSOR_DIR]
+
+pytest.importorskip("utils")
+
+from odbAccess import write_synthetic_odb  # noqa: E402
+from Odb_Npz_Parameters import OdbBatchConverter  # noqa: E402
+
+TIMEOUT = 120.0     # segundos; um agendador travado falha o teste em vez de pendurá-lo
+
+BASE_PARAMS = {"MeshType": "12", "inspect_first": False, "BeginFrame": "0", "resume": False}
+
+
+def make_batch(folder, good, **bad):
+    """ODBs sintéticos em folder/odb: 'good' válidos e um por item de bad (nome -> spec)."""
+    odb_dir = folder / "odb"
+    odb_dir.mkdir()
+    for i in range(good):
+        write_synthetic_odb(str(odb_dir / "M{}.odb".format(i)), n_nodes=300, n_frames=2)
+    for name, spec in bad.items():
+        write_synthetic_odb(str(odb_dir / "{}.odb".format(name)), **spec)
+    return str(odb_dir), str(folder / "npy")
+
+
+def run_batch(odb_dir, npy_dir, **params):
+    """convert_batch numa thread com prazo; devolve o conversor e o relatório gravado."""
+    converter = OdbBatchConverter(odb_dir, npy_dir, dict(BASE_PARAMS, **params))
+    thread = threading.Thread(target=converter.convert_batch)
+    thread.daemon = True
+    thread.start()
+    thread.join(TIMEOUT)
+    assert not thread.is_alive(), "convert_batch did not finish in {} s".format(TIMEOUT)
+    with open(os.path.join(npy_dir, "conversion_report.json")) as f:
+        return converter, json.load(f)
+
+
+def odb_names(jobs):
+    return [os.path.splitext(os.path.basename(job["odb"]))[0] for job in jobs]
+
+
+def test_mixed_batch_reports_each_job_in_order(tmp_path):
+    odb_dir, npy_dir = make_batch(tmp_path, 4, BAD={"fail": True})
+    converter, report = run_batch(odb_dir, npy_dir, workers=2)
+
+    expected = [os.path.splitext(os.path.basename(f))[0] for f in converter.find_odb_files(odb_dir)]
+    jobs = report["jobs"]
+    assert odb_names(jobs) == expected
+    assert [job["index"] for job in jobs] == list(range(len(expected)))
+    assert (report["total"], report["failed"]) == (5, 1)
+    for name, job in zip(expected, jobs):
+        if name == "BAD":
+            assert job["status"] == "failed"
+            assert "corrupt" in job["error"]
+        else:
+            assert job["status"] == "ok" and job["error"] is None
+            assert os.path.exists(os.path.join(npy_dir, name, "coordinates.npy"))
+    assert set(job["worker"] for job in jobs) <= {0, 1}
+
+
+def test_memory_cap_recycles_worker_after_each_job(tmp_path):
+    odb_dir, npy_dir = make_batch(tmp_path, 4)
+    _, report = run_batch(odb_dir, npy_dir, workers=2, worker_memory_mb=1)
+
+    jobs = report["jobs"]
+    assert report["failed"] == 0
+    # Todo processo passa de 1 MB: cada job roda num worker novo
+    assert len(set(job["worker"] for job in jobs)) == len(jobs)
+
+
+def test_worker_killed_mid_job_fails_only_that_job(tmp_path):
+    odb_dir, npy_dir = make_batch(tmp_path, 3, CRASH={"exit_code": 3})
+    _, report = run_batch(odb_dir, npy_dir, workers=2)
+
+    jobs = dict(zip(odb_names(report["jobs"]), report["jobs"]))
+    assert (report["total"], report["failed"]) == (4, 1)
+    assert jobs["CRASH"]["status"] == "failed"
+    assert jobs["CRASH"]["error"] == "worker exited with code 3"
+    assert all(jobs["M{}".format(i)]["status"] == "ok" for i in range(3))